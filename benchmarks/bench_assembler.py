@@ -0,0 +1,72 @@
+"""
+Lexer, parser and linker throughput on a generated program
+"""
+import random
+
+from computer.assembler.lexer import Lexer
+from computer.assembler.parser import Parser
+from computer.assembler.linker import link
+
+from benchmarks.harness import measure_total
+
+REGISTERS = ['a', 'b', 'c', 'd']
+LINES = 2000
+
+
+def label_name(i):
+    """ Labels can't contain digits: 0 -> label_a, 26 -> label_ba """
+    name = ''
+    while True:
+        name = chr(ord('a') + i % 26) + name
+        i //= 26
+        if not i:
+            return f'label_{name}'
+
+
+def generate_program(lines=LINES, seed=0):
+    """ Random but valid .eas source with labels, variables and comments """
+    rng = random.Random(seed)
+    source = ['alloc buffer 16', ':start']
+    labels = ['start']
+    for i in range(lines):
+        choice = rng.randrange(8)
+        register = rng.choice(REGISTERS)
+        if choice == 0:
+            labels.append(label_name(i))
+            source.append(f':{label_name(i)}')
+        elif choice == 1:
+            source.append(f'move {register} {rng.randrange(2**16)}')
+        elif choice == 2:
+            source.append(f'add {register} {rng.choice(REGISTERS)}')
+        elif choice == 3:
+            source.append(f'move [{register}] [{rng.choice(REGISTERS)}]')
+        elif choice == 4:
+            source.append(f'move {register} buffer')
+        elif choice == 5:
+            source.append(f'inc {register}  % comment')
+        elif choice == 6:
+            source.append(f'jump_zero {rng.choice(labels)}')
+        else:
+            source.append(f'push {register}')
+    return '\n'.join(source) + '\n'
+
+
+def lex(source):
+    return Lexer().scan(source)
+
+
+def parse(tokens):
+    parser = Parser()
+    instructions = parser.parse(list(tokens))
+    return instructions, parser
+
+
+def run(min_time):
+    source = generate_program()
+    tokens = lex(source)
+    instructions, parser = parse(tokens)
+
+    return {'assembler.lexer': measure_total(lambda: lex(source), LINES, min_time),
+            'assembler.parser': measure_total(lambda: parse(tokens), LINES, min_time),
+            'assembler.linker': measure_total(lambda: link(list(instructions), parser.labels,
+                                                           parser.variables), LINES, min_time)}
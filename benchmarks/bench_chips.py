@@ -0,0 +1,132 @@
+"""
+Gates, ALU, RAM and hard disk, gate level vs optimized
+"""
+import random
+
+from bitarray import bitarray
+
+from computer.chips import logic_gates
+from computer.chips.optimized import logic_gates as optimized_logic_gates
+from computer.chips.arithmetic_logic_unit import ALU
+from computer.chips.optimized.arithmetic_logic_unit import ALU as optimized_ALU, memoized_ALU
+from computer.chips import memory
+from computer.chips.netlist import trace, optimize, compile_python
+from computer.chips.bit_sliced import batch_ALU, LANES
+from computer.chips.optimized import memory as optimized_memory
+from computer.io.harddisk import HardDisk
+from computer.utility.numbers import dec_to_bin
+
+from benchmarks.harness import measure, measure_total
+
+GATE_ARGUMENTS = {'NAND': (1, 1),
+                  'NOT': (1,),
+                  'AND': (1, 1),
+                  'OR': (1, 0),
+                  'XOR': (1, 0),
+                  'MUX': (1, 0, 1),
+                  'DMUX': (1, 1)}
+
+ALU_OPCODES = ['0000', '0001', '0010', '0011', '0100', '0101',
+               '1001', '1010', '1011', '1100', '1101', '1110', '1111']
+
+
+def bench_gates(min_time):
+    results = {}
+    for name, arguments in GATE_ARGUMENTS.items():
+        for variant, module in [('gate', logic_gates), ('optimized', optimized_logic_gates)]:
+            gate = getattr(module, name)
+            results[f'gates.{variant}.{name}'] = measure(lambda: gate(*arguments), min_time)
+    return results
+
+
+def bench_alu(min_time):
+    results = {}
+    a, b = 12345, 4321
+    a_bits, b_bits = dec_to_bin(a), dec_to_bin(b)
+    netlist_ALU = compile_python(optimize(trace(ALU, 16, 16, 4)), 'ALU')
+    for opcode in ALU_OPCODES:
+        opcode_bits = bitarray(opcode)
+        opcode_int = int(opcode, 2)
+        results[f'alu.gate.{opcode}'] = measure(lambda: ALU(a_bits, b_bits, opcode_bits), min_time)
+        results[f'alu.netlist.{opcode}'] = measure(lambda: netlist_ALU(a_bits, b_bits, opcode_bits), min_time)
+        results[f'alu.optimized.{opcode}'] = measure(lambda: optimized_ALU(a, b, opcode_int), min_time)
+        memoized_ALU(a, b, opcode_int)  # builds the unary table
+        results[f'alu.memoized.{opcode}'] = measure(lambda: memoized_ALU(a, b, opcode_int), min_time)
+
+    # Gate level ALU, one input per lane of the bit sliced backend
+    rng = random.Random(0)
+    inputs = [(rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(4)) for _ in range(LANES)]
+    a_values, b_values, opcodes = zip(*inputs)
+    results['alu.sliced'] = measure_total(lambda: batch_ALU(a_values, b_values, opcodes), LANES, min_time)
+    return results
+
+
+def bench_memory(min_time):
+    results = {}
+    value = dec_to_bin(0x1234)
+    address = dec_to_bin(1234)
+    ram_address = address[1:]
+
+    for variant, module in [('gate', memory), ('optimized', optimized_memory)]:
+        # Reads are of a written word, the gate level RAM tree is allocated
+        # lazily and reads of an unwritten part return zeros at the top
+        ram = module.RAM32K()
+        ram(value, ram_address, 1)
+        ram.tick()
+        results[f'memory.{variant}.RAM32K.read'] = measure(lambda: ram(value, ram_address, 0), min_time)
+
+        def write():
+            ram(value, ram_address, 1)
+            ram.tick()
+        results[f'memory.{variant}.RAM32K.write'] = measure(write, min_time)
+
+        combined = module.CombinedRAM()
+        combined(value, address, 1)
+        combined.tick()
+        results[f'memory.{variant}.CombinedRAM.read'] = measure(lambda: combined(value, address, 0), min_time)
+
+        def write_combined():
+            combined(value, address, 1)
+            combined.tick()
+        results[f'memory.{variant}.CombinedRAM.write'] = measure(write_combined, min_time)
+
+    combined = optimized_memory.CombinedRAM()
+    results['memory.optimized.CombinedRAM.read_int'] = measure(lambda: combined.read(1234), min_time)
+
+    def write_int():
+        combined.write(1234, 0x1234)
+        combined.tick()
+    results['memory.optimized.CombinedRAM.write_int'] = measure(write_int, min_time)
+    return results
+
+
+def bench_harddisk(min_time):
+    rng = random.Random(0)
+    hdd = HardDisk()
+    hdd.data = bitarray([rng.getrandbits(1) for _ in range(64 * 512)])
+    value = dec_to_bin(0x1234)
+    address = dec_to_bin(17)
+    sector = dec_to_bin(3)
+
+    def read():
+        hdd(address, 0, value, 0)
+        hdd.tick()
+
+    def write():
+        hdd(address, 0, value, 1)
+        hdd.tick()
+
+    def set_sector():
+        hdd(sector, 1, value, 0)
+        hdd.tick()
+
+    return {'harddisk.read': measure(read, min_time),
+            'harddisk.write': measure(write, min_time),
+            'harddisk.set_sector': measure(set_sector, min_time)}
+
+
+def run(min_time):
+    results = {}
+    for bench in [bench_gates, bench_alu, bench_memory, bench_harddisk]:
+        results.update(bench(min_time))
+    return results
@@ -0,0 +1,88 @@
+"""
+Instructions per second running the programs in benchmarks/programs
+"""
+import os
+import random
+from array import array
+
+from bitarray import bitarray
+
+from computer.assembler.lexer import Lexer
+from computer.assembler.parser import Parser
+from computer.assembler.linker import link
+from computer.chips.central_processing_unit import CPU
+from computer.chips.optimized.central_processing_unit import CPU as OptimizedCPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.emulator import Emulator
+from computer.io.harddisk import HardDisk
+from computer.utility.numbers import dec_to_bin
+
+from benchmarks.harness import measure_total
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), 'programs')
+
+# name, CPU, translate, cycles per measured run
+EMULATORS = [('gate', CPU, False, 100),
+             ('optimized', OptimizedCPU, False, 20000),
+             ('translated', OptimizedCPU, True, 200000)]
+
+
+def program_names():
+    return sorted(name[:-len('.eas')] for name in os.listdir(PROGRAMS) if name.endswith('.eas'))
+
+
+def assemble(name):
+    with open(os.path.join(PROGRAMS, f'{name}.eas')) as file:
+        source = file.read()
+    parser = Parser()
+    instructions = parser.parse(Lexer().scan(source))
+    return link(instructions, parser.labels, parser.variables, mode='boot')
+
+
+def make_emulator(instructions, cpu_type, translate):
+    # The gate level CPU accesses the HDD on every instruction, with any
+    # 16 bit address in sector 0
+    hdd = HardDisk()
+    hdd.data = bitarray(16 * 2**16)
+    emulator = Emulator(cpu_type(CombinedRAM(), hdd), translate=translate)
+    for i, instruction in enumerate(instructions):
+        emulator.cpu.ram(instruction, dec_to_bin(i), 1)
+    emulator.cpu.ram.tick()
+    return emulator
+
+
+def bench_program(instructions, cpu_type, translate, cycles, min_time):
+    """ Runs the program for cycles instructions, restarting it after shutdown """
+    emulator = make_emulator(instructions, cpu_type, translate)
+
+    def run():
+        remaining = cycles
+        while remaining:
+            remaining -= emulator.run(remaining).cycles
+            if emulator.shutdown:
+                emulator.reset()
+    return measure_total(run, cycles, min_time, repeat=1)
+
+
+def bench_snapshots(min_time):
+    """ Snapshot and restore of a machine with every word of RAM and screen in use """
+    emulator = make_emulator(assemble('screen'), OptimizedCPU, True)
+    emulator.run()
+    rng = random.Random(0)
+    emulator.cpu.ram.ram.words[:] = array('H', rng.randbytes(2 * 2**15))
+    data = emulator.snapshot()
+    return {'snapshot.take': measure_total(emulator.snapshot, 1, min_time),
+            'snapshot.restore': measure_total(lambda: emulator.restore(data), 1, min_time)}
+
+
+def run(min_time, scale=1.0):
+    """ :param scale: factor for the number of cycles per run """
+    results = {}
+    for name in program_names():
+        instructions = assemble(name)
+        for variant, cpu_type, translate, cycles in EMULATORS:
+            cycles = max(1, int(scale * cycles))
+            results[f'programs.{variant}.{name}'] = bench_program(instructions, cpu_type, translate,
+                                                                  cycles, min_time)
+    results.update(bench_snapshots(min_time))
+    return results
@@ -0,0 +1,74 @@
+"""
+Compares two benchmark result files
+
+    python -m benchmarks.compare old.json new.json --threshold 0.1
+
+Exits with 1 if a benchmark got slower by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+# Relative change in ns/op reported as regression or improvement
+THRESHOLD = 0.1
+
+
+def compare(old, new, threshold=THRESHOLD):
+    """
+    :param old: results dict, as written by benchmarks.run
+    :param new: results dict
+    :return: dict of regressions, improvements, unchanged, added, removed,
+             the first three as lists of (name, old ns/op, new ns/op, relative change)
+    """
+    old_results = old['results']
+    new_results = new['results']
+
+    comparison = {'regressions': [], 'improvements': [], 'unchanged': [],
+                  'added': sorted(set(new_results) - set(old_results)),
+                  'removed': sorted(set(old_results) - set(new_results))}
+    for name in sorted(set(old_results) & set(new_results)):
+        old_ns = old_results[name]['ns_per_op']
+        new_ns = new_results[name]['ns_per_op']
+        change = (new_ns - old_ns) / old_ns
+        if change > threshold:
+            category = 'regressions'
+        elif change < -threshold:
+            category = 'improvements'
+        else:
+            category = 'unchanged'
+        comparison[category].append((name, old_ns, new_ns, change))
+    return comparison
+
+
+def format_comparison(comparison):
+    lines = []
+    for category in ['regressions', 'improvements']:
+        lines.append(f'{category.capitalize()}: {len(comparison[category])}')
+        for name, old_ns, new_ns, change in comparison[category]:
+            lines.append(f'    {name:<45} {old_ns:12.1f} ns -> {new_ns:12.1f} ns  {100 * change:+7.1f}%')
+    lines.append(f"Unchanged: {len(comparison['unchanged'])}")
+    for category in ['added', 'removed']:
+        if comparison[category]:
+            lines.append(f"{category.capitalize()}: {', '.join(comparison[category])}")
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Compare benchmark results')
+    parser.add_argument('old', help='JSON results file')
+    parser.add_argument('new', help='JSON results file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown reported as regression')
+    args = parser.parse_args(args)
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    comparison = compare(old, new, args.threshold)
+    print(format_comparison(comparison))
+    return 1 if comparison['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
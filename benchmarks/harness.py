@@ -0,0 +1,44 @@
+import time
+
+# Seconds each measurement runs for, at least
+MIN_TIME = 0.2
+QUICK_MIN_TIME = 0.005
+
+
+def measure(function, min_time=MIN_TIME, repeat=3):
+    """
+    Time function() calls
+
+    The number of calls is doubled until one run takes min_time, the best
+    of repeat runs is reported.
+
+    :return: dict with ns_per_op and ops_per_second
+    """
+    number = 1
+    while True:
+        elapsed = run(function, number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    best = min([elapsed] + [run(function, number) for _ in range(repeat - 1)])
+    ns_per_op = 1e9 * best / number
+    return {'ns_per_op': ns_per_op, 'ops_per_second': 1e9 / ns_per_op}
+
+
+def measure_total(function, operations, min_time=MIN_TIME, repeat=3):
+    """
+    Time function(), which performs a known number of operations per call
+
+    :return: dict with ns_per_op and ops_per_second
+    """
+    result = measure(function, min_time, repeat)
+    ns_per_op = result['ns_per_op'] / operations
+    return {'ns_per_op': ns_per_op, 'ops_per_second': 1e9 / ns_per_op}
+
+
+def run(function, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
@@ -0,0 +1,70 @@
+"""
+Runs the benchmarks and writes the results as JSON
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --suites chips programs --compare results.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+
+from benchmarks import bench_chips, bench_assembler, bench_programs
+from benchmarks.compare import compare, format_comparison, THRESHOLD
+from benchmarks.harness import MIN_TIME, QUICK_MIN_TIME
+
+SUITES = {'chips': bench_chips.run,
+          'assembler': bench_assembler.run,
+          'programs': bench_programs.run}
+
+
+def run_benchmarks(suites=tuple(SUITES), quick=False, log=None):
+    """
+    :param quick: short measurements, for checking the benchmarks work
+    :return: dict with meta data and results, name -> {ns_per_op, ops_per_second}
+    """
+    min_time = QUICK_MIN_TIME if quick else MIN_TIME
+    results = {}
+    for suite in suites:
+        if log is not None:
+            log(f'>> Running {suite}')
+        if suite == 'programs' and quick:
+            results.update(bench_programs.run(min_time, scale=0.01))
+        else:
+            results.update(SUITES[suite](min_time))
+    return {'meta': {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                     'python': platform.python_version(),
+                     'implementation': platform.python_implementation(),
+                     'machine': platform.machine(),
+                     'quick': quick},
+            'results': results}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run the benchmarks')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON results file')
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--quick', action='store_true', help='short measurements')
+    parser.add_argument('--compare', help='earlier results file to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown reported as regression')
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(args.suites, args.quick, log=print)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print(f'>> Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)
+        comparison = compare(old, results, args.threshold)
+        print(format_comparison(comparison))
+        if comparison['regressions']:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from computer.chips.optimized.central_processing_unit import CPU
+
+from benchmarks import bench_assembler, bench_programs
+from benchmarks.compare import compare, main as compare_main
+from benchmarks.run import run_benchmarks, main as run_main
+
+
+class TestPrograms:
+    results = [('sum', 2000, 500500 & 0xFFFF),
+               ('fibonacci', 2000, 377),
+               ('memcopy', 16384 + 4095, 0),
+               ('screen', 32768 + 8191, 1)]
+
+    def test_all_programs_checked(self):
+        assert sorted(name for name, _, _ in self.results) == bench_programs.program_names()
+
+    @pytest.mark.parametrize('name, address, expected', results)
+    def test_program(self, name, address, expected):
+        emulator = bench_programs.make_emulator(bench_programs.assemble(name), CPU, True)
+
+        assert emulator.run(max_cycles=10**6).reason == 'shutdown'
+        assert emulator.cpu.read(address) == expected
+
+
+def test_generated_program_assembles():
+    source = bench_assembler.generate_program(500)
+    instructions, parser = bench_assembler.parse(bench_assembler.lex(source))
+
+    assert len(parser.labels) > 10
+    assert len(instructions) > 500
+
+
+def results(**ns_per_op):
+    return {'results': {name: {'ns_per_op': ns} for name, ns in ns_per_op.items()}}
+
+
+class TestCompare:
+    def test_compare(self):
+        old = results(a=100, b=100, c=100, removed=1)
+        new = results(a=120, b=80, c=105, added=1)
+
+        comparison = compare(old, new, threshold=0.1)
+
+        assert [name for name, *_ in comparison['regressions']] == ['a']
+        assert [name for name, *_ in comparison['improvements']] == ['b']
+        assert [name for name, *_ in comparison['unchanged']] == ['c']
+        assert comparison['added'] == ['added']
+        assert comparison['removed'] == ['removed']
+
+    def test_cli_exit_code(self, tmp_path):
+        old_path, new_path = tmp_path / 'old.json', tmp_path / 'new.json'
+        old_path.write_text(json.dumps(results(a=100)))
+        new_path.write_text(json.dumps(results(a=200)))
+
+        assert compare_main([str(old_path), str(new_path)]) == 1
+        assert compare_main([str(old_path), str(old_path)]) == 0
+
+
+def test_run_quick(tmp_path):
+    output = tmp_path / 'results.json'
+
+    assert run_main(['--quick', '--suites', 'assembler', '--output', str(output)]) == 0
+
+    written = json.loads(output.read_text())
+    assert written['meta']['quick']
+    assert set(written['results']) == {'assembler.lexer', 'assembler.parser', 'assembler.linker'}
+    assert run_main(['--quick', '--suites', 'assembler', '--output', str(output),
+                     '--compare', str(output), '--threshold', '100']) == 0
@@ -44,6 +44,7 @@ class Parser:
     def __init__(self, debug=False):
         self.tokens = None
         self.instructions = []
+        self.lines = []  # source line of every instruction word
         self.debug = debug
 
         self.labels = {}
@@ -53,10 +54,12 @@ class Parser:
     def parse(self, tokens):
         self.tokens = tokens
         while self.tokens:
+            line = self.tokens[0].line
             instruction = self.parse_next_instruction()
             if self.debug:
                 print(instruction)
             self.instructions.extend(instruction)
+            self.lines.extend([line] * len(instruction))
         self.check_labels()
         return self.instructions
 
@@ -347,6 +347,14 @@ class TestParser:
         assert instructions == [move_opcode + sp_address + constant_address,
                                 base_pointer_address]
 
+    def test_lines(self, parser):
+        tokens = [Token(Keyword.Move, 'move', 1), token_a, Token(Literal.Int, 5, 1),
+                  Token(Delimiter.Colon, ':', 2), Token(Label.Name, 'loop', 2),
+                  Token(Keyword.Add, 'add', 3), token_a, token_b,
+                  Token(Keyword.Jump, 'jump', 4), Token(Label.Name, 'loop', 4)]
+        parser.parse(tokens)
+        assert parser.lines == [1, 1, 3, 4, 4]
+
     msg_invalid_syntax = [['Double right brackets', [token_move, token_a, token_right_bracket,
                                                      token_b, token_right_bracket]],
                           ['double left brackets', [token_move, token_a, token_left_bracket,
@@ -0,0 +1,159 @@
+"""
+Runs emulator jobs, e.g. regression scenarios, across a process pool
+
+    python -m computer.batch jobs.json --workers 8
+
+jobs.json holds a list of jobs:
+    [{"name": "ball", "binary": "ball.bin", "hdd_image": "test.bin",
+      "max_cycles": 1000000, "keyboard_script": [[5000, 32]], "timeout": 60}]
+
+Every finished job prints one JSON line with its cycle count, stop
+reason and the digests of the final registers and RAM.
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bitarray import bitarray
+
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.emulator import Emulator, MAX_CYCLES, UNTIL
+from computer.io.harddisk import HardDisk, MappedHardDisk, OverlayHardDisk
+
+# Stop reasons, besides the ones of Emulator.run
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+# Number of cycles between timeout checks
+CHECK_EVERY = 4096
+
+
+class Job(namedtuple('Job', ('name', 'binary', 'hdd_image', 'max_cycles',
+                             'keyboard_script', 'timeout'))):
+    """
+    binary: bitarray or path of a file, loaded to RAM address 0
+    hdd_image: bitarray, path of a file or None
+    max_cycles: cycle budget, None to run until shutdown
+    keyboard_script: list of (cycle, key), the keyboard register is set
+                     to key before executing that cycle
+    timeout: seconds of wall time, None for no limit
+    """
+    def __new__(cls, name, binary, hdd_image=None, max_cycles=None, keyboard_script=(), timeout=None):
+        return super().__new__(cls, name, binary, hdd_image, max_cycles,
+                               sorted(keyboard_script), timeout)
+
+
+JobResult = namedtuple('JobResult', ('name', 'cycles', 'reason', 'registers',
+                                     'register_digest', 'ram_digest', 'error'))
+
+
+def load_bits(data):
+    if data is None:
+        return bitarray()
+    if isinstance(data, bitarray):
+        return data
+    bits = bitarray()
+    with open(data, 'rb') as file:
+        bits.fromfile(file)
+    return bits
+
+
+def make_job_emulator(job):
+    if isinstance(job.hdd_image, str) and os.path.getsize(job.hdd_image):
+        # Jobs on the same image share its pages, writes stay private
+        hdd = MappedHardDisk(job.hdd_image, 'c')
+    elif isinstance(job.hdd_image, bitarray):
+        # Jobs on the same image share it, writes stay private
+        hdd = OverlayHardDisk(job.hdd_image)
+    else:
+        hdd = HardDisk()
+        hdd.data = load_bits(job.hdd_image)
+    emulator = Emulator(CPU(CombinedRAM(), hdd), translate=True)
+    emulator.load_binary(load_bits(job.binary))
+    return emulator
+
+
+def run_job(job):
+    """ Run one job to shutdown, its cycle budget or its timeout """
+    emulator = make_job_emulator(job)
+    try:
+        return _run_job(job, emulator)
+    finally:
+        if isinstance(emulator.cpu.hdd, MappedHardDisk):
+            emulator.cpu.hdd.close()
+
+
+def _run_job(job, emulator):
+    cpu = emulator.cpu
+    keyboard = cpu.ram.keyboard
+
+    until = None
+    if job.timeout is not None:
+        deadline = time.monotonic() + job.timeout
+
+        def until(_emulator):
+            return time.monotonic() > deadline
+
+    events = list(job.keyboard_script)
+    cycles = 0
+    error = None
+    try:
+        while True:
+            while events and events[0][0] <= cycles:
+                keyboard.word = keyboard.next_word = events.pop(0)[1]
+
+            # Stop at the next keyboard event to set it on the exact cycle
+            budget = None if job.max_cycles is None else job.max_cycles - cycles
+            if events and (budget is None or events[0][0] - cycles < budget):
+                budget = events[0][0] - cycles
+
+            result = emulator.run(budget, until=until, check_every=CHECK_EVERY)
+            cycles += result.cycles
+            if result.reason != MAX_CYCLES or cycles == job.max_cycles:
+                reason = TIMEOUT if result.reason == UNTIL else result.reason
+                break
+    except Exception as e:
+        reason = ERROR
+        error = f'{type(e).__name__}: {e}'
+
+    registers = {'a': cpu.a.word, 'b': cpu.b.word, 'c': cpu.c.word, 'd': cpu.d.word,
+                 'sp': cpu.sp.word, 'pc': cpu.pc.register.word, 'status': cpu.status.word}
+    register_digest = hashlib.sha256(struct.pack('>7H', *registers.values())).hexdigest()
+    ram_digest = hashlib.sha256(cpu.ram.ram.bits.tobytes()).hexdigest()
+    return JobResult(job.name, cycles, reason, registers, register_digest, ram_digest, error)
+
+
+def run_batch(jobs, workers=None):
+    """
+    Run jobs in a process pool
+
+    :param workers: number of processes, default one per CPU core
+    :return: list of JobResult, in the order of the jobs
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs))
+
+
+def load_jobs(file_path):
+    with open(file_path) as file:
+        return [Job(**job) for job in json.load(file)]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run emulator jobs in parallel')
+    parser.add_argument('jobs', help='JSON file with a list of jobs')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    args = parser.parse_args(args)
+
+    for result in run_batch(load_jobs(args.jobs), args.workers):
+        print(json.dumps(result._asdict()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Incremental checkpoints of a running Emulator
+
+    checkpoints = Checkpoints(emulator)
+    checkpoints.run(every=10000)  # or checkpoints.take() when wanted
+    checkpoints.restore(3)
+
+The first checkpoint holds every page of RAM and screen which isn't all
+zeros, each later one only the pages written since the checkpoint before
+it, found from the dirty_pages of the RAMs in
+computer.chips.optimized.memory. Together they form a delta chain, a page
+at some checkpoint is its latest copy at or before it. collapse merges
+checkpoints of the chain, dropping the pages overwritten in between.
+
+HDD sectors form a chain the same way: the first checkpoint holds the
+sectors written since the image was loaded, see HardDisk.written_sectors,
+each later one the sectors in the dirty_sectors of the hard disk. A
+sector in no checkpoint up to some checkpoint is as loaded there.
+Registers are saved whole in every checkpoint.
+"""
+from array import array
+from collections import namedtuple
+
+from computer.chips.optimized.memory import PAGE_SHIFT, PAGE_WORDS
+from computer.io.harddisk import SectorCache
+from computer import snapshot
+
+# Page numbers run over the address space, screen pages follow the RAM pages
+SCREEN_PAGE = 0x8000 >> PAGE_SHIFT
+ZERO_PAGE = array('H', bytes(2 * PAGE_WORDS))
+
+
+class Checkpoint(namedtuple('Checkpoint', ('cycles', 'shutdown', 'registers', 'pages', 'hdd'))):
+    """
+    registers: words as in computer.snapshot.register_file_words
+    pages: dict page -> array('H') of its words
+    hdd: dict sector -> bitarray of its bits
+    """
+
+
+class Checkpoints:
+    """
+    Delta chain of checkpoints of an emulator with an int word RAM, like
+    computer.chips.optimized.memory.CombinedRAM
+
+    :param limit: number of checkpoints kept at most, the oldest two are
+                  collapsed when a checkpoint is taken past it
+    """
+    def __init__(self, emulator, limit=None):
+        ram = emulator.cpu.ram
+        if not hasattr(ram, 'screen') or not hasattr(ram.ram, 'dirty_pages'):
+            raise TypeError('Checkpoints need a RAM tracking its dirty pages, like the optimized CombinedRAM')
+        if limit is not None and limit < 2:
+            raise ValueError(f'Limit must be at least 2, is {limit}')
+        self.emulator = emulator
+        self.limit = limit
+        self.memories = [(0, ram.ram), (SCREEN_PAGE, ram.screen)]
+        self.checkpoints = []
+
+    def __len__(self):
+        return len(self.checkpoints)
+
+    def __getitem__(self, index):
+        return self.checkpoints[index]
+
+    @property
+    def page_count(self):
+        """ Pages stored over all checkpoints """
+        return sum(len(checkpoint.pages) for checkpoint in self.checkpoints)
+
+    @property
+    def sector_count(self):
+        """ HDD sectors stored over all checkpoints """
+        return sum(len(checkpoint.hdd) for checkpoint in self.checkpoints)
+
+    def hard_disk(self):
+        """
+        :return: the hard disk of the emulator, None when it doesn't track
+                 its written sectors. A SectorCache is written back to the
+                 hard disk under it.
+        """
+        hdd = self.emulator.cpu.hdd
+        if isinstance(hdd, SectorCache):
+            hdd.write_back()
+            hdd = hdd.hdd
+        return hdd if hasattr(hdd, 'dirty_sectors') else None
+
+    def take(self):
+        """ :return: the new Checkpoint of the current state """
+        first = not self.checkpoints
+        pages = {}
+        for first_page, memory in self.memories:
+            words = memory.words
+            if first:
+                dirty = range(len(words) // PAGE_WORDS)
+            else:
+                dirty = memory.dirty_pages
+            for page in dirty:
+                start = page << PAGE_SHIFT
+                page_words = words[start:start + PAGE_WORDS]
+                if not first or page_words != ZERO_PAGE:
+                    pages[first_page + page] = page_words
+            memory.dirty_pages.clear()
+
+        sectors = {}
+        hdd = self.hard_disk()
+        if hdd is not None:
+            written = hdd.written_sectors if first else hdd.dirty_sectors
+            sectors = {sector: hdd.read_sector(sector) for sector in written}
+            hdd.dirty_sectors.clear()
+
+        emulator = self.emulator
+        checkpoint = Checkpoint(emulator.cycles, emulator.shutdown,
+                                snapshot.register_file_words(emulator.cpu), pages, sectors)
+        self.checkpoints.append(checkpoint)
+        if self.limit is not None and len(self.checkpoints) > self.limit:
+            self.collapse(0, 1)
+        return checkpoint
+
+    def run(self, every, max_cycles=None):
+        """
+        Run the emulator, taking a checkpoint every `every` cycles, or at
+        the end of the first translated block after them
+
+        :return: computer.emulator.RunResult
+        """
+        def take(emulator):
+            self.take()
+            return False
+        return self.emulator.run(max_cycles, until=take, check_every=every)
+
+    def page_at(self, page, index):
+        """ :return: words of page at checkpoint index, None when all zeros """
+        for checkpoint in reversed(self.checkpoints[:index + 1]):
+            words = checkpoint.pages.get(page)
+            if words is not None:
+                return words
+        return None
+
+    def sector_at(self, sector, index):
+        """ :return: bits of HDD sector at checkpoint index, None when as loaded """
+        for checkpoint in reversed(self.checkpoints[:index + 1]):
+            bits = checkpoint.hdd.get(sector)
+            if bits is not None:
+                return bits
+        return None
+
+    def restore(self, index=-1):
+        """
+        Continue from checkpoint index, the checkpoints after it are dropped
+
+        Only the pages and HDD sectors written since the checkpoint are
+        copied back.
+        :return: the Checkpoint
+        """
+        index = range(len(self.checkpoints))[index]
+        self.truncate(index)
+        checkpoint = self.checkpoints[index]
+
+        for first_page, memory in self.memories:
+            pages = list(memory.dirty_pages)
+            for page in pages:
+                start = page << PAGE_SHIFT
+                words = self.page_at(first_page + page, index)
+                memory.words[start:start + PAGE_WORDS] = ZERO_PAGE if words is None else words
+            memory.next = []
+            memory.replaced(pages)
+            memory.dirty_pages.clear()
+
+        emulator = self.emulator
+        hdd = self.hard_disk()
+        if hdd is not None:
+            if isinstance(emulator.cpu.hdd, SectorCache):
+                emulator.cpu.hdd.clear()
+            for sector in list(hdd.dirty_sectors):
+                bits = self.sector_at(sector, index)
+                if bits is None:
+                    hdd.revert_sector(sector)
+                else:
+                    hdd.write_sector(sector, bits)
+            hdd.dirty_sectors.clear()
+
+        snapshot.set_register_file_words(emulator.cpu, checkpoint.registers)
+        emulator.cycles = checkpoint.cycles
+        emulator.shutdown = checkpoint.shutdown
+        emulator.drop_cached_code()
+        return checkpoint
+
+    def clear(self):
+        """ Drop all checkpoints, the next one holds every page again """
+        self.checkpoints.clear()
+
+    def truncate(self, index):
+        """ Drop the checkpoints after index, their pages and sectors count as written since it """
+        hdd = self.hard_disk()
+        for later in self.checkpoints[index + 1:]:
+            for page in later.pages:
+                first_page, memory = self.memories[page >= SCREEN_PAGE]
+                memory.dirty_pages.add(page - first_page)
+            if hdd is not None:
+                hdd.dirty_sectors.update(later.hdd)
+        del self.checkpoints[index + 1:]
+
+    def collapse(self, first=0, last=-1):
+        """
+        Merge the checkpoints first to last into one at the state of last
+
+        :return: the merged Checkpoint
+        """
+        first = range(len(self.checkpoints))[first]
+        last = range(len(self.checkpoints))[last]
+        pages = {}
+        sectors = {}
+        for checkpoint in self.checkpoints[first:last + 1]:
+            pages.update(checkpoint.pages)
+            sectors.update(checkpoint.hdd)
+        merged = self.checkpoints[last]._replace(pages=pages, hdd=sectors)
+        self.checkpoints[first:last + 1] = [merged]
+        return merged
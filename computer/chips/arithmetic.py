@@ -1,5 +1,4 @@
-from bitarray import bitarray
-from computer.chips.logic_gates import XOR, AND, OR, NOT
+from computer.chips.logic_gates import XOR, AND, OR, NOT, chip, make_bits
 
 
 def half_adder(a, b):
@@ -15,8 +14,9 @@ def full_adder(a, b, c):
     return sum_abc, carry
 
 
+@chip
 def ADD16(a, b):
-    out = bitarray(16)
+    out = make_bits(16)
 
     out[-1], carry = half_adder(a[-1], b[-1])
     for i in range(2, 17):
@@ -24,8 +24,9 @@ def ADD16(a, b):
     return out, carry
 
 
+@chip
 def INC16(a):
-    out = bitarray(16)
+    out = make_bits(16)
 
     out[-1] = NOT(a[-1])
     carry = a[-1]
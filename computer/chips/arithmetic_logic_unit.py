@@ -1,12 +1,11 @@
-from bitarray import bitarray
-
-from computer.chips.logic_gates import NOT, AND, OR, MUX
+from computer.chips.logic_gates import NOT, AND, OR, MUX, chip
 from computer.chips.logic_gates_16bit import NOT16, AND16, OR16, XOR16
 from computer.chips.logic_gates_multi_way import OR8WAY, MUX16, MUX4WAY16
 
 from computer.chips.arithmetic import INC16, ADD16
 
 
+@chip
 def ALU(a, b, opcode):
     """
     :param a: INT16
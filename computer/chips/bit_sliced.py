@@ -0,0 +1,93 @@
+"""
+Bit sliced evaluation of the gate level chips on Python ints
+
+Every signal is an int with one bit per lane, bit j is the signal in
+lane j, so one evaluation of a chip computes it for all lanes at once:
+
+    a, b = pack(a_values, 16), pack(b_values, 16)
+    with use_backend(BitSlicedBackend(len(a_values))):
+        out, carry = ADD16(a, b)
+    sums = unpack(out, len(a_values))
+
+Constant 0 inputs are the same in every lane, constant 1 inputs have to
+be given as the mask of all lanes. The ALU and the chips it is built
+from only use constant 0s.
+"""
+from bitarray import bitarray
+
+from computer.chips.logic_gates import Backend, use_backend
+from computer.chips.arithmetic_logic_unit import ALU
+
+LANES = 64
+
+
+class BitSlicedBackend(Backend):
+    """ Backend on lane words, multi bit values are lists of lane words """
+    def __init__(self, lanes=LANES):
+        self.lanes = lanes
+        self.mask = mask = (1 << lanes) - 1
+
+        def NAND(a, b):
+            return (a & b) ^ mask
+        self.NAND = NAND
+
+    @staticmethod
+    def make_bits(length):
+        return [0] * length
+
+    @staticmethod
+    def bits_from(values):
+        return list(values)
+
+
+def pack(values, width):
+    """
+    :param values: ints, one per lane
+    :return: list of width lane words, the most significant bit first
+    """
+    words = []
+    for shift in range(width - 1, -1, -1):
+        bits = bitarray([value >> shift & 1 for value in values], endian='little')
+        words.append(int.from_bytes(bits.tobytes(), 'little'))
+    return words
+
+
+def unpack(words, lanes):
+    """
+    :return: list of ints, one per lane, from lane words as made by pack,
+             the bits above the first lanes are ignored
+    """
+    values = [0] * lanes
+    mask = (1 << lanes) - 1
+    for word in words:
+        bits = bitarray(endian='little')
+        bits.frombytes((word & mask).to_bytes((lanes + 7) // 8, 'little'))
+        values = [value << 1 | bit for value, bit in zip(values, bits)]
+    return values
+
+
+def unpack_bit(word, lanes):
+    """ :return: list of 0 and 1, one per lane """
+    return unpack([word], lanes)
+
+
+def batch_ALU(a_values, b_values, opcodes, lanes=LANES):
+    """
+    Gate level ALU for many inputs, evaluated lanes inputs at a time
+
+    :return: list of (out, is_zero, is_neg, carry) as ints, like
+             computer.chips.optimized.arithmetic_logic_unit.ALU
+    """
+    results = []
+    backend = BitSlicedBackend(lanes)
+    with use_backend(backend):
+        for start in range(0, len(a_values), lanes):
+            a = pack(a_values[start:start + lanes], 16)
+            b = pack(b_values[start:start + lanes], 16)
+            opcode = pack(opcodes[start:start + lanes], 4)
+            count = len(a_values[start:start + lanes])
+
+            out, is_zero, is_neg, carry = ALU(a, b, opcode)
+            results += zip(unpack(out, count), unpack_bit(is_zero, count),
+                           unpack_bit(is_neg, count), unpack_bit(carry, count))
+    return results
@@ -1,11 +1,11 @@
 from bitarray import bitarray
 
-from computer.chips.logic_gates import NOT, AND, OR, MUX, DMUX
+from computer.chips.logic_gates import NOT, AND, OR, MUX, DMUX, chip, make_bits
 from computer.chips.logic_gates_16bit import NOT16
 from computer.chips.logic_gates_multi_way import OR8WAY, MUX16, MUX4WAY16, MUX8WAY16, DMUX4WAY, DMUX8WAY
 from computer.chips.arithmetic import INC16
 from computer.chips.arithmetic_logic_unit import ALU
-from computer.chips.memory import Register, PC
+from computer.chips.memory import Register, RegisterFile, PC
 
 ZERO_ADDRESS = bitarray('0'*16)
 NULL_ADDRESS = bitarray(16)
@@ -117,16 +117,20 @@ class CPU:
         self.ram = ram
         self.hdd = hdd
 
-        self.a = Register()
-        self.b = Register()
-        self.c = Register()
-        self.d = Register()
+        # Committed together on tick
+        self.registers = RegisterFile()
 
-        self.sp = Register()
-        self.pc = PC()
+        self.a = Register(self.registers)
+        self.b = Register(self.registers)
+        self.c = Register(self.registers)
+        self.d = Register(self.registers)
 
-        self.status = Register()
+        self.sp = Register(self.registers)
+        self.pc = PC(self.registers)
 
+        self.status = Register(self.registers)
+
+    @chip
     def __call__(self, reset=0):
         pc_value = self.pc(NULL_ADDRESS, 0, 0, 0)
         instruction = self.ram_bus(NULL_ADDRESS, pc_value, 0)
@@ -191,7 +195,7 @@ class CPU:
         result_source_alu = MUX16(source_value, alu_result, opcode[0])
         result = MUX16(result_source_alu, hdd_out, is_hdd)
 
-        status = bitarray('0'*16)
+        status = make_bits(16)
         status[0] = is_zero
         status[1] = is_neg
         status[2] = overflow
@@ -255,15 +259,7 @@ class CPU:
         return self.ram(value, address, load)
 
     def tick(self):
-        self.a.tick()
-        self.b.tick()
-        self.c.tick()
-        self.d.tick()
-
-        self.sp.tick()
-        self.pc.tick()
-
-        self.status.tick()
+        self.registers.tick()
 
         self.ram.tick()
         self.hdd.tick()
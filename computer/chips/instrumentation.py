@@ -0,0 +1,190 @@
+"""
+Counts the NAND gates evaluated by the gate level chips
+
+    counter = GateCounter(cpu)  # computer.chips.central_processing_unit.CPU
+    counter.run(1000)
+    print(counter.report())
+
+CountingBackend is a computer.chips.logic_gates backend, it counts every
+NAND and attributes it to the chips marked with @chip (ALU, ADD16, INC16,
+MUX8WAY16, DMUX8WAY, RAM8 and CPU). It is only active inside
+GateCounter.tick, the chips run on the default backend otherwise.
+"""
+from computer.chips.logic_gates import Backend, use_backend
+from computer.utility.numbers import bin_to_dec
+from computer.utility.profiler import NULL, CLASSES, CLASS_OF
+
+
+class Signal(int):
+    """ 0 or 1, with the number of NAND gates on the longest path to it """
+    def __new__(cls, value, depth):
+        signal = super().__new__(cls, value)
+        signal.depth = depth
+        return signal
+
+
+def max_depth(value):
+    """ Deepest signal of a signal or of nested lists and tuples of signals """
+    if type(value) is Signal:
+        return value.depth
+    if isinstance(value, (list, tuple)):
+        return max((max_depth(item) for item in value), default=0)
+    return 0
+
+
+class ChipCount:
+    """
+    calls: number of evaluations of the chip
+    nands: NAND gates evaluated, including those of the chips it uses
+    depth: longest NAND path from the inputs to the outputs
+    call_depth: deepest nesting of the chip in the chip hierarchy, 1 when
+                it is used directly
+    """
+    __slots__ = ('calls', 'nands', 'depth', 'call_depth')
+
+    def __init__(self, calls=0, nands=0, depth=0, call_depth=0):
+        self.calls = calls
+        self.nands = nands
+        self.depth = depth
+        self.call_depth = call_depth
+
+    def add(self, other):
+        self.calls += other.calls
+        self.nands += other.nands
+        self.depth = max(self.depth, other.depth)
+        self.call_depth = max(self.call_depth, other.call_depth)
+
+    def __eq__(self, other):
+        return isinstance(other, ChipCount) and \
+            (self.calls, self.nands, self.depth, self.call_depth) == \
+            (other.calls, other.nands, other.depth, other.call_depth)
+
+    def __repr__(self):
+        return f'ChipCount(calls={self.calls}, nands={self.nands}, ' \
+               f'depth={self.depth}, call_depth={self.call_depth})'
+
+
+class CountingBackend(Backend):
+    """
+    Backend on Signal values, multi bit values are lists
+
+    nands: NAND gates evaluated since the last reset
+    counts: dict chip name -> ChipCount
+    critical_path: longest NAND path to a value stored in a register
+    """
+    def __init__(self):
+        self.chip_stack = []
+        self.reset()
+
+    def reset(self):
+        self.nands = 0
+        self.counts = {}
+        self.critical_path = 0
+
+    def NAND(self, a, b):
+        self.nands += 1
+        depth = max(getattr(a, 'depth', 0), getattr(b, 'depth', 0)) + 1
+        if a and b:
+            return Signal(0, depth)
+        return Signal(1, depth)
+
+    @staticmethod
+    def make_bits(length):
+        return [0] * length
+
+    @staticmethod
+    def bits_from(values):
+        return list(values)
+
+    def latch(self, bits):
+        # Paths end and start again at the registers
+        self.critical_path = max(self.critical_path, max_depth(bits))
+        return [int(bit) for bit in bits]
+
+    def call_chip(self, name, chip_function, args, kwargs):
+        start = self.nands
+        input_depth = max(max_depth(args), max_depth(tuple(kwargs.values())))
+
+        self.chip_stack.append(name)
+        try:
+            out = chip_function(*args, **kwargs)
+        finally:
+            self.chip_stack.pop()
+
+        count = self.counts.get(name)
+        if count is None:
+            count = self.counts[name] = ChipCount()
+        count.add(ChipCount(1, self.nands - start, max(0, max_depth(out) - input_depth),
+                            len(self.chip_stack) + 1))
+        return out
+
+
+class GateCounter:
+    """
+    Runs a gate level CPU with the CountingBackend, one tick at a time,
+    and sums the counts of the ticks per instruction class
+    (computer.utility.profiler.CLASSES)
+
+    ticks: number of ticks per instruction class
+    class_counts: per instruction class, dict chip name -> ChipCount
+    critical_paths: per instruction class, the longest critical path
+    """
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.backend = CountingBackend()
+        self.shutdown = False
+        self.reset()
+
+    def reset(self):
+        self.ticks = [0] * len(CLASSES)
+        self.class_counts = [{} for _ in CLASSES]
+        self.critical_paths = [0] * len(CLASSES)
+
+    def tick(self):
+        """ :return: dict chip name -> ChipCount of this tick """
+        pc = self.cpu.pc.register.value
+        instruction = bin_to_dec(self.cpu.ram_bus(NULL, pc, 0))
+        instruction_class = CLASS_OF[instruction >> 8]
+
+        backend = self.backend
+        backend.reset()
+        with use_backend(backend):
+            self.shutdown = bool(self.cpu())
+            self.cpu.tick()
+
+        self.ticks[instruction_class] += 1
+        self.critical_paths[instruction_class] = max(self.critical_paths[instruction_class],
+                                                     backend.critical_path)
+        totals = self.class_counts[instruction_class]
+        for name, count in backend.counts.items():
+            totals.setdefault(name, ChipCount()).add(count)
+        return backend.counts
+
+    def run(self, max_cycles=None):
+        """ Tick until shutdown or for max_cycles ticks, :return: ticks run """
+        cycles = 0
+        while not self.shutdown and (max_cycles is None or cycles < max_cycles):
+            self.tick()
+            cycles += 1
+        return cycles
+
+    def totals(self):
+        """ :return: dict chip name -> ChipCount over all instruction classes """
+        totals = {}
+        for counts in self.class_counts:
+            for name, count in counts.items():
+                totals.setdefault(name, ChipCount()).add(count)
+        return totals
+
+    def report(self):
+        """ NAND gates per tick of each chip, per instruction class """
+        report = [f'{"chip":<12} {"calls/tick":>10} {"NANDs/tick":>12} {"depth":>6} {"call depth":>10}']
+        classes = [item for item in zip(CLASSES, self.ticks, self.class_counts, self.critical_paths)
+                   if item[1]]
+        classes.append(('all', sum(self.ticks), self.totals(), max(self.critical_paths)))
+        for class_name, ticks, counts, critical_path in classes:
+            report += ['', f'{class_name}: {ticks} ticks, critical path {critical_path} NANDs']
+            for name, count in sorted(counts.items(), key=lambda item: -item[1].nands):
+                report.append(f'{name:<12} {count.calls / ticks:>10.2f} {count.nands / ticks:>12.1f} '
+                              f'{count.depth:>6} {count.call_depth:>10}')
+        return '\n'.join(report)
@@ -1,10 +1,87 @@
+from contextlib import contextmanager
+from functools import wraps
+
 from bitarray import bitarray
+from bitarray.util import zeros
+
+
+class Backend:
+    """
+    Evaluates the NAND gates all other gates are built from
+
+    The default backend works on 0/1 ints, multi bit values are bitarrays.
+    Other backends (e.g. computer.chips.instrumentation) can use their own
+    signal values, the chips build their outputs with make_bits and
+    bits_from so the backend decides the container type.
+    """
+    @staticmethod
+    def NAND(a, b):
+        if a and b:
+            return 0
+        return 1
+
+    @staticmethod
+    def make_bits(length):
+        return zeros(length)
+
+    @staticmethod
+    def bits_from(values):
+        return bitarray(values)
+
+    @staticmethod
+    def latch(bits):
+        """ Value stored in a register on tick """
+        return bits.copy()
+
+    @staticmethod
+    def call_chip(name, chip_function, args, kwargs):
+        """ Called for the chips marked with @chip """
+        return chip_function(*args, **kwargs)
+
+
+DEFAULT_BACKEND = Backend()
+backend = DEFAULT_BACKEND
+NAND = backend.NAND
+
+
+def set_backend(new_backend):
+    """ :return: the previous backend """
+    global backend, NAND
+    previous = backend
+    backend = new_backend
+    NAND = new_backend.NAND
+    return previous
+
+
+@contextmanager
+def use_backend(new_backend):
+    previous = set_backend(new_backend)
+    try:
+        yield new_backend
+    finally:
+        set_backend(previous)
+
+
+def make_bits(length):
+    return backend.make_bits(length)
+
+
+def bits_from(values):
+    return backend.bits_from(values)
+
+
+def latch(bits):
+    return backend.latch(bits)
+
 
+def chip(chip_function):
+    """ Marks a chip, so backends can attribute the gates evaluated by it """
+    name = chip_function.__qualname__.split('.')[0]
 
-def NAND(a, b):
-    if a and b:
-        return 0
-    return 1
+    @wraps(chip_function)
+    def call(*args, **kwargs):
+        return backend.call_chip(name, chip_function, args, kwargs)
+    return call
 
 
 def NOT(a):
@@ -28,4 +105,4 @@ def MUX(a, b, sel):
 
 
 def DMUX(a, sel):
-    return bitarray((AND(a, NOT(sel)), AND(a, sel)))
+    return bits_from((AND(a, NOT(sel)), AND(a, sel)))
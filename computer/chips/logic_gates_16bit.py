@@ -1,9 +1,8 @@
-from bitarray import bitarray
-from computer.chips.logic_gates import NOT, AND, OR, XOR, MUX
+from computer.chips.logic_gates import NOT, AND, OR, XOR, MUX, make_bits
 
 
 def NOT16(a):
-    out = bitarray(16)
+    out = make_bits(16)
 
     for i in range(16):
         out[i] = NOT(a[i])
@@ -11,7 +10,7 @@ def NOT16(a):
 
 
 def AND16(a, b):
-    out = bitarray(16)
+    out = make_bits(16)
 
     for i in range(16):
         out[i] = AND(a[i], b[i])
@@ -19,7 +18,7 @@ def AND16(a, b):
 
 
 def OR16(a, b):
-    out = bitarray(16)
+    out = make_bits(16)
 
     for i in range(16):
         out[i] = OR(a[i], b[i])
@@ -27,7 +26,7 @@ def OR16(a, b):
 
 
 def XOR16(a, b):
-    out = bitarray(16)
+    out = make_bits(16)
 
     for i in range(16):
         out[i] = XOR(a[i], b[i])
@@ -35,7 +34,7 @@ def XOR16(a, b):
 
 
 def MUX16(a, b, sel):
-    out = bitarray(16)
+    out = make_bits(16)
 
     for i in range(16):
         out[i] = MUX(a[i], b[i], sel)
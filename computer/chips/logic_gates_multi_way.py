@@ -1,6 +1,4 @@
-from bitarray import bitarray
-
-from computer.chips.logic_gates import OR, DMUX
+from computer.chips.logic_gates import OR, DMUX, chip
 from computer.chips.logic_gates_16bit import MUX16
 
 
@@ -17,6 +15,7 @@ def MUX4WAY16(a, b, c, d, sel):
     return MUX16(mux16_ab, mux16_cd, sel[0])
 
 
+@chip
 def MUX8WAY16(a, b, c, d, e, f, g, h, sel):
     mux_abcd = MUX4WAY16(a, b, c, d, sel[1:])
     mux_efgh = MUX4WAY16(e, f, g, h, sel[1:])
@@ -28,6 +27,7 @@ def DMUX4WAY(a, sel):
     return DMUX(o1, sel[1]) + DMUX(o2, sel[1])
 
 
+@chip
 def DMUX8WAY(a, sel):
     o1, o2, o3, o4 = DMUX4WAY(a, sel[:2])
-    return DMUX(o1, sel[2]) + DMUX(o2, sel[2]) + DMUX(o3, sel[2]) + DMUX(o4, sel[2])
\ No newline at end of file
+    return DMUX(o1, sel[2]) + DMUX(o2, sel[2]) + DMUX(o3, sel[2]) + DMUX(o4, sel[2])
\ No newline at end of file
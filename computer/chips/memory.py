@@ -1,29 +1,124 @@
-from bitarray import bitarray
+from bitarray import bitarray, frozenbitarray
+from bitarray.util import zeros
 
 from computer.chips.arithmetic import INC16
-from computer.chips.logic_gates import AND, DMUX
+from computer.chips import logic_gates
+from computer.chips.logic_gates import AND, DMUX, DEFAULT_BACKEND, chip, latch
 from computer.chips.logic_gates_16bit import MUX16
 from computer.chips.logic_gates_multi_way import DMUX8WAY, MUX8WAY16
 from computer.io import screen_demo
 
+# Read from RAM which was never written
+ZERO = frozenbitarray(16)
+
 
 class Register:
-    def __init__(self):
-        self.value = bitarray(16)
-        self.next_value = bitarray(16)
+    """
+    16 bit register with two preallocated buffers, the current value and
+    the next value
+
+    Loading writes the next buffer in place, tick swaps the buffers when
+    the register was loaded. value and next_value are read only views of
+    the buffers: a value returned by __call__ is valid until the next tick.
+
+    _call_slower is the gate level version, a MUX16 feeding back the next
+    value. It is used on the gate backends other than the default one, so
+    they see the gates of the registers.
+
+    :param register_file: RegisterFile committing this register on its tick
+    """
+    def __init__(self, register_file=None):
+        self._bits = (zeros(16), zeros(16))
+        self._views = None  # made on the first read
+        self._current = 0
+        self._loaded = False
+        self.register_file = register_file
 
     def __call__(self, value, load):
-        self.next_value = MUX16(self.next_value, value, load)
-        return self.value.copy()
+        if logic_gates.backend is DEFAULT_BACKEND:
+            return self._call_faster(value, load)
+        return self._call_slower(value, load)
+
+    def _call_slower(self, value, load):
+        self._store(latch(MUX16(self.next_value, value, load)))
+        return self.value
+
+    def _call_faster(self, value, load):
+        if load:
+            self._bits[self._current ^ 1][:] = value
+            if not self._loaded:
+                self._set_loaded()
+        views = self._views or self._make_views()
+        return views[self._current]
+
+    def _store(self, bits):
+        if not isinstance(bits, bitarray):
+            bits = bitarray([int(bit) for bit in bits])
+        self._bits[self._current ^ 1][:] = bits
+        if not self._loaded:
+            self._set_loaded()
+
+    def _make_views(self):
+        self._views = tuple(bitarray(buffer=memoryview(bits).toreadonly()) for bits in self._bits)
+        return self._views
+
+    def _set_loaded(self):
+        self._loaded = True
+        if self.register_file is not None:
+            self.register_file.loaded.append(self)
 
     def tick(self):
-        self.value = self.next_value.copy()
+        if self._loaded:
+            self._loaded = False
+            current = self._current = self._current ^ 1
+            self._bits[current ^ 1][:] = self._bits[current]
 
+    @property
+    def value(self):
+        return (self._views or self._make_views())[self._current]
 
-class RAM8:
+    @value.setter
+    def value(self, value):
+        self._store(value)
+        self.tick()
+
+    @property
+    def next_value(self):
+        return (self._views or self._make_views())[self._current ^ 1]
+
+    @next_value.setter
+    def next_value(self, value):
+        self._store(value)
+
+
+class RegisterFile:
+    """
+    Registers committed together: tick commits only the registers loaded
+    since the last tick, in one pass
+
+        registers = RegisterFile()
+        a = Register(registers)
+    """
     def __init__(self):
-        self.registers = [Register() for _ in range(8)]
+        self.loaded = []
+
+    def tick(self):
+        if self.loaded:
+            for register in self.loaded:
+                register.tick()
+            self.loaded = []
+
 
+class RAM8:
+    """
+    :param register_file: RegisterFile shared by all registers of a RAM
+                          tree, tick commits only the loaded registers
+    """
+    def __init__(self, register_file=None):
+        self.register_file = RegisterFile() if register_file is None else register_file
+        self.registers = [Register(self.register_file) for _ in range(8)]
+
+    @chip
     def __call__(self, value, address, load):
         dmux_load = DMUX8WAY(load, address)
 
@@ -38,22 +133,40 @@ class RAM8:
 
         return MUX8WAY16(out0, out1, out2, out3, out4, out5, out6, out7, address)
 
-    def tick(self):
+    def _tick_slower(self):
         for register in self.registers:
             register.tick()
+        self.register_file.tick()
+
+    def _tick_faster(self):
+        self.register_file.tick()
+    tick = _tick_faster
 
 
 class RAM8X:
-    def __init__(self):
-        ram_type = self.get_ram_type()
-        self.rams = [(ram_type()) for _ in range(8)]
+    """
+    Eight RAMs of get_ram_type(), made on their first write: a RAM which
+    was never written reads as zero
+    """
+    def __init__(self, register_file=None):
+        self.register_file = RegisterFile() if register_file is None else register_file
+        self.ram_type = self.get_ram_type()
+        self.rams = [None] * 8
+
+    def _ram(self, i, load):
+        """ :return: RAM i, None while it is not written """
+        ram = self.rams[i]
+        if ram is None and load:
+            ram = self.rams[i] = self.ram_type(self.register_file)
+        return ram
 
     def _call_slower(self, value, address, load):
         dmux_load = DMUX8WAY(load, address)
 
         out = []
         for i in range(8):
-            out.append(self.rams[i](value, address[3:], dmux_load[i]))
+            ram = self._ram(i, dmux_load[i])
+            out.append(ZERO if ram is None else ram(value, address[3:], dmux_load[i]))
 
         return MUX8WAY16(out[0], out[1], out[2], out[3],
                          out[4], out[5], out[6], out[7], address)
@@ -61,37 +174,67 @@ class RAM8X:
     def _call_faster(self, value, address, load):
         dmux_load = DMUX8WAY(1, address)
         i = dmux_load.index(1)
-        return self.rams[i](value, address[3:], load)
+        ram = self.rams[i] or self._ram(i, load)
+        if ram is None:
+            return ZERO
+        return ram(value, address[3:], load)
     __call__ = _call_faster
 
-    def tick(self):
+    def _tick_slower(self):
+        # Clock every register of the tree
         for ram in self.rams:
-            ram.tick()
+            if ram is not None:
+                ram._tick_slower()
+        self.register_file.tick()
+
+    def _tick_faster(self):
+        self.register_file.tick()
+    tick = _tick_faster
 
 
 class RAM2X:
-    def __init__(self):
-        ram_type = self.get_ram_type()
-        self.rams = [(ram_type()) for _ in range(2)]
+    """ Two RAMs of get_ram_type(), made on their first write like RAM8X """
+    def __init__(self, register_file=None):
+        self.register_file = RegisterFile() if register_file is None else register_file
+        self.ram_type = self.get_ram_type()
+        self.rams = [None] * 2
+
+    def _ram(self, i, load):
+        """ :return: RAM i, None while it is not written """
+        ram = self.rams[i]
+        if ram is None and load:
+            ram = self.rams[i] = self.ram_type(self.register_file)
+        return ram
 
     def _call_slower(self, value, address, load):
-        dmux_load = DMUX(load, address)
+        dmux_load = DMUX(load, address[0])
 
         out = []
         for i in range(2):
-            out.append(self.rams[i](value, address[1:], dmux_load[i]))
+            ram = self._ram(i, dmux_load[i])
+            out.append(ZERO if ram is None else ram(value, address[1:], dmux_load[i]))
 
-        return MUX16(out[0], out[1], address)
+        return MUX16(out[0], out[1], address[0])
 
     def _call_faster(self, value, address, load):
         # dmux_load = DMUX(1, address)
         # i = dmux_load.index(1)
-        return self.rams[address[0]](value, address[1:], load)
+        ram = self.rams[address[0]] or self._ram(address[0], load)
+        if ram is None:
+            return ZERO
+        return ram(value, address[1:], load)
     __call__ = _call_faster
 
-    def tick(self):
+    def _tick_slower(self):
+        # Clock every register of the tree
         for ram in self.rams:
-            ram.tick()
+            if ram is not None:
+                ram._tick_slower()
+        self.register_file.tick()
+
+    def _tick_faster(self):
+        self.register_file.tick()
+    tick = _tick_faster
 
 
 class RAM64(RAM8X):
@@ -126,9 +269,10 @@ class RAM32K(RAM8X):
 
 class CombinedRAM:
     def __init__(self):
-        self.ram = RAM32K()
-        self.screen = RAM8K()
-        self.keyboard = Register()
+        self.register_file = RegisterFile()
+        self.ram = RAM32K(self.register_file)
+        self.screen = RAM8K(self.register_file)
+        self.keyboard = Register(self.register_file)
 
     def __call__(self, value, address, load):
         screen_keyboard_or_ram = DMUX(1, address[0])
@@ -152,14 +296,12 @@ class CombinedRAM:
         return value
 
     def tick(self):
-        self.ram.tick()
-        self.screen.tick()
-        self.keyboard.tick()
+        self.register_file.tick()
 
 
 class PC:
-    def __init__(self):
-        self.register = Register()
+    def __init__(self, register_file=None):
+        self.register = Register(register_file)
         self.init_value = bitarray('0' * 16)
         self.register(self.init_value, 1)
         self.register.tick()
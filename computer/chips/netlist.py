@@ -0,0 +1,262 @@
+"""
+Flattens combinational gate level chips into a netlist of NAND gates
+
+    netlist = optimize(trace(ALU, 16, 16, 4))
+    alu = compile_python(netlist, 'ALU')  # drop in for the gate level ALU
+    evaluate = NumpyEvaluator(netlist)    # many inputs at once, as int arrays
+
+trace runs the chip on TracingBackend, a computer.chips.logic_gates
+backend which records every NAND instead of evaluating it. Only chips
+which don't branch on signal values can be traced: the ALU and the chips
+it is built from, not the CPU with its registers and memory buses.
+"""
+from collections import namedtuple
+
+import numpy as np
+from bitarray import bitarray
+
+from computer.chips.logic_gates import Backend, use_backend
+
+# Signals 0 and 1 are the constants, followed by the input bits and the gates
+FALSE, TRUE = 0, 1
+FIRST_INPUT = 2
+
+
+class Wire:
+    """ Traced value of a signal """
+    __slots__ = ('signal',)
+
+    def __init__(self, signal):
+        self.signal = signal
+
+    def __bool__(self):
+        raise TypeError('A traced chip can not branch on signal values')
+
+
+def signal_of(value):
+    if type(value) is Wire:
+        return value.signal
+    return TRUE if value else FALSE
+
+
+class TracingBackend(Backend):
+    """ Backend on Wire values, multi bit values are lists """
+    def __init__(self, first_gate):
+        self.first_gate = first_gate
+        self.gates = []
+
+    def NAND(self, a, b):
+        self.gates.append((signal_of(a), signal_of(b)))
+        return Wire(self.first_gate + len(self.gates) - 1)
+
+    @staticmethod
+    def make_bits(length):
+        return [0] * length
+
+    @staticmethod
+    def bits_from(values):
+        return list(values)
+
+
+class Netlist(namedtuple('Netlist', ('inputs', 'gates', 'outputs'))):
+    """
+    inputs: length of each input, None for single bit inputs
+    gates: (a, b) signals of each NAND, in evaluation order
+    outputs: the structure returned by the chip with signals in place of
+             bits: a signal, a list of signals or a tuple of those
+    """
+    @property
+    def input_bits(self):
+        return sum(1 if length is None else length for length in self.inputs)
+
+    @property
+    def first_gate(self):
+        return FIRST_INPUT + self.input_bits
+
+    @property
+    def signal_count(self):
+        return self.first_gate + len(self.gates)
+
+
+def map_outputs(outputs, function):
+    """ outputs with function applied to every signal """
+    if isinstance(outputs, tuple):
+        return tuple(map_outputs(output, function) for output in outputs)
+    if isinstance(outputs, list):
+        return [function(signal) for signal in outputs]
+    return function(outputs)
+
+
+def trace(chip, *input_lengths):
+    """
+    :param chip: gate level function, e.g. ALU
+    :param input_lengths: length of each argument, None for single bits
+    :return: Netlist of all NANDs evaluated by the chip
+    """
+    inputs = []
+    signal = FIRST_INPUT
+    for length in input_lengths:
+        if length is None:
+            inputs.append(Wire(signal))
+            signal += 1
+        else:
+            inputs.append([Wire(i) for i in range(signal, signal + length)])
+            signal += length
+
+    backend = TracingBackend(signal)
+    with use_backend(backend):
+        outputs = chip(*inputs)
+
+    return Netlist(list(input_lengths), backend.gates, map_outputs(outputs, signal_of))
+
+
+def simplify(netlist):
+    """
+    Constant folding and common subexpression elimination, in one pass
+
+    NAND(0, x) = 1, NAND(1, x) = NOT(x), NOT(NOT(x)) = x, NAND(x, NOT(x)) = 1
+    and gates with the same inputs are merged.
+    """
+    first_gate = netlist.first_gate
+    mapping = list(range(first_gate))
+    gates = []
+    known = {}
+    inverse_of = {}  # NOT gate -> its input
+
+    for a, b in netlist.gates:
+        a, b = sorted((mapping[a], mapping[b]))
+        if a == FALSE or inverse_of.get(a) == b or inverse_of.get(b) == a:
+            out = TRUE
+        elif a == TRUE and b == TRUE:
+            out = FALSE
+        else:
+            if a == TRUE:
+                a = b
+            if a == b and a in inverse_of:
+                out = inverse_of[a]
+            elif (a, b) in known:
+                out = known[a, b]
+            else:
+                out = known[a, b] = first_gate + len(gates)
+                gates.append((a, b))
+                if a == b:
+                    inverse_of[out] = a
+        mapping.append(out)
+
+    return Netlist(netlist.inputs, gates, map_outputs(netlist.outputs, mapping.__getitem__))
+
+
+def remove_dead_gates(netlist):
+    """ Drop the gates the outputs don't depend on """
+    first_gate = netlist.first_gate
+    live = [False] * netlist.signal_count
+    map_outputs(netlist.outputs, lambda signal: live.__setitem__(signal, True))
+    for i in reversed(range(len(netlist.gates))):
+        if live[first_gate + i]:
+            a, b = netlist.gates[i]
+            live[a] = live[b] = True
+
+    mapping = list(range(first_gate)) + [None] * len(netlist.gates)
+    gates = []
+    for i, (a, b) in enumerate(netlist.gates):
+        if live[first_gate + i]:
+            mapping[first_gate + i] = first_gate + len(gates)
+            gates.append((mapping[a], mapping[b]))
+
+    return Netlist(netlist.inputs, gates, map_outputs(netlist.outputs, mapping.__getitem__))
+
+
+def optimize(netlist):
+    return remove_dead_gates(simplify(netlist))
+
+
+def python_source(netlist, name):
+    """
+    Straight line Python function evaluating the netlist, with the
+    arguments of the traced chip. Lists of bits are returned as bitarrays.
+    """
+    arguments = [f'in{i}' for i in range(len(netlist.inputs))]
+    lines = [f'def {name}({", ".join(arguments)}):',
+             f'    s{FALSE}, s{TRUE} = 0, 1']
+
+    signal = FIRST_INPUT
+    for argument, length in zip(arguments, netlist.inputs):
+        if length is None:
+            lines.append(f'    s{signal} = {argument}')
+            signal += 1
+        else:
+            names = ', '.join(f's{i}' for i in range(signal, signal + length))
+            lines.append(f'    {names}{"," if length == 1 else ""} = {argument}')
+            signal += length
+
+    for i, (a, b) in enumerate(netlist.gates):
+        lines.append(f'    s{netlist.first_gate + i} = 1 - (s{a} & s{b})')
+
+    def expression(outputs):
+        if isinstance(outputs, tuple):
+            return '(' + ''.join(f'{expression(output)}, ' for output in outputs) + ')'
+        if isinstance(outputs, list):
+            return 'bitarray((' + ''.join(f's{signal}, ' for signal in outputs) + '))'
+        return f's{outputs}'
+
+    lines.append(f'    return {expression(netlist.outputs)}')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_python(netlist, name='chip'):
+    """ :return: the function of python_source """
+    namespace = {'bitarray': bitarray}
+    exec(compile(python_source(netlist, name), f'<netlist {name}>', 'exec'), namespace)
+    return namespace[name]
+
+
+class NumpyEvaluator:
+    """
+    Evaluates a netlist for many inputs at once, bit sliced: every signal
+    is a packed bit array with one bit per lane, and all NANDs of the same
+    depth are evaluated in one array operation.
+    """
+    def __init__(self, netlist):
+        self.netlist = netlist
+        first_gate = netlist.first_gate
+        depth = [0] * netlist.signal_count
+        for i, (a, b) in enumerate(netlist.gates):
+            depth[first_gate + i] = max(depth[a], depth[b]) + 1
+
+        by_depth = {}
+        for i, gate in enumerate(netlist.gates):
+            by_depth.setdefault(depth[first_gate + i], []).append((first_gate + i, *gate))
+        self.levels = [tuple(np.array(column) for column in zip(*by_depth[level]))
+                       for level in sorted(by_depth)]
+
+    def __call__(self, *args):
+        """
+        :param args: one int array per input, one value per lane, multi bit
+                     inputs as words with the first bit as most significant
+        :return: the outputs in the structure returned by the chip, lists of
+                 bits as arrays of words, single bits as arrays of 0 and 1
+        """
+        args = [np.asarray(arg, dtype=np.int64) for arg in args]
+        lanes = len(args[0])
+        values = np.zeros((self.netlist.signal_count, (lanes + 7) // 8), dtype=np.uint8)
+        values[TRUE] = 0xFF
+
+        signal = FIRST_INPUT
+        for length, arg in zip(self.netlist.inputs, args):
+            bits = 1 if length is None else length
+            for i in range(bits):
+                values[signal] = np.packbits((arg >> (bits - 1 - i)) & 1)
+                signal += 1
+
+        for out, a, b in self.levels:
+            values[out] = ~(values[a] & values[b])
+
+        def unpack(outputs):
+            if isinstance(outputs, tuple):
+                return tuple(unpack(output) for output in outputs)
+            if isinstance(outputs, list):
+                bits = np.unpackbits(values[outputs], axis=1)[:, :lanes].astype(np.int64)
+                weights = 1 << np.arange(len(outputs) - 1, -1, -1, dtype=np.int64)
+                return weights @ bits
+            return np.unpackbits(values[outputs])[:lanes].astype(np.int64)
+        return unpack(self.netlist.outputs)
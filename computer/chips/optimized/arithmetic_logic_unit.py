@@ -0,0 +1,139 @@
+MASK = 0xFFFF
+
+# Opcodes which only depend on a
+UNARY_OPCODES = (0b0000, 0b0001, 0b0010, 0b0011, 0b1000, 0b1001)
+
+
+# Arithmetic
+def _pass_through(a, b):
+    return a, 0 if a else 1, a >> 15, 0
+
+
+def _negate(a, b):
+    out = -a & MASK
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _increment(a, b):
+    out = (a + 1) & MASK
+    return out, 0 if out else 1, out >> 15, 1 if a == MASK else 0
+
+
+def _decrement(a, b):
+    out = (a - 1) & MASK
+    return out, 0 if out else 1, out >> 15, 1 if a == 0 else 0
+
+
+def _add(a, b):
+    add = a + b
+    out = add & MASK
+    return out, 0 if out else 1, out >> 15, add >> 16
+
+
+def _subtract(a, b):
+    add = (-a & MASK) + b
+    out = -add & MASK
+    return out, 0 if out else 1, out >> 15, add >> 16
+
+
+# Add and subtract with the inc/dec bit set as well: the output of the
+# adder, but the carry of inc/dec
+def _add_alt(a, b):
+    out = (a + b) & MASK
+    return out, 0 if out else 1, out >> 15, 1 if a == MASK else 0
+
+
+def _subtract_alt(a, b):
+    out = -((-a & MASK) + b) & MASK
+    return out, 0 if out else 1, out >> 15, 1 if a == 0 else 0
+
+
+# Logical
+def _bitflip(a, b):
+    out = a ^ MASK
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _and(a, b):
+    out = a & b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _not_and(a, b):
+    out = (a ^ MASK) & b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _or(a, b):
+    out = a | b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _not_or(a, b):
+    out = (a ^ MASK) | b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _xor(a, b):
+    out = a ^ b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+def _not_xor(a, b):
+    out = (a ^ MASK) ^ b
+    return out, 0 if out else 1, out >> 15, 0
+
+
+# Indexed by opcode
+OPERATIONS = (_pass_through, _negate, _increment, _decrement,
+              _add, _subtract, _add_alt, _subtract_alt,
+              _pass_through, _bitflip, _and, _not_and,
+              _or, _not_or, _xor, _not_xor)
+
+
+def ALU(a, b, opcode):
+    """
+    Int version of computer.chips.arithmetic_logic_unit.ALU
+
+    Dispatches on the opcode to one function computing only the
+    selected operation.
+
+    :param a: int, 16 bits
+    :param b: int, 16 bits
+    :param opcode: int, 4 bits
+
+    :return:
+    :out: int, 16 bits
+    :is_zero: 1 if out == 0 else 0
+    :is_neg: 1 if out < 0 else 0
+    :carry: same carry semantics as the gate level ALU
+    """
+    return OPERATIONS[opcode](a, b)
+
+
+_unary_tables = [None] * 16
+
+
+def unary_table(opcode):
+    """
+    Results of a unary opcode for all 65536 values of a, built on first use
+
+    :return: list of (out, is_zero, is_neg, carry), indexed by a
+    """
+    table = _unary_tables[opcode]
+    if table is None:
+        if opcode not in UNARY_OPCODES:
+            raise ValueError(f'Opcode {opcode:04b} is not unary')
+        operation = OPERATIONS[opcode]
+        table = _unary_tables[opcode] = [operation(a, 0) for a in range(2**16)]
+    return table
+
+
+def memoized_ALU(a, b, opcode):
+    """ ALU looking up the unary opcodes in tables """
+    table = _unary_tables[opcode]
+    if table is not None:
+        return table[a]
+    if opcode in UNARY_OPCODES:
+        return unary_table(opcode)[a]
+    return OPERATIONS[opcode](a, b)
@@ -0,0 +1,271 @@
+from collections import namedtuple
+
+from bitarray import bitarray
+
+from computer.chips.optimized.arithmetic_logic_unit import ALU
+from computer.chips.optimized.memory import Register, PC
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+NULL_ADDRESS = bitarray(16)
+MASK = 0xFFFF
+# Words from here on are memory mapped IO with aliased addresses, instructions
+# using them are decoded on every execution instead of being cached
+IO_START = 0x8000
+
+# Result of an instruction
+MOVE = 0  # source value
+ALU_OP = 1  # ALU output, updates status
+HDD_OP = 2  # HDD output
+
+CONSTANT = 0b101  # register select of pc + 1
+
+Decoded = namedtuple('Decoded', ('instruction', 'constant',
+                                 'source_select', 'source_is_pointer',
+                                 'target_select', 'target_is_pointer',
+                                 'operation', 'alu_opcode', 'hdd_set_sector', 'hdd_write',
+                                 'load', 'load_ram',
+                                 'is_call', 'is_pop', 'is_stack_op',
+                                 'is_jump', 'jump_mask', 'source_is_constant', 'skip_constant',
+                                 'is_reset', 'is_shutdown'))
+
+
+def decode(instruction, constant=0):
+    """
+    Decode the fields of an instruction word once
+
+    :param instruction: int, 16 bits
+    :param constant: int, the word following the instruction
+    :return: Decoded
+    """
+    opcode = instruction >> 12
+    secondary_opcode = instruction >> 8 & 0xF
+    target_address = instruction >> 4 & 0xF
+    source_address = instruction & 0xF
+
+    is_jump = opcode & 0b0111 == 0b0100
+    is_call = bool(is_jump and secondary_opcode & 0b0100)
+    is_return = bool(is_jump and secondary_opcode & 0b0010)
+    is_pop = bool(opcode & 0b0001 and secondary_opcode & 0b1000 or is_return)
+
+    if not opcode & 0b1001 and opcode & 0b0010 and secondary_opcode & 0b1000:
+        operation = HDD_OP
+    elif opcode & 0b1000:
+        operation = ALU_OP
+    else:
+        operation = MOVE
+
+    # status bits: zero 15, neg 14, overflow 13
+    if opcode & 0b0100 and not is_jump:
+        jump_mask = 1 << (14, 15, 13)[(opcode & 0b0011) - 1]
+    else:
+        jump_mask = 0
+
+    target_is_pointer = bool(target_address & 0b1000)
+    source_is_constant = source_address & 0b0101 == 0b0101
+    return Decoded(instruction=instruction,
+                   constant=constant,
+                   source_select=source_address & 0b0111,
+                   source_is_pointer=bool(source_address & 0b1000),
+                   target_select=target_address & 0b0111,
+                   target_is_pointer=target_is_pointer,
+                   operation=operation,
+                   alu_opcode=secondary_opcode,
+                   hdd_set_sector=1 if secondary_opcode & 0b0100 else 0,
+                   hdd_write=1 if secondary_opcode & 0b0010 else 0,
+                   load=is_call or opcode & 0b0110 == 0b0010,
+                   load_ram=target_is_pointer or is_call,
+                   is_call=is_call,
+                   is_pop=is_pop,
+                   is_stack_op=bool(opcode & 0b0001) or is_call or is_return,
+                   is_jump=is_jump,
+                   jump_mask=jump_mask,
+                   source_is_constant=source_is_constant,
+                   skip_constant=source_is_constant or target_address & 0b0101 == 0b0101,
+                   is_reset=opcode == 0b0000,
+                   is_shutdown=opcode == 0b0001)
+
+
+class CPU:
+    """
+    Int version of computer.chips.central_processing_unit.CPU
+
+    Same instruction set and same interface (__call__(reset), tick(),
+    registers a, b, c, d, sp, pc and status), but the registers hold
+    ints and the instruction is decoded with shifts and masks:
+
+    instruction: oooo aaaa prrr prrr
+        opcode:           instruction >> 12
+        secondary opcode: instruction >> 8 & 0xF
+        target address:   instruction >> 4 & 0xF
+        source address:   instruction & 0xF
+
+    RAM is accessed with ints through read/write when it supports them
+    (computer.chips.optimized.memory), otherwise through its bitarray
+    interface like the HDD.
+
+    Decoded instructions are cached by address, together with the
+    constant following them, unless they use screen or keyboard words.
+    Writes through the CPU, and through RAMs with write_listeners,
+    invalidate the cached instructions using the written word.
+    """
+
+    def __init__(self, ram, hdd):
+        self.ram = ram
+        self.hdd = hdd
+
+        self.a = Register()
+        self.b = Register()
+        self.c = Register()
+        self.d = Register()
+
+        self.sp = Register()
+        self.pc = PC()
+
+        self.status = Register()
+
+        self.decoded = {}
+
+        # Called with the int address of every write. Shared with the RAM
+        # if it reports its writes, so writes from outside the CPU are seen.
+        self.notify_writes = not hasattr(ram, 'write_listeners')
+        self.write_listeners = [] if self.notify_writes else ram.write_listeners
+        self.write_listeners.append(self.invalidate)
+
+        # Int access to RAMs supporting it, bitarrays otherwise
+        if hasattr(ram, 'read') and not self.notify_writes:
+            self.read = ram.read
+            self.write = ram.write
+
+    def __call__(self, reset=0):
+        pc_value = self.pc.register.word
+        decoded = self.decoded.get(pc_value)
+        if decoded is None:
+            decoded = self.decode(pc_value)
+
+        (_, constant_value,
+         source_select, source_is_pointer, target_select, target_is_pointer,
+         operation, alu_opcode, hdd_set_sector, hdd_write,
+         load, load_ram, is_call, is_pop, is_stack_op,
+         is_jump, jump_mask, source_is_constant, skip_constant, is_reset, is_shutdown) = decoded
+
+        sp_value = self.sp.word
+        sp_pop = (sp_value + 1) & MASK
+
+        # source value
+        if source_select < 4:
+            source_register_value = (self.a, self.b, self.c, self.d)[source_select].word
+        elif source_select == 4:
+            source_register_value = sp_pop if is_pop else sp_value
+        elif source_select == CONSTANT:
+            source_register_value = constant_value
+        else:
+            source_register_value = 0
+
+        if source_is_pointer:
+            source_value = self.read(source_register_value)
+        else:
+            source_value = source_register_value
+
+        # target
+        if target_select < 4:
+            target_register_value = (self.a, self.b, self.c, self.d)[target_select].word
+        elif target_select == 4:
+            target_register_value = sp_value
+        elif target_select == CONSTANT:
+            target_register_value = constant_value
+        else:
+            target_register_value = 0
+
+        if target_is_pointer:
+            target_value = self.read(target_register_value)
+        else:
+            target_value = target_register_value
+
+        if operation == MOVE:
+            result = source_value
+        elif operation == ALU_OP:
+            result, is_zero, is_neg, overflow = ALU(target_value, source_value, alu_opcode)
+            self.status.next_word = is_zero << 15 | is_neg << 14 | overflow << 13
+        else:
+            hdd_address = target_value if hdd_write else source_value
+            result = self.hdd_bus(hdd_address, hdd_set_sector, source_value, hdd_write)
+
+        # Load moved value
+        constant_address = (pc_value + 1) & MASK
+        inc_constant_address = (pc_value + 2) & MASK
+        if is_call:
+            move_value = inc_constant_address if source_is_constant else constant_address
+        else:
+            move_value = result
+
+        if load:
+            if load_ram:
+                self.write(target_register_value, move_value)
+            elif target_select < 4:
+                (self.a, self.b, self.c, self.d)[target_select].next_word = move_value
+
+        # Update stack pointer
+        if is_stack_op:
+            self.sp.next_word = sp_pop if is_pop else (sp_value - 1) & MASK
+        elif target_select == 4 and not load_ram:
+            self.sp.next_word = result
+
+        # Set PC
+        if reset or is_reset:
+            next_pc_address = 0
+        elif is_jump or self.status.word & jump_mask:
+            next_pc_address = result
+        elif skip_constant:
+            next_pc_address = inc_constant_address
+        else:
+            next_pc_address = constant_address
+        self.pc.register.next_word = next_pc_address
+
+        return 1 if is_shutdown else 0
+
+    def decode(self, address):
+        instruction = self.read(address)
+        decoded = decode(instruction)
+        if CONSTANT in (decoded.source_select, decoded.target_select):
+            decoded = decoded._replace(constant=self.read((address + 1) & MASK))
+        if address < IO_START - 1:
+            self.decoded[address] = decoded
+        return decoded
+
+    def invalidate(self, address):
+        """ Drop cached instructions using the word at address """
+        self.decoded.pop(address, None)
+        self.decoded.pop((address - 1) & MASK, None)
+
+    def read(self, address):
+        return bin_to_dec(self.ram(NULL_ADDRESS, dec_to_bin(address), 0))
+
+    def write(self, address, value):
+        if self.notify_writes:
+            for listener in self.write_listeners:
+                listener(address)
+        self.ram(dec_to_bin(value), dec_to_bin(address), 1)
+
+    def ram_bus(self, value, address, load):
+        if load and self.notify_writes:
+            for listener in self.write_listeners:
+                listener(bin_to_dec(address))
+        return self.ram(value, address, load)
+
+    def hdd_bus(self, address, select_sector, value, write):
+        out = self.hdd(dec_to_bin(address), select_sector, dec_to_bin(value), write)
+        return bin_to_dec(out)
+
+    def tick(self):
+        self.a.tick()
+        self.b.tick()
+        self.c.tick()
+        self.d.tick()
+
+        self.sp.tick()
+        self.pc.tick()
+
+        self.status.tick()
+
+        self.ram.tick()
+        self.hdd.tick()
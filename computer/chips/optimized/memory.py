@@ -1,59 +1,221 @@
+import sys
+import threading
+from array import array
+
 from bitarray import bitarray
-from computer.utility.numbers import bin_to_dec
+from bitarray.util import ba2int
+
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+# Writes are tracked per page of 256 words
+PAGE_SHIFT = 8
+PAGE_WORDS = 1 << PAGE_SHIFT
+
+
+class Register:
+    """
+    16 bit register holding its value as an int.
+
+    word, next_word: int values used by the int based chips
+    value, next_value: bitarray views, for the gate level interface
+    """
+    def __init__(self):
+        self.word = 0
+        self.next_word = 0
+
+    def __call__(self, value, load):
+        out = dec_to_bin(self.word)
+        if load:
+            self.next_word = bin_to_dec(value)
+        return out
+
+    def tick(self):
+        self.word = self.next_word
+
+    @property
+    def value(self):
+        return dec_to_bin(self.word)
 
-from computer.chips.memory import Register # RAM8K, RAM32K
+    @value.setter
+    def value(self, value):
+        self.word = bin_to_dec(value)
+
+    @property
+    def next_value(self):
+        return dec_to_bin(self.next_word)
+
+    @next_value.setter
+    def next_value(self, value):
+        self.next_word = bin_to_dec(value)
+
+
+class PC:
+    def __init__(self):
+        self.register = Register()
+
+    def __call__(self, value, load, inc, reset):
+        out = self.register.word
+        if reset:
+            self.register.next_word = 0
+        elif inc:
+            self.register.next_word = (out + 1) & 0xFFFF
+        elif load:
+            self.register.next_word = bin_to_dec(value)
+        return dec_to_bin(out)
+
+    def tick(self):
+        self.register.tick()
 
 
-# noinspection PyAttributeOutsideInit
 class _RAM:
+    """
+    Word addressed RAM backed by array('H')
+
+    read/write work on int addresses and words, writes are committed on tick.
+    __call__ adapts the gate level interface: address and value can be
+    bitarrays or ints, the old value is returned as an int when the address
+    is an int and as a bitarray otherwise.
+
+    dirty_pages: pages (address >> PAGE_SHIFT) written since it was last
+                 cleared, by whoever keeps track, e.g. computer.checkpoints
+    """
+    def __init__(self, size):
+        self.words = array('H', bytes(2 * size))
+        self.next = []
+        self.dirty_pages = set()
+
+    def read(self, address):
+        return self.words[address]
+
+    def write(self, address, word):
+        self.next.append((address, word))
+
     def __call__(self, value, address, load):
-        i = self.get_index(address)
-        old_value = self.bits[i*16:(i+1)*16]
+        if type(address) is int:
+            if load:
+                self.next.append((address, value if type(value) is int else bin_to_dec(value)))
+            return self.words[address]
+
+        i = ba2int(address)
         if load:
-            self.next.append((i, value))
-        return old_value
+            self.next.append((i, value if type(value) is int else bin_to_dec(value)))
+        return dec_to_bin(self.words[i])
 
     def tick(self):
-        for i, value in self.next:
-            self.bits[i*16:(i+1)*16] = value
-        self.next = []
+        if self.next:
+            words = self.words
+            for i, word in self.next:
+                words[i] = word
+            self.dirty_pages.update([i >> PAGE_SHIFT for i, _ in self.next])
+            self.next = []
+
+    def replaced(self, pages):
+        """ Words of pages were replaced without a tick, e.g. by a restore """
+        self.dirty_pages.update(pages)
+
+    @property
+    def bits(self):
+        """ Contents as one bitarray, 16 bits per word """
+        words = array('H', self.words)
+        if sys.byteorder == 'little':
+            words.byteswap()
+        bits = bitarray()
+        bits.frombytes(words.tobytes())
+        return bits
 
 
 class RAM8K(_RAM):
     def __init__(self):
-        self.bits = bitarray(2**13 * 16)
-        self.next = []
+        super().__init__(2**13)
 
-    @staticmethod
-    def get_index(address):
-        return bin_to_dec(bitarray('000') + address)
 
+class ScreenRAM(RAM8K):
+    """
+    RAM8K recording the words written since the last frame, so a screen
+    repaints only those
 
-class RAM32K(_RAM):
+    changed_words: addresses written since the last take_changed, their
+                   words are committed before they are added. Guarded by
+                   changed_lock, take_changed may run on another thread
+    """
     def __init__(self):
-        self.bits = bitarray(2**15 * 16)
-        self.next = []
+        super().__init__()
+        self.changed_words = set()
+        self.changed_lock = threading.Lock()
+
+    def tick(self):
+        if self.next:
+            changed = [i for i, _ in self.next]
+            super().tick()
+            with self.changed_lock:
+                self.changed_words.update(changed)
+
+    def replaced(self, pages):
+        super().replaced(pages)
+        with self.changed_lock:
+            for page in pages:
+                self.changed_words.update(range(page << PAGE_SHIFT, (page + 1) << PAGE_SHIFT))
 
-    @staticmethod
-    def get_index(address):
-        return bin_to_dec(bitarray('0') + address)
+    def take_changed(self):
+        """ :return: list of (address, word) written since the last call, by address """
+        with self.changed_lock:
+            changed, self.changed_words = self.changed_words, set()
+        # A word written since is newer than its address in the set, and
+        # its address is in the new set, so it's painted again next frame
+        words = self.words
+        return [(i, words[i]) for i in sorted(changed)]
+
+
+class RAM32K(_RAM):
+    def __init__(self):
+        super().__init__(2**15)
 
 
 class CombinedRAM:
+    """
+    Up to 32 767 -> 32K Ram
+    From 32768 to 40959 -> 8K Screen memory
+    40960 -> Keyboard register
+
+    read/write work on int addresses, __call__ accepts ints or bitarrays
+    like the RAMs.
+    """
     def __init__(self):
         self.ram = RAM32K()
-        self.screen = RAM8K()
+        self.screen = ScreenRAM()
         self.keyboard = Register()
 
-    def __call__(self, value, address, load):
-        if address[0]:
-            if address[2]:
-                old_value = self.keyboard(value, load)
+        # Called with the int address of every write
+        self.write_listeners = []
+
+    def read(self, address):
+        if address & 0x8000:
+            if address & 0x2000:
+                return self.keyboard.word
+            return self.screen.words[address & 0x1FFF]
+        return self.ram.words[address]
+
+    def write(self, address, word):
+        for listener in self.write_listeners:
+            listener(address)
+        if address & 0x8000:
+            if address & 0x2000:
+                self.keyboard.next_word = word
             else:
-                old_value = self.screen(value, address[3:], load)
+                self.screen.next.append((address & 0x1FFF, word))
         else:
-            old_value = self.ram(value, address[1:], load)
-        return old_value
+            self.ram.next.append((address, word))
+
+    def __call__(self, value, address, load):
+        if type(address) is int:
+            if load:
+                self.write(address, value if type(value) is int else bin_to_dec(value))
+            return self.read(address)
+
+        i = bin_to_dec(address)
+        if load:
+            self.write(i, value if type(value) is int else bin_to_dec(value))
+        return dec_to_bin(self.read(i))
 
     def tick(self):
         self.ram.tick()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from computer.chips.optimized import arithmetic_logic_unit
+from computer.chips.optimized.arithmetic_logic_unit import ALU, memoized_ALU, unary_table, UNARY_OPCODES
+from computer.chips.tests.test_arithmetic_logic_unit import TestALU
+from computer.chips.vectorized.arithmetic_logic_unit import ALU as VectorizedALU
+from computer.chips.vectorized.numbers import dec_to_bin, bin_to_dec
+from computer.utility.numbers import bin_to_dec as int_bin_to_dec
+
+truth_tables = [(TestALU.truth_table_pass_through, 0b0000),
+                (TestALU.truth_table_negate, 0b0001),
+                (TestALU.truth_table_increment, 0b0010),
+                (TestALU.truth_table_decrement, 0b0011),
+                (TestALU.truth_table_add, 0b0100),
+                (TestALU.truth_table_sub, 0b0101),
+                (TestALU.truth_table_bitflip, 0b1001),
+                (TestALU.truth_table_and, 0b1010),
+                (TestALU.truth_table_and_not_a, 0b1011),
+                (TestALU.truth_table_or, 0b1100),
+                (TestALU.truth_table_or_not_a, 0b1101),
+                (TestALU.truth_table_xor, 0b1110),
+                (TestALU.truth_table_xor_not_a, 0b1111)]
+rows = [(row, opcode) for truth_table, opcode in truth_tables for row in truth_table]
+
+ALL_VALUES = np.arange(2**16, dtype=np.uint16)
+# b values for the exhaustive runs over a of the binary opcodes
+EDGE_VALUES = [0, 1, 2, 0x7FFF, 0x8000, 0xFFFE, 0xFFFF, 0x5A5A]
+
+
+def gate_level_results(a, b, opcode):
+    """ Gate level ALU results for arrays of a and b, as list of int tuples """
+    opcodes = np.broadcast_to(np.array([int(bit) for bit in f'{opcode:04b}'], dtype=bool), (len(a), 4))
+    out, is_zero, is_neg, carry = VectorizedALU(dec_to_bin(a), dec_to_bin(b), opcodes)
+    return list(zip(bin_to_dec(out).tolist(), is_zero.astype(int).tolist(),
+                    is_neg.astype(int).tolist(), carry.astype(int).tolist()))
+
+
+@pytest.mark.parametrize('alu', [ALU, memoized_ALU])
+class TestIntALU:
+    @pytest.mark.parametrize('row, opcode', rows)
+    def test_truth_table(self, alu, row, opcode):
+        a, b, expected_out, expected_status = row
+        expected = (int_bin_to_dec(expected_out),) + expected_status
+
+        assert alu(int_bin_to_dec(a), int_bin_to_dec(b), opcode) == expected
+
+
+class TestExhaustive:
+    """ Bit exact with the gate level ALU, through its vectorized version """
+    @pytest.mark.parametrize('opcode', UNARY_OPCODES)
+    def test_unary(self, opcode):
+        b = np.zeros_like(ALL_VALUES)
+        expected = gate_level_results(ALL_VALUES, b, opcode)
+
+        assert [ALU(a, 0, opcode) for a in range(2**16)] == expected
+        assert unary_table(opcode) == expected
+
+    @pytest.mark.parametrize('opcode', sorted(set(range(16)) - set(UNARY_OPCODES)))
+    def test_binary_over_all_a(self, opcode):
+        for b in EDGE_VALUES:
+            expected = gate_level_results(ALL_VALUES, np.full_like(ALL_VALUES, b), opcode)
+            assert [ALU(a, b, opcode) for a in range(2**16)] == expected
+
+    @pytest.mark.parametrize('opcode', range(16))
+    def test_random(self, opcode):
+        rng = np.random.default_rng(opcode)
+        a = rng.integers(0, 2**16, 2**14, dtype=np.uint16)
+        b = rng.integers(0, 2**16, 2**14, dtype=np.uint16)
+
+        expected = gate_level_results(a, b, opcode)
+
+        assert [ALU(x, y, opcode) for x, y in zip(a.tolist(), b.tolist())] == expected
+        assert [memoized_ALU(x, y, opcode) for x, y in zip(a.tolist(), b.tolist())] == expected
+
+
+class TestUnaryTable:
+    def test_built_on_first_use(self, monkeypatch):
+        monkeypatch.setattr(arithmetic_logic_unit, '_unary_tables', [None] * 16)
+
+        assert memoized_ALU(5, 0, 0b0010) == ALU(5, 0, 0b0010)
+        assert arithmetic_logic_unit._unary_tables[0b0010] is not None
+        assert arithmetic_logic_unit._unary_tables[0b0011] is None
+
+    def test_binary_opcode(self):
+        with pytest.raises(ValueError):
+            unary_table(0b0100)
@@ -0,0 +1,183 @@
+import random
+
+import pytest
+
+from computer.chips.central_processing_unit import CPU as GateCPU
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+
+from computer.chips.tests import test_central_processing_unit as test_cpu
+from computer.chips.tests import ZEROS, INT_ONE, INT_TWO, INT_THREE
+from computer.chips.tests import test_cpu_integration
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+from computer.opcodes import *
+
+
+class TestOptimizedCPU:
+    @pytest.fixture
+    def cpu(self):
+        ram = self.make_ram()
+        hdd = self.make_hdd()
+        return CPU(ram, hdd)
+
+
+class TestOptimizedCPUMove(TestOptimizedCPU, test_cpu.TestCPUMove):
+    pass
+
+
+class TestOptimizedCPUStack(TestOptimizedCPU, test_cpu.TestCPUStack):
+    pass
+
+
+class TestOptimizedCPUALU(TestOptimizedCPU, test_cpu.TestCPUALU):
+    pass
+
+
+class TestOptimizedCPUJump(TestOptimizedCPU, test_cpu.TestCPUJump):
+    pass
+
+
+class TestOptimizedCPUJumpZero(TestOptimizedCPU, test_cpu.TestCPUJumpZero):
+    pass
+
+
+class TestOptimizedCPUJumpNegative(TestOptimizedCPU, test_cpu.TestCPUJumpNegative):
+    pass
+
+
+class TestOptimizedCPUJumpOverflow(TestOptimizedCPU, test_cpu.TestCPUJumpOverflow):
+    pass
+
+
+class TestOptimizedCPUReset(TestOptimizedCPU, test_cpu.TestCPUReset):
+    pass
+
+
+class TestOptimizedCPUShutdown(TestOptimizedCPU, test_cpu.TestCPUShutdown):
+    pass
+
+
+class TestOptimizedCPUHDD(TestOptimizedCPU, test_cpu.TestCPUHDD):
+    pass
+
+
+class TestOptimizedCpuCallReturn(TestOptimizedCPU, test_cpu.TestCpuCallReturn):
+    pass
+
+
+class OptimizedRAMIntegration(test_cpu_integration.TestCPUIntegration):
+    @staticmethod
+    def make_ram():
+        return CombinedRAM()
+
+
+class TestOptimizedCPUMoveIntegration(OptimizedRAMIntegration, TestOptimizedCPUMove):
+    pass
+
+
+class TestOptimizedCPUStackIntegration(OptimizedRAMIntegration, TestOptimizedCPUStack):
+    pass
+
+
+class TestOptimizedCPUHDDIntegration(OptimizedRAMIntegration, TestOptimizedCPUHDD):
+    pass
+
+
+class TestOptimizedCpuCallReturnIntegration(OptimizedRAMIntegration, TestOptimizedCpuCallReturn):
+    pass
+
+
+class FakeHardDisk:
+    """ Deterministic HDD accepting any address, sector and write """
+    def __call__(self, address, select_sector, value, write):
+        return dec_to_bin(bin_to_dec(address) ^ 0x5A5A)
+
+    def tick(self):
+        pass
+
+
+class TestCPUDifferential:
+    """ Runs random programs on the gate level and the int CPU side by side """
+    registers = ['a', 'b', 'c', 'd', 'sp', 'status']
+
+    @staticmethod
+    def make_cpu(cpu_type, seed):
+        rng = random.Random(seed)
+        cpu = cpu_type(test_cpu.MockRam(), FakeHardDisk())
+        for i in range(256):
+            cpu.ram.memory[i] = dec_to_bin(rng.getrandbits(16))
+        for i in range(rng.getrandbits(4)):
+            cpu.ram.memory[rng.getrandbits(16)] = dec_to_bin(rng.getrandbits(6))
+        for register in TestCPUDifferential.registers:
+            getattr(cpu, register).value = dec_to_bin(rng.getrandbits(16))
+            getattr(cpu, register).next_value = getattr(cpu, register).value
+        return cpu
+
+    @pytest.mark.parametrize('seed', range(50))
+    def test_random_program(self, seed):
+        gate_cpu = self.make_cpu(GateCPU, seed)
+        int_cpu = self.make_cpu(CPU, seed)
+
+        for _ in range(40):
+            assert int_cpu() == gate_cpu()
+            gate_cpu.tick()
+            int_cpu.tick()
+
+            for register in self.registers:
+                assert getattr(int_cpu, register).value == getattr(gate_cpu, register).value
+            assert int_cpu.pc.register.value == gate_cpu.pc.register.value
+            assert int_cpu.ram.memory == gate_cpu.ram.memory
+
+
+class TestDecodedInstructionCache:
+    @pytest.fixture
+    def cpu(self):
+        return CPU(CombinedRAM(), FakeHardDisk())
+
+    @staticmethod
+    def load_instructions(ram, instructions, start=0):
+        for i, instruction in enumerate(instructions):
+            ram(instruction, dec_to_bin(start + i), 1)
+        ram.tick()
+
+    def test_instruction_is_cached(self, cpu):
+        self.load_instructions(cpu.ram, [move_opcode + a_address + constant_address, INT_TWO])
+
+        cpu()
+        cpu.tick()
+
+        assert cpu.decoded[0].constant == 2
+        assert cpu.a.word == 2
+
+    def test_write_to_ram_invalidates_instruction(self, cpu):
+        instructions = [move_opcode + a_address + constant_address, INT_ONE,
+                        reset_opcode]
+        self.load_instructions(cpu.ram, instructions)
+
+        cpu()
+        cpu.tick()
+        assert 0 in cpu.decoded
+
+        cpu()
+        cpu.tick()
+
+        self.load_instructions(cpu.ram, [INT_THREE], start=1)
+        assert 0 not in cpu.decoded
+
+        cpu()
+        cpu.tick()
+        assert cpu.a.word == 3
+
+    def test_self_modifying_code(self, cpu):
+        # Overwrite the constant of the first instruction, then jump back to it
+        instructions = [move_opcode + a_address + constant_address, INT_ONE,
+                        move_opcode + b_address + constant_address, INT_ONE,
+                        move_opcode + bp_address + constant_address, dec_to_bin(5),
+                        jump_opcode + unused_opcode + constant_address, ZEROS]
+        self.load_instructions(cpu.ram, instructions)
+
+        for _ in range(5):
+            cpu()
+            cpu.tick()
+
+        assert cpu.a.word == 5
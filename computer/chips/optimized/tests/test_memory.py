@@ -1,8 +1,13 @@
 import pytest
 
-from computer.chips.tests import test_memory
+from bitarray import bitarray
 
-from computer.chips.optimized.memory import RAM8K, RAM32K, CombinedRAM
+from computer.chips.tests import test_memory, INT_ONE
+
+from computer.chips.optimized.memory import RAM8K, RAM32K, CombinedRAM, ScreenRAM
+from computer.utility.numbers import dec_to_bin
+
+UNUSED = bitarray(16)
 
 
 class TestOptimizedRAM8K(test_memory.TestRam8K):
@@ -21,3 +26,95 @@ class TestOptimizedCombinedRAM(test_memory.TestCombinedRAM):
     @pytest.fixture
     def ram(self):
         return CombinedRAM()
+
+
+class TestIntRAM:
+    @pytest.fixture
+    def ram(self):
+        return CombinedRAM()
+
+    addresses = [0, 4735, 32767, 32768, 40959, 40960]
+
+    @pytest.mark.parametrize('address', addresses)
+    def test_write_then_read(self, ram, address):
+        ram.write(address, 1234)
+        assert ram.read(address) == 0
+
+        ram.tick()
+        assert ram.read(address) == 1234
+
+    def test_call_with_ints(self, ram):
+        assert ram(48, 32768, 1) == 0
+        ram.tick()
+
+        assert ram(0, 32768, 0) == 48
+        assert ram(UNUSED, dec_to_bin(32768), 0) == dec_to_bin(48)
+
+    def test_int_and_bitarray_share_memory(self, ram):
+        ram(dec_to_bin(63), dec_to_bin(100), 1)
+        ram.tick()
+
+        assert ram.read(100) == 63
+        assert ram.ram.words[100] == 63
+
+    def test_bits(self, ram):
+        ram.write(32768 + 1, 0b1000000000000011)
+        ram.tick()
+
+        assert ram.screen.bits[16:32] == bitarray('1000000000000011')
+        assert len(ram.screen.bits) == 2**13 * 16
+
+    def test_write_listeners(self, ram):
+        written = []
+        ram.write_listeners.append(written.append)
+
+        ram.write(10, 1)
+        ram(INT_ONE, dec_to_bin(11), 1)
+        ram(INT_ONE, dec_to_bin(12), 0)
+
+        assert written == [10, 11]
+
+
+class TestScreenRAM:
+    def test_changed_words(self):
+        ram = CombinedRAM()
+        ram.write(32768 + 5, 1)
+        ram.write(32768 + 2, 7)
+        ram.write(100, 1)
+        assert ram.screen.take_changed() == []
+
+        ram.tick()
+        assert ram.screen.take_changed() == [(2, 7), (5, 1)]
+        assert ram.screen.take_changed() == []
+
+    def test_same_word_written_twice(self):
+        ram = CombinedRAM()
+        ram.write(32768 + 5, 1)
+        ram.tick()
+        ram.write(32768 + 5, 3)
+        ram.tick()
+
+        assert ram.screen.take_changed() == [(5, 3)]
+
+    def test_replaced(self):
+        ram = CombinedRAM()
+        ram.screen.replaced([1])
+
+        assert [address for address, _ in ram.screen.take_changed()] == list(range(256, 512))
+        assert ram.screen.dirty_pages == {1}
+
+    def test_words_committed_before_recorded(self):
+        # take_changed on another thread reads the words of the recorded addresses
+        screen = ScreenRAM()
+        recorded = []
+
+        class Changed(set):
+            def update(self, addresses):
+                recorded.extend((i, screen.words[i]) for i in addresses)
+                super().update(addresses)
+
+        screen.changed_words = Changed()
+        screen.write(5, 7)
+        screen.tick()
+
+        assert recorded == [(5, 7)]
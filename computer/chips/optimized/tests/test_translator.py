@@ -0,0 +1,171 @@
+import random
+
+import pytest
+
+from computer.assembler.lexer import Lexer
+from computer.assembler.parser import Parser
+from computer.assembler.linker import link
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.translator import Translator
+from computer.chips.optimized.tests.test_central_processing_unit import FakeHardDisk
+from computer.chips.tests import test_central_processing_unit as test_cpu
+from computer.emulator import Emulator
+from computer.utility.numbers import dec_to_bin
+
+sum_program = """
+move a 0
+move b 10
+:loop
+add a b
+dec b
+compare b 0
+jump_zero end
+jump loop
+:end
+move [1000] a
+shutdown
+"""
+
+call_program = """
+move sp 2000
+move a 3
+call double
+move [1001] a
+shutdown
+:double
+add a a
+return
+"""
+
+self_modifying_program = """
+move b patch
+inc b
+move [b] 7
+:patch
+move a 1
+move [1002] a
+shutdown
+"""
+
+
+def assemble(source):
+    tokens = Lexer().scan(source)
+    parser = Parser()
+    instructions = parser.parse(tokens)
+    return link(instructions, parser.labels, parser.variables, mode='boot')
+
+
+def make_cpu(source):
+    cpu = CPU(CombinedRAM(), FakeHardDisk())
+    for i, instruction in enumerate(assemble(source)):
+        cpu.ram(instruction, dec_to_bin(i), 1)
+    cpu.ram.tick()
+    return cpu
+
+
+def state(cpu):
+    return (cpu.a.word, cpu.b.word, cpu.c.word, cpu.d.word,
+            cpu.sp.word, cpu.status.word, cpu.pc.register.word)
+
+
+def run_cpu(cpu, max_cycles=10000):
+    for _ in range(max_cycles):
+        shutdown = cpu()
+        cpu.tick()
+        if shutdown:
+            break
+
+
+def run_translated(cpu, max_cycles=10000):
+    translator = Translator(cpu)
+    cycles = 0
+    while cycles < max_cycles:
+        executed = translator.run_block()
+        if not executed:
+            shutdown = cpu()
+            cpu.tick()
+            if shutdown:
+                break
+            executed = 1
+        cycles += executed
+    return translator
+
+
+class TestTranslator:
+    programs = [(sum_program, 1000, 55),
+                (call_program, 1001, 6),
+                (self_modifying_program, 1002, 7)]
+
+    @pytest.mark.parametrize('source, address, expected', programs)
+    def test_program(self, source, address, expected):
+        reference = make_cpu(source)
+        run_cpu(reference)
+
+        cpu = make_cpu(source)
+        run_translated(cpu)
+
+        assert cpu.read(address) == expected
+        assert state(cpu) == state(reference)
+
+    def test_block_is_cached(self):
+        cpu = make_cpu(sum_program)
+        translator = run_translated(cpu)
+
+        assert translator.blocks
+        loop = cpu.read(2)
+        assert translator.blocks[4]() == 4
+        assert cpu.read(2) == loop
+
+    def test_write_drops_block(self):
+        cpu = make_cpu(sum_program)
+        translator = run_translated(cpu)
+        assert 4 in translator.blocks
+
+        cpu.ram(dec_to_bin(0), dec_to_bin(5), 1)
+
+        assert 4 not in translator.blocks
+        assert 5 not in translator.covering
+
+    def test_emulator_runs_blocks(self):
+        cpu = make_cpu(sum_program)
+        emulator = Emulator(cpu, translate=True)
+
+        emulator.run()
+
+        assert emulator.shutdown
+        assert cpu.read(1000) == 55
+
+
+class TestTranslatorDifferential:
+    """ Runs random programs translated and on the int CPU side by side """
+    @staticmethod
+    def make_cpu(seed):
+        rng = random.Random(seed)
+        cpu = CPU(test_cpu.MockRam(), FakeHardDisk())
+        for i in range(256):
+            cpu.ram.memory[i] = dec_to_bin(rng.getrandbits(16))
+        for register in [cpu.a, cpu.b, cpu.c, cpu.d, cpu.sp, cpu.status]:
+            register.word = register.next_word = rng.getrandbits(16)
+        return cpu
+
+    @pytest.mark.parametrize('seed', range(50))
+    def test_random_program(self, seed):
+        reference = self.make_cpu(seed)
+        cpu = self.make_cpu(seed)
+        translator = Translator(cpu)
+
+        cycles = 0
+        while cycles < 200:
+            executed = translator.run_block()
+            if not executed:
+                cpu()
+                cpu.tick()
+                executed = 1
+            for _ in range(executed):
+                reference()
+                reference.tick()
+            cycles += executed
+
+            assert state(cpu) == state(reference)
+            assert cpu.ram.memory == reference.ram.memory
@@ -0,0 +1,203 @@
+from computer.chips.optimized.arithmetic_logic_unit import ALU
+from computer.chips.optimized.central_processing_unit import (decode, MASK, CONSTANT, IO_START,
+                                                              MOVE, ALU_OP, HDD_OP)
+
+MAX_BLOCK_LENGTH = 64
+
+REGISTER_NAMES = ['a', 'b', 'c', 'd']
+
+
+class Translator:
+    """
+    Translates basic blocks of guest code into Python functions
+
+    A block is a run of straight-line instructions starting at some
+    address. It ends after a jump, call or return (any opcode with the
+    jump bit set), or before an instruction which is left to the CPU:
+    hdd ops, reset and shutdown. Code in screen and keyboard memory is
+    never translated.
+
+    Each block is compiled into one function working on the int
+    registers of an optimized CPU, and cached by its start address.
+    Calling a block executes it, commits the registers, pc and RAM
+    as if the CPU had been ticked once per instruction, and returns
+    the number of instructions executed.
+
+    Writes to a word covered by a block drop the block. A block
+    writing into its own code stops right after the write.
+
+    Blocks also end before breakpoints, so a run loop checking the pc
+    between blocks sees every breakpoint.
+    """
+    def __init__(self, cpu):
+        self.cpu = cpu
+
+        self.blocks = {}
+        self.block_ends = {}
+        self.covering = {}  # address -> start addresses of blocks using the word
+        self.breakpoints = frozenset()
+        cpu.write_listeners.append(self.invalidate)
+
+    def run_block(self):
+        """ :return: number of instructions executed, 0 if no block could be run """
+        block = self.blocks.get(self.cpu.pc.register.word)
+        if block is None:
+            block = self.translate(self.cpu.pc.register.word)
+            if block is None:
+                return 0
+        return block()
+
+    def set_breakpoints(self, addresses):
+        """ Drop the blocks running over new breakpoints """
+        addresses = frozenset(addresses)
+        for address in addresses - self.breakpoints:
+            self.invalidate(address)
+        self.breakpoints = addresses
+
+    def translate(self, start):
+        instructions = self.find_block(start)
+        if not instructions:
+            return None
+
+        end = instructions[-1][0] + instructions[-1][2]
+        source = self.generate_source(start, end, instructions)
+        namespace = {'read': self.cpu.read,
+                     'write': self.write,
+                     'alu': ALU,
+                     'a_register': self.cpu.a,
+                     'b_register': self.cpu.b,
+                     'c_register': self.cpu.c,
+                     'd_register': self.cpu.d,
+                     'sp_register': self.cpu.sp,
+                     'status_register': self.cpu.status,
+                     'pc_register': self.cpu.pc.register}
+        exec(compile(source, f'<block {start}>', 'exec'), namespace)
+        block = namespace['block']
+        block.source = source
+
+        self.blocks[start] = block
+        self.block_ends[start] = end
+        for address in range(start, end):
+            self.covering.setdefault(address, []).append(start)
+        return block
+
+    def find_block(self, start):
+        """ :return: list of (address, Decoded, size) """
+        instructions = []
+        address = start
+        while len(instructions) < MAX_BLOCK_LENGTH and address < IO_START - 1:
+            if address in self.breakpoints and address != start:
+                break
+            decoded = decode(self.cpu.read(address))
+            if decoded.operation == HDD_OP or decoded.is_reset or decoded.is_shutdown:
+                break
+            if CONSTANT in (decoded.source_select, decoded.target_select):
+                decoded = decoded._replace(constant=self.cpu.read(address + 1))
+            size = 2 if decoded.skip_constant else 1
+            instructions.append((address, decoded, size))
+            if decoded.instruction >> 12 & 0b0100:
+                break
+            address += size
+        return instructions
+
+    def generate_source(self, start, end, instructions):
+        lines = ['def block():',
+                 '    a = a_register.word',
+                 '    b = b_register.word',
+                 '    c = c_register.word',
+                 '    d = d_register.word',
+                 '    sp = sp_register.word',
+                 '    status = status_register.word']
+        for count, (address, decoded, size) in enumerate(instructions, 1):
+            lines.append(f'    # {address}: {decoded.instruction:016b}')
+            body, next_pc = self.generate_instruction(address, decoded, size, start, end, count)
+            lines.extend('    ' + line for line in body)
+        lines.extend('    ' + line for line in self.generate_exit(next_pc, len(instructions)))
+        return '\n'.join(lines) + '\n'
+
+    def generate_instruction(self, address, decoded, size, start, end, count):
+        constant_address = (address + 1) & MASK
+        next_address = (address + size) & MASK
+
+        registers = REGISTER_NAMES + ['sp', str(decoded.constant), '0', '0']
+        source_register = registers[decoded.source_select]
+        if decoded.source_select == 4 and decoded.is_pop:
+            source_register = '((sp + 1) & 0xFFFF)'
+        target_register = registers[decoded.target_select]
+
+        lines = [f"source = {f'read({source_register})' if decoded.source_is_pointer else source_register}"]
+
+        if decoded.operation == MOVE:
+            lines.append('result = source')
+        elif decoded.operation == ALU_OP:
+            lines.append(f"target = {f'read({target_register})' if decoded.target_is_pointer else target_register}")
+            if decoded.jump_mask:
+                lines.append('old_status = status')
+            lines.append(f'result, is_zero, is_neg, overflow = alu(target, source, {decoded.alu_opcode})')
+            lines.append('status = is_zero << 15 | is_neg << 14 | overflow << 13')
+
+        if decoded.is_call:
+            move_value = str((address + 2) & MASK if decoded.source_is_constant else constant_address)
+        else:
+            move_value = 'result'
+
+        exit_lines = []
+        if decoded.load:
+            if decoded.load_ram:
+                lines.append(f'store_address = {target_register}')
+                lines.append(f'write(store_address, {move_value})')
+                if not decoded.instruction >> 12 & 0b0100:
+                    exit_lines = [f'if {start} <= store_address < {end}:']
+                    exit_lines.extend('    ' + line for line in self.generate_exit(next_address, count))
+            elif decoded.target_select < 4:
+                lines.append(f'{REGISTER_NAMES[decoded.target_select]} = {move_value}')
+
+        if decoded.is_stack_op:
+            lines.append('sp = (sp + 1) & 0xFFFF' if decoded.is_pop else 'sp = (sp - 1) & 0xFFFF')
+        elif decoded.target_select == 4 and not decoded.load_ram:
+            lines.append('sp = result')
+
+        if decoded.is_jump:
+            next_pc = 'result'
+        elif decoded.jump_mask:
+            status = 'old_status' if decoded.operation == ALU_OP else 'status'
+            next_pc = f'result if {status} & {decoded.jump_mask} else {next_address}'
+        else:
+            next_pc = str(next_address)
+        return lines + exit_lines, next_pc
+
+    @staticmethod
+    def generate_exit(next_pc, count):
+        return ['a_register.word = a_register.next_word = a',
+                'b_register.word = b_register.next_word = b',
+                'c_register.word = c_register.next_word = c',
+                'd_register.word = d_register.next_word = d',
+                'sp_register.word = sp_register.next_word = sp',
+                'status_register.word = status_register.next_word = status',
+                f'pc_register.word = pc_register.next_word = {next_pc}',
+                f'return {count}']
+
+    def write(self, address, value):
+        self.cpu.write(address, value)
+        self.cpu.ram.tick()
+
+    def invalidate(self, address):
+        """ Drop the blocks using the word at address """
+        starts = self.covering.get(address)
+        if starts:
+            for start in list(starts):
+                self.drop_block(start)
+
+    def clear(self):
+        """ Drop all blocks """
+        self.blocks.clear()
+        self.block_ends.clear()
+        self.covering.clear()
+
+    def drop_block(self, start):
+        del self.blocks[start]
+        for address in range(start, self.block_ends.pop(start)):
+            starts = self.covering[address]
+            starts.remove(start)
+            if not starts:
+                del self.covering[address]
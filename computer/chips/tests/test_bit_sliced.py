@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from computer.chips.logic_gates import NOT, AND, OR, XOR, MUX, use_backend
+from computer.chips.logic_gates_16bit import NOT16, AND16, MUX16
+from computer.chips.arithmetic import ADD16, INC16
+from computer.chips.bit_sliced import BitSlicedBackend, pack, unpack, unpack_bit, batch_ALU, LANES
+from computer.chips.optimized.arithmetic_logic_unit import ALU as int_ALU
+
+MASK = 0xFFFF
+
+
+class TestBitSlicedBackend:
+    # Lanes 0-3 hold the rows of the truth tables
+    a = 0b1100
+    b = 0b1010
+    gates = [(NOT, (a,), 0b0011),
+             (AND, (a, b), 0b1000),
+             (OR, (a, b), 0b1110),
+             (XOR, (a, b), 0b0110),
+             (MUX, (a, b, 0b1111), b),
+             (MUX, (a, b, 0b0000), a)]
+
+    @pytest.mark.parametrize('gate, inputs, expected', gates)
+    def test_gates(self, gate, inputs, expected):
+        with use_backend(BitSlicedBackend(4)):
+            assert gate(*inputs) == expected
+
+    def test_pack(self):
+        words = pack([0b10, 0b11, 0b00], 2)
+
+        assert words == [0b011, 0b010]
+        assert unpack(words, 3) == [0b10, 0b11, 0b00]
+        assert unpack_bit(0b110, 3) == [0, 1, 1]
+
+    def test_unpack_ignores_unused_lanes(self):
+        assert unpack([0b1110], 2) == [0, 1]
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.getrandbits(16) for _ in range(count)]
+
+
+class TestChips:
+    def test_16bit(self):
+        a, b = random_words(LANES, 1), random_words(LANES, 2)
+        with use_backend(BitSlicedBackend()):
+            not_a = unpack(NOT16(pack(a, 16)), LANES)
+            a_and_b = unpack(AND16(pack(a, 16), pack(b, 16)), LANES)
+            a_or_b = unpack(MUX16(pack(a, 16), pack(b, 16), 0), LANES)
+
+        assert not_a == [~x & MASK for x in a]
+        assert a_and_b == [x & y for x, y in zip(a, b)]
+        assert a_or_b == a
+
+    def test_add16(self):
+        a, b = random_words(LANES, 3), random_words(LANES, 4)
+        with use_backend(BitSlicedBackend()):
+            out, carry = ADD16(pack(a, 16), pack(b, 16))
+
+        assert unpack(out, LANES) == [(x + y) & MASK for x, y in zip(a, b)]
+        assert unpack_bit(carry, LANES) == [(x + y) >> 16 for x, y in zip(a, b)]
+
+    def test_inc16_exhaustive(self):
+        lanes = 2**16
+        with use_backend(BitSlicedBackend(lanes)):
+            out, carry = INC16(pack(range(lanes), 16))
+
+        assert unpack(out, lanes) == [(x + 1) & MASK for x in range(lanes)]
+        assert unpack_bit(carry, lanes) == [0] * (lanes - 1) + [1]
+
+
+@pytest.mark.parametrize('count, lanes', [(1000, 64), (100, 7), (1, 64)])
+def test_batch_alu(count, lanes):
+    rng = random.Random(count)
+    a, b, opcodes = random_words(count, 5), random_words(count, 6), [rng.getrandbits(4) for _ in range(count)]
+
+    results = batch_ALU(a, b, opcodes, lanes)
+
+    assert results == [int_ALU(x, y, opcode) for x, y, opcode in zip(a, b, opcodes)]
@@ -0,0 +1,139 @@
+import random
+
+import pytest
+from bitarray import bitarray
+
+from computer.chips import logic_gates
+from computer.chips.logic_gates import NOT, AND, XOR, use_backend, DEFAULT_BACKEND
+from computer.chips.arithmetic import ADD16
+from computer.chips.arithmetic_logic_unit import ALU
+from computer.chips.central_processing_unit import CPU
+from computer.chips.instrumentation import CountingBackend, GateCounter, ChipCount, Signal
+from computer.chips.memory import RAM8
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.tests.test_central_processing_unit import FakeHardDisk
+from computer.chips.optimized.tests.test_translator import assemble, sum_program
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+from computer.utility.profiler import CLASSES, ALU as ALU_CLASS, JUMP, MOVE, SYSTEM
+
+
+class TestCountingBackend:
+    gates = [(NOT, (1,), 1, 1),
+             (AND, (1, 1), 2, 2),
+             (XOR, (0, 1), 5, 3)]
+
+    @pytest.mark.parametrize('gate, inputs, nands, depth', gates)
+    def test_gates(self, gate, inputs, nands, depth):
+        backend = CountingBackend()
+        with use_backend(backend):
+            out = gate(*inputs)
+
+        assert backend.nands == nands
+        assert out.depth == depth
+
+    def test_backend_restored(self):
+        with pytest.raises(ZeroDivisionError):
+            with use_backend(CountingBackend()):
+                1 / 0
+
+        assert logic_gates.backend is DEFAULT_BACKEND
+        assert type(ADD16(dec_to_bin(1), dec_to_bin(2))[0]) is bitarray
+
+    def test_add16(self):
+        backend = CountingBackend()
+        with use_backend(backend):
+            out, carry = ADD16(dec_to_bin(40000), dec_to_bin(30000))
+
+        assert bin_to_dec(out) == 70000 & 0xFFFF
+        assert carry == 1
+        # half adder 7 NANDs, full adders 17 NANDs
+        assert backend.counts['ADD16'] == ChipCount(1, 7 + 15 * 17, backend.counts['ADD16'].depth, 1)
+        assert backend.counts['ADD16'].depth == max(bit.depth for bit in out + [carry])
+
+    def test_alu_same_results(self):
+        rng = random.Random(0)
+        backend = CountingBackend()
+        for _ in range(20):
+            a, b, opcode = dec_to_bin(rng.getrandbits(16)), dec_to_bin(rng.getrandbits(16)), \
+                bitarray(f'{rng.getrandbits(4):04b}')
+            out, is_zero, is_neg, carry = ALU(a, b, opcode)
+            with use_backend(backend):
+                counted = ALU(a, b, opcode)
+
+            assert (bin_to_dec(counted[0]), *counted[1:]) == (bin_to_dec(out), is_zero, is_neg, carry)
+
+        # Every gate is evaluated whatever the inputs
+        assert backend.counts['ALU'].calls == 20
+        assert backend.counts['ALU'].nands % 20 == 0
+        assert backend.counts['INC16'].call_depth == 2
+
+    def test_ram8(self):
+        ram = RAM8()
+        backend = CountingBackend()
+        with use_backend(backend):
+            ram(dec_to_bin(1234), bitarray('101'), 1)
+            ram.tick()
+            out = ram(dec_to_bin(0), bitarray('101'), 0)
+
+        assert bin_to_dec(out) == 1234
+        assert backend.counts['RAM8'].calls == 2
+        assert backend.counts['MUX8WAY16'].call_depth == 2
+        assert backend.critical_path > 0
+
+    def test_latch(self):
+        backend = CountingBackend()
+        latched = backend.latch([Signal(1, 5), Signal(0, 3)])
+
+        assert latched == [1, 0]
+        assert not any(isinstance(bit, Signal) for bit in latched)
+        assert backend.critical_path == 5
+
+
+def make_counter():
+    cpu = CPU(CombinedRAM(), FakeHardDisk())
+    for i, instruction in enumerate(assemble(sum_program)):
+        cpu.ram(instruction, dec_to_bin(i), 1)
+    cpu.ram.tick()
+    return GateCounter(cpu)
+
+
+class TestGateCounter:
+    def test_run(self):
+        counter = make_counter()
+
+        assert counter.run() == 53
+        assert counter.shutdown
+        assert counter.cpu.ram.read(1000) == 55
+        assert sum(counter.ticks) == 53
+        assert counter.ticks[SYSTEM] == 1
+        assert all(counter.ticks[i] for i in (MOVE, ALU_CLASS, JUMP))
+
+    def test_counts_per_tick(self):
+        counter = make_counter()
+        counts = counter.tick()
+
+        assert counts['CPU'].calls == 1
+        assert counts['CPU'].call_depth == 1
+        assert counts['ALU'].calls == 1
+        assert counts['ALU'].call_depth == 2
+        assert counts['MUX8WAY16'].calls == 3
+        assert counts['CPU'].nands > counts['ALU'].nands > counts['ADD16'].nands
+
+    def test_class_totals(self):
+        counter = make_counter()
+        counter.run(20)
+        totals = counter.totals()
+
+        assert totals['CPU'].calls == 20
+        assert totals['CPU'].nands == sum(counts['CPU'].nands for counts in counter.class_counts if counts)
+        alu_counts = counter.class_counts[ALU_CLASS]['ALU']
+        assert alu_counts.calls == counter.ticks[ALU_CLASS]
+
+    def test_report(self):
+        counter = make_counter()
+        counter.run(10)
+        report = counter.report()
+
+        assert 'all: 10 ticks' in report
+        assert 'MUX8WAY16' in report
+        assert all(name in report for name, ticks in zip(CLASSES, counter.ticks) if ticks)
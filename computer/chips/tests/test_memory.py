@@ -3,7 +3,9 @@ import pytest
 
 from bitarray import bitarray
 
-from computer.chips.memory import Register, RAM8, RAM64, RAM512, RAM4K, RAM8K, RAM32K, CombinedRAM, PC
+from computer.chips.instrumentation import CountingBackend
+from computer.chips.logic_gates import use_backend
+from computer.chips.memory import Register, RegisterFile, RAM8, RAM64, RAM512, RAM4K, RAM8K, RAM32K, CombinedRAM, PC
 from computer.utility.numbers import dec_to_bin
 
 from computer.chips.tests import ZEROS, ONES, INT_ONE, INT_TWO, INT_THREE, INT_NEG_TWO, ALTERNATING_ONE_ZERO, ALTERNATING_ZERO_ONE
@@ -88,6 +90,64 @@ class TestRegister:
         register.tick()
         assert register(UNUSED, 0) == ONES
 
+    def test_read_only_value(self):
+        register = Register()
+        register(ONES, 1)
+        register.tick()
+
+        value = register(UNUSED, 0)
+        with pytest.raises(TypeError):
+            value[0] = 0
+        assert register.value == ONES
+
+    def test_next_value(self):
+        register = Register()
+
+        register.next_value = INT_TWO
+        assert register.value == ZEROS
+        assert register.next_value == INT_TWO
+
+        register.tick()
+        assert register.value == INT_TWO
+
+    @pytest.mark.parametrize('value', values)
+    def test_gate_backend(self, value):
+        register = Register()
+        backend = CountingBackend()
+
+        with use_backend(backend):
+            register(value, 1)
+            register.tick()
+            assert register(UNUSED, 0) == value
+
+        # MUX16 on both calls
+        assert backend.nands == 2 * 16 * 8
+
+
+class TestRegisterFile:
+    def test_tick_commits_loaded_registers(self):
+        registers = RegisterFile()
+        a, b = Register(registers), Register(registers)
+
+        a(INT_ONE, 1)
+        a(INT_TWO, 1)
+        assert registers.loaded == [a]
+
+        registers.tick()
+        assert a.value == INT_TWO
+        assert b.value == ZEROS
+        assert registers.loaded == []
+
+    def test_register_tick(self):
+        registers = RegisterFile()
+        a = Register(registers)
+
+        a(INT_ONE, 1)
+        a.tick()
+        registers.tick()
+        assert a.value == INT_ONE
+        assert a(UNUSED, 0) == INT_ONE
+
 
 class TestRam8:
 
@@ -169,6 +229,7 @@ class TestRam64:
 
         def tick(self):
             self.ticked += 1
+        _tick_slower = tick
 
     values = [# ZEROS, ONES,
               INT_ONE,
@@ -195,7 +256,7 @@ class TestRam64:
         assert ram.rams[i].received_address == bitarray('000')
         assert ram.rams[i].received_load == 1
 
-        ram.tick()
+        ram._tick_slower()
         assert ram.rams[i].ticked == 1
 
         assert ram(UNUSED, address, 0) == UNUSED
@@ -274,6 +335,77 @@ class TestRam4K:
         assert ram(UNUSED, address_2, 0) == value_2
 
 
+class TestDirtyTick:
+    def test_only_loaded_registers_committed(self):
+        ram = RAM512()
+
+        ram(INT_ONE, bitarray('000001010'), 1)
+        ram(INT_TWO, bitarray('110001111'), 1)
+        ram(ONES, bitarray('000001010'), 1)
+        assert len(ram.register_file.loaded) == 2
+
+        ram.tick()
+        assert ram.register_file.loaded == []
+        assert ram(UNUSED, bitarray('000001010'), 0) == ONES
+        assert ram(UNUSED, bitarray('110001111'), 0) == INT_TWO
+
+    def test_shared_register_file(self):
+        ram = CombinedRAM()
+        ram(ONES, dec_to_bin(3 * 4096 + 2 * 512), 1)
+        ram(ONES, dec_to_bin(2**15 + 4096), 1)
+
+        assert ram.ram.rams[3].rams[2].register_file is ram.register_file
+        assert ram.screen.rams[1].register_file is ram.register_file
+        assert ram.keyboard.register_file is ram.register_file
+
+    @pytest.mark.parametrize('ram_type, address', [(RAM64, bitarray('101110')),
+                                                   (RAM8K, bitarray('1101011011101'))])
+    def test_slower(self, ram_type, address):
+        ram = ram_type()
+
+        ram._call_slower(INT_THREE, address, 1)
+        ram._tick_slower()
+        assert ram._call_slower(UNUSED, address, 0) == INT_THREE
+
+        ram._call_slower(INT_ONE, address, 1)
+        ram.tick()
+        assert ram(UNUSED, address, 0) == INT_ONE
+        assert ram.register_file.loaded == []
+
+
+class TestLazyAllocation:
+    def test_read_zero(self):
+        ram = RAM32K()
+
+        assert ram(UNUSED, dec_to_bin(12345)[1:], 0) == ZEROS
+        assert ram.rams == [None] * 8
+
+    def test_allocated_on_write(self):
+        ram = RAM32K()
+        address = dec_to_bin(3 * 4096 + 5 * 512 + 7 * 64 + 1 * 8 + 6)[1:]
+
+        ram(INT_TWO, address, 1)
+        ram.tick()
+
+        assert [i for i, child in enumerate(ram.rams) if child is not None] == [3]
+        ram512 = ram.rams[3].rams[5]
+        assert [i for i, child in enumerate(ram512.rams) if child is not None] == [7]
+        assert ram(UNUSED, address, 0) == INT_TWO
+        assert ram(UNUSED, dec_to_bin(3 * 4096)[1:], 0) == ZEROS
+
+    def test_slower_allocates_written_ram_only(self):
+        ram = RAM8K()
+        address = bitarray('1000000000101')
+
+        ram._call_slower(INT_ONE, address, 1)
+        ram.tick()
+
+        assert ram.rams[0] is None
+        assert ram._call_slower(UNUSED, address, 0) == INT_ONE
+        assert ram._call_slower(UNUSED, bitarray('0000000000101'), 0) == ZEROS
+        assert ram.rams[0] is None
+
+
 class TestRam8K:
     @pytest.fixture
     def ram(self):
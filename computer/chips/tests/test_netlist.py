@@ -0,0 +1,134 @@
+import random
+
+import numpy as np
+import pytest
+from bitarray import bitarray
+
+from computer.chips import logic_gates
+from computer.chips.logic_gates import NOT, AND, OR, XOR, MUX
+from computer.chips.arithmetic import ADD16, INC16
+from computer.chips.arithmetic_logic_unit import ALU
+from computer.chips.netlist import trace, simplify, remove_dead_gates, optimize, python_source, \
+    compile_python, NumpyEvaluator, Netlist, TRUE, FALSE
+from computer.chips.optimized.arithmetic_logic_unit import ALU as int_ALU, UNARY_OPCODES
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+
+@pytest.fixture(scope='module')
+def alu_netlist():
+    return optimize(trace(ALU, 16, 16, 4))
+
+
+class TestTrace:
+    def test_gates(self):
+        netlist = trace(XOR, None, None)
+
+        assert netlist.inputs == [None, None]
+        assert len(netlist.gates) == 5
+        assert netlist.outputs == netlist.signal_count - 1
+        assert logic_gates.backend is logic_gates.DEFAULT_BACKEND
+
+    def test_constants(self):
+        netlist = trace(lambda a: (MUX(0, a, 1), AND(a, 0)), None)
+
+        assert netlist.gates[0] == (TRUE, TRUE)  # NOT(sel)
+        assert netlist.gates[1] == (FALSE, 3)  # NAND(0, NOT(sel))
+        assert (2, FALSE) in netlist.gates  # NAND(a, 0)
+
+    def test_branching(self):
+        def chip(a):
+            return NOT(a) if a else a
+
+        with pytest.raises(TypeError):
+            trace(chip, None)
+        assert logic_gates.backend is logic_gates.DEFAULT_BACKEND
+
+    def test_structure(self):
+        netlist = trace(ADD16, 16, 16)
+
+        assert netlist.inputs == [16, 16]
+        assert netlist.input_bits == 32
+        out, carry = netlist.outputs
+        assert len(out) == 16
+        assert isinstance(carry, int)
+
+
+class TestOptimize:
+    def test_constant_folding(self):
+        netlist = simplify(trace(lambda a: (AND(a, 0), OR(a, 1), AND(a, 1)), None))
+
+        assert netlist.outputs == (FALSE, TRUE, 2)
+        assert netlist.gates == [(2, 2)]
+
+    def test_double_negation(self):
+        netlist = optimize(trace(lambda a: NOT(NOT(NOT(NOT(a)))), None))
+
+        assert netlist.gates == []
+        assert netlist.outputs == 2
+
+    def test_common_subexpressions(self):
+        netlist = optimize(trace(lambda a, b: (AND(a, b), AND(b, a)), None, None))
+
+        assert len(netlist.gates) == 2
+        assert netlist.outputs[0] == netlist.outputs[1]
+
+    def test_dead_gates(self):
+        netlist = Netlist([None, None], [(2, 3), (2, 2), (4, 4)], 6)
+        netlist = remove_dead_gates(netlist)
+
+        assert netlist.gates == [(2, 3), (4, 4)]
+        assert netlist.outputs == 5
+
+    def test_alu_smaller(self, alu_netlist):
+        assert len(alu_netlist.gates) < len(trace(ALU, 16, 16, 4).gates)
+
+
+class TestPython:
+    def test_source(self):
+        source = python_source(trace(AND, None, None), 'AND')
+
+        assert source.startswith('def AND(in0, in1):')
+        assert 'return s5' in source
+
+    @pytest.mark.parametrize('a', [0, 1, 0x7FFF, 0xFFFF, 12345])
+    def test_inc16(self, a):
+        inc16 = compile_python(optimize(trace(INC16, 16)))
+
+        out, carry = inc16(dec_to_bin(a))
+        expected_out, expected_carry = INC16(dec_to_bin(a))
+        assert isinstance(out, bitarray)
+        assert (out, carry) == (expected_out, expected_carry)
+
+    def test_alu(self, alu_netlist):
+        alu = compile_python(alu_netlist, 'ALU')
+        rng = random.Random(0)
+        for _ in range(1000):
+            a, b, opcode = rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(4)
+            out, is_zero, is_neg, carry = alu(dec_to_bin(a), dec_to_bin(b), bitarray(f'{opcode:04b}'))
+
+            assert (bin_to_dec(out), is_zero, is_neg, carry) == int_ALU(a, b, opcode)
+
+
+class TestNumpyEvaluator:
+    def test_alu(self, alu_netlist):
+        evaluate = NumpyEvaluator(alu_netlist)
+        rng = np.random.default_rng(0)
+        a, b, opcode = rng.integers(0, 2**16, 5000), rng.integers(0, 2**16, 5000), rng.integers(0, 16, 5000)
+
+        out, is_zero, is_neg, carry = evaluate(a, b, opcode)
+        for i in range(len(a)):
+            assert (out[i], is_zero[i], is_neg[i], carry[i]) == int_ALU(int(a[i]), int(b[i]), int(opcode[i]))
+
+    def test_unary_exhaustive(self, alu_netlist):
+        evaluate = NumpyEvaluator(alu_netlist)
+        a = np.arange(2**16)
+        for opcode in UNARY_OPCODES:
+            out, is_zero, is_neg, carry = evaluate(a, np.zeros_like(a), np.full_like(a, opcode))
+            expected = np.array([int_ALU(int(value), 0, opcode) for value in a])
+
+            assert (np.stack([out, is_zero, is_neg, carry], axis=1) == expected).all()
+
+    def test_single_bits(self):
+        evaluate = NumpyEvaluator(optimize(trace(XOR, None, None)))
+
+        assert evaluate([0, 0, 1, 1], [0, 1, 0, 1]).tolist() == [0, 1, 1, 0]
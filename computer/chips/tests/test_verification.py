@@ -0,0 +1,76 @@
+import pytest
+
+from computer.chips import verification
+from computer.chips.arithmetic import INC16
+from computer.chips.verification import Task, CHECKS, make_tasks, run_task, verify, main
+
+
+class TestTasks:
+    def test_exhaustive_tasks_cover_input_space(self):
+        tasks = make_tasks(['INC16', 'ALU unary'], samples=10, chunk_size=4096)
+
+        inc16 = [task for task in tasks if task.check == 'INC16']
+        assert sum(task.stop - task.start for task in inc16) == 2**16
+        assert all(task.seed is None for task in tasks)
+        assert tasks[-1].stop == 6 * 2**16
+
+    def test_sampled_tasks(self):
+        tasks = make_tasks(['ALU'], samples=10000, seed=3, chunk_size=4096)
+
+        assert [(task.start, task.stop, task.seed) for task in tasks] == [(0, 4096, 3), (4096, 8192, 3),
+                                                                           (8192, 10000, 3)]
+
+    def test_sampling_is_seeded(self, monkeypatch):
+        inputs = []
+        monkeypatch.setitem(CHECKS, 'ALU', (lambda rng: inputs.append(rng.getrandbits(16)), None))
+
+        run_task(Task('ALU', 0, 10, 1))
+        run_task(Task('ALU', 5, 10, 1))
+        run_task(Task('ALU', 0, 10, 2))
+
+        assert inputs[:10][5:] == inputs[10:15]
+        assert inputs[:10] != inputs[15:]
+
+
+class TestChecks:
+    @pytest.mark.parametrize('check, start, stop', [('NOT16', 0, 2**16),
+                                                    ('INC16', 0, 2**16),
+                                                    ('ALU unary', 0, 2048),
+                                                    ('ALU unary', 5 * 2**16 - 1024, 5 * 2**16 + 1024),
+                                                    ('ADD16 all', 0, 16),
+                                                    ('ADD16 all', 2**16 - 16, 2**16)])
+    def test_exhaustive(self, check, start, stop):
+        report = run_task(Task(check, start, stop, None))
+
+        assert report.checked == stop - start
+        assert report.mismatches == []
+
+    def test_sampled(self):
+        reports = verify(['AND16', 'OR16', 'MUX16', 'ADD16', 'ALU', 'CombinedRAM', 'ALU sliced'],
+                         samples=512, workers=0)
+
+        assert [report.checked for report in reports.values()] == [512] * 5 + [2, 8]
+        assert all(report.mismatches == [] for report in reports.values())
+
+    def test_process_pool(self):
+        reports = verify(['ALU'], samples=64, workers=2, chunk_size=16)
+
+        assert reports['ALU'].checked == 64
+        assert reports['ALU'].mismatches == []
+
+
+def test_add16_all_mismatch(monkeypatch):
+    monkeypatch.setattr(verification, 'ADD16', lambda a, b: INC16(a))
+
+    assert verification.check_add16_all(1) is None
+    assert verification.check_add16_all(0).startswith('ADD16(')
+
+
+def test_mismatches_reported(monkeypatch, capsys):
+    monkeypatch.setattr(verification, 'ALU', lambda a, b, opcode: (0, 0, 0, 0))
+
+    assert main(['--checks', 'ALU', '--samples', '20', '--workers', '0']) == 1
+
+    output = capsys.readouterr().out
+    assert 'MISMATCH' in output
+    assert output.count('ALU(') == verification.MAX_MISMATCHES
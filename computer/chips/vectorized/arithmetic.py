@@ -0,0 +1,36 @@
+import numpy as np
+
+from computer.chips.vectorized.logic_gates import XOR, AND, OR, NOT
+
+
+def half_adder(a, b):
+    sum_ab = XOR(a, b)
+    carry = AND(a, b)
+    return sum_ab, carry
+
+
+def full_adder(a, b, c):
+    sum_bc, carry_1 = half_adder(b, c)
+    sum_abc, carry_2 = half_adder(a, sum_bc)
+    carry = OR(carry_1, carry_2)
+    return sum_abc, carry
+
+
+def ADD16(a, b):
+    a, b = np.broadcast_arrays(a, b)
+    out = np.empty(a.shape, dtype=bool)
+
+    out[..., -1], carry = half_adder(a[..., -1], b[..., -1])
+    for i in range(2, 17):
+        out[..., -i], carry = full_adder(a[..., -i], b[..., -i], carry)
+    return out, carry
+
+
+def INC16(a):
+    out = np.empty(np.shape(a), dtype=bool)
+
+    out[..., -1] = NOT(a[..., -1])
+    carry = a[..., -1].astype(bool)
+    for i in range(2, 17):
+        out[..., -i], carry = half_adder(a[..., -i], carry)
+    return out, carry
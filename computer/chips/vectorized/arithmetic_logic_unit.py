@@ -0,0 +1,56 @@
+from computer.chips.vectorized.logic_gates import NOT, AND, OR, MUX
+from computer.chips.vectorized.logic_gates_16bit import NOT16, AND16, OR16, XOR16
+from computer.chips.vectorized.logic_gates_multi_way import OR8WAY, MUX16, MUX4WAY16
+
+from computer.chips.vectorized.arithmetic import INC16, ADD16
+
+
+def ALU(a, b, opcode):
+    """
+    Vectorized computer.chips.arithmetic_logic_unit.ALU, see it for the opcodes
+
+    :param a: bool array (N, 16)
+    :param b: bool array (N, 16)
+    :param opcode: bool array (N, 4)
+
+    :return:
+    :out: bool array (N, 16)
+    :is_zero: bool array (N,)
+    :is_neg: bool array (N,)
+    :carry: bool array (N,)
+    """
+
+    bitflip = NOT16(a)
+
+    # Arithmetic
+    neg_a, dec_carry = INC16(bitflip)
+    a1 = MUX16(a, neg_a, opcode[..., 3])
+
+    inc, inc_carry = INC16(a1)
+    dec, _ = INC16(NOT16(inc))
+    inc_or_dec = MUX16(inc, dec, opcode[..., 3])
+
+    add, add_carry = ADD16(a1, b)
+    sub, _ = INC16(NOT16(add))
+    add_or_sub = MUX16(add, sub, opcode[..., 3])
+
+    pass_through_or_incdec = MUX16(a1, inc_or_dec, opcode[..., 2])
+    arithmetic = MUX16(pass_through_or_incdec, add_or_sub, opcode[..., 1])
+
+    # Logical
+    a_log = MUX16(a, bitflip, opcode[..., 3])
+
+    logical = MUX4WAY16(a_log, AND16(a_log, b), OR16(a_log, b), XOR16(a_log, b), opcode[..., 1:3])
+
+    # Choose arithmetic or logical output
+    out = MUX16(arithmetic, logical, opcode[..., 0])
+
+    # Set control bits
+    is_zero = NOT(OR(OR8WAY(out[..., 0:8]), OR8WAY(out[..., 8:16])))
+    is_neg = out[..., 0]
+
+    carry_2 = AND(add_carry, opcode[..., 1])
+    carry_1 = MUX(carry_2, inc_carry, AND(opcode[..., 2], NOT(opcode[..., 3])))
+    carry_a = MUX(carry_1, dec_carry, AND(opcode[..., 2], opcode[..., 3]))
+    carry = AND(carry_a, NOT(opcode[..., 0]))
+    return out, is_zero, is_neg, carry
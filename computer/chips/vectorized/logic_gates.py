@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def NAND(a, b):
+    return np.logical_not(np.logical_and(a, b))
+
+
+def NOT(a):
+    return NAND(a, a)
+
+
+def AND(a, b):
+    return NOT(NAND(a, b))
+
+
+def OR(a, b):
+    return NAND(NOT(a), NOT(b))
+
+
+def XOR(a, b):
+    return NAND(NAND(NOT(a), b), NAND(a, NOT(b)))
+
+
+def MUX(a, b, sel):
+    return OR(AND(a, NOT(sel)), AND(b, sel))
+
+
+def DMUX(a, sel):
+    return np.stack((AND(a, NOT(sel)), AND(a, sel)), axis=-1)
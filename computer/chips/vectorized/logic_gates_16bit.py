@@ -0,0 +1,23 @@
+import numpy as np
+
+from computer.chips.vectorized.logic_gates import NOT, AND, OR, XOR, MUX
+
+
+def NOT16(a):
+    return NOT(a)
+
+
+def AND16(a, b):
+    return AND(a, b)
+
+
+def OR16(a, b):
+    return OR(a, b)
+
+
+def XOR16(a, b):
+    return XOR(a, b)
+
+
+def MUX16(a, b, sel):
+    return MUX(a, b, np.asarray(sel)[..., None])
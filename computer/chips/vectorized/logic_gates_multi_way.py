@@ -0,0 +1,34 @@
+import numpy as np
+
+from computer.chips.vectorized.logic_gates import OR, DMUX
+from computer.chips.vectorized.logic_gates_16bit import MUX16
+
+
+def OR8WAY(a):
+    return OR(OR(OR(a[..., 0], a[..., 1]),
+                 OR(a[..., 2], a[..., 3])),
+              OR(OR(a[..., 4], a[..., 5]),
+                 OR(a[..., 6], a[..., 7])))
+
+
+def MUX4WAY16(a, b, c, d, sel):
+    mux16_ab = MUX16(a, b, sel[..., 1])
+    mux16_cd = MUX16(c, d, sel[..., 1])
+    return MUX16(mux16_ab, mux16_cd, sel[..., 0])
+
+
+def MUX8WAY16(a, b, c, d, e, f, g, h, sel):
+    mux_abcd = MUX4WAY16(a, b, c, d, sel[..., 1:])
+    mux_efgh = MUX4WAY16(e, f, g, h, sel[..., 1:])
+    return MUX16(mux_abcd, mux_efgh, sel[..., 0])
+
+
+def DMUX4WAY(a, sel):
+    o = DMUX(a, sel[..., 0])
+    return np.concatenate((DMUX(o[..., 0], sel[..., 1]),
+                           DMUX(o[..., 1], sel[..., 1])), axis=-1)
+
+
+def DMUX8WAY(a, sel):
+    o = DMUX4WAY(a, sel[..., :2])
+    return np.concatenate([DMUX(o[..., i], sel[..., 2]) for i in range(4)], axis=-1)
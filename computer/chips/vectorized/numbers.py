@@ -0,0 +1,14 @@
+import numpy as np
+
+BIT_WEIGHTS = (1 << np.arange(15, -1, -1)).astype(np.uint16)
+
+
+def dec_to_bin(words):
+    """ :return: bool array (..., 16), most significant bit first, like bitarrays """
+    words = np.asarray(words, dtype=np.uint16)
+    return (words[..., None] & BIT_WEIGHTS) != 0
+
+
+def bin_to_dec(bits):
+    """ :return: uint16 array of the words in bool array (..., 16) """
+    return (np.asarray(bits, dtype=np.uint16) * BIT_WEIGHTS).sum(axis=-1, dtype=np.uint16)
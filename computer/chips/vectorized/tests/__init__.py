@@ -0,0 +1,13 @@
+import numpy as np
+
+from bitarray import bitarray
+
+
+def batch(column):
+    """ Stack a column of a gate level truth table into one bool array """
+    return np.array([list(value) if isinstance(value, bitarray) else value
+                     for value in column], dtype=bool)
+
+
+def batch_table(truth_table):
+    return [batch(column) for column in zip(*truth_table)]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from computer.chips.tests import test_arithmetic
+from computer.chips.vectorized.arithmetic import half_adder, full_adder, ADD16, INC16
+from computer.chips.vectorized.numbers import dec_to_bin, bin_to_dec
+from computer.chips.vectorized.tests import batch_table
+
+adders = [(half_adder, test_arithmetic.TestHalfAdder, 2),
+          (full_adder, test_arithmetic.TestFullAdder, 3),
+          (ADD16, test_arithmetic.TestAdd16, 2),
+          (INC16, test_arithmetic.TestInc16, 1)]
+
+
+class TestVectorizedArithmetic:
+    @pytest.mark.parametrize('adder, test_class, number_of_inputs', adders)
+    def test_truth_table(self, adder, test_class, number_of_inputs):
+        columns = batch_table(test_class.truth_table)
+        inputs = columns[:number_of_inputs]
+        expected_out, expected_carry = columns[number_of_inputs:]
+
+        out, carry = adder(*inputs)
+        assert (out == expected_out).all()
+        assert (carry == expected_carry).all()
+
+    def test_inc16_all_inputs(self):
+        words = np.arange(2**16, dtype=np.uint16)
+
+        out, carry = INC16(dec_to_bin(words))
+
+        assert (bin_to_dec(out) == words + np.uint16(1)).all()
+        assert carry.sum() == 1 and carry[-1]
+
+    def test_add16_random_inputs(self):
+        rng = np.random.default_rng(0)
+        a = rng.integers(0, 2**16, 4096, dtype=np.uint16)
+        b = rng.integers(0, 2**16, 4096, dtype=np.uint16)
+
+        out, carry = ADD16(dec_to_bin(a), dec_to_bin(b))
+
+        total = a.astype(np.uint32) + b
+        assert (bin_to_dec(out) == total.astype(np.uint16)).all()
+        assert (carry == (total >> 16).astype(bool)).all()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from bitarray import bitarray
+
+from computer.chips.arithmetic_logic_unit import ALU as GateALU
+from computer.chips.optimized.arithmetic_logic_unit import ALU as IntALU
+from computer.chips.tests.test_arithmetic_logic_unit import TestALU
+from computer.chips.vectorized.arithmetic_logic_unit import ALU
+from computer.chips.vectorized.numbers import dec_to_bin, bin_to_dec
+from computer.chips.vectorized.tests import batch, batch_table
+
+OPCODES = np.array([[int(bit) for bit in f'{opcode:04b}'] for opcode in range(16)], dtype=bool)
+
+truth_tables = [(TestALU.truth_table_pass_through, '0000'),
+                (TestALU.truth_table_negate, '0001'),
+                (TestALU.truth_table_increment, '0010'),
+                (TestALU.truth_table_decrement, '0011'),
+                (TestALU.truth_table_add, '0100'),
+                (TestALU.truth_table_sub, '0101'),
+                (TestALU.truth_table_bitflip, '1001'),
+                (TestALU.truth_table_and, '1010'),
+                (TestALU.truth_table_or, '1100'),
+                (TestALU.truth_table_xor, '1110')]
+
+
+class TestVectorizedALU:
+    @pytest.mark.parametrize('truth_table, opcode', truth_tables)
+    def test_truth_table(self, truth_table, opcode):
+        a, b, expected_out, expected_status = batch_table(truth_table)
+        opcode = np.broadcast_to(batch([bitarray(opcode)]), (len(a), 4))
+
+        out, is_zero, is_neg, carry = ALU(a, b, opcode)
+
+        assert (out == expected_out).all()
+        assert (np.stack((is_zero, is_neg, carry), axis=-1) == expected_status).all()
+
+    def test_all_opcodes_against_int_alu(self):
+        rng = np.random.default_rng(0)
+        n = 2**12
+        a = rng.integers(0, 2**16, 16 * n, dtype=np.uint16)
+        b = rng.integers(0, 2**16, 16 * n, dtype=np.uint16)
+        a[:16 * 4] = [0, 1, 0x7FFF, 0xFFFF] * 16
+        opcodes = np.repeat(np.arange(16), n)
+
+        out, is_zero, is_neg, carry = ALU(dec_to_bin(a), dec_to_bin(b), OPCODES[opcodes])
+        out = bin_to_dec(out)
+
+        for i in range(0, 16 * n, 7):
+            expected = IntALU(int(a[i]), int(b[i]), int(opcodes[i]))
+            assert (int(out[i]), int(is_zero[i]), int(is_neg[i]), int(carry[i])) == expected
+
+    def test_against_gate_alu(self):
+        rng = np.random.default_rng(1)
+        a = rng.integers(0, 2**16, 64, dtype=np.uint16)
+        b = rng.integers(0, 2**16, 64, dtype=np.uint16)
+        opcodes = rng.integers(0, 16, 64)
+
+        out, is_zero, is_neg, carry = ALU(dec_to_bin(a), dec_to_bin(b), OPCODES[opcodes])
+
+        for i in range(64):
+            expected = GateALU(bitarray(dec_to_bin(a[i]).tolist()), bitarray(dec_to_bin(b[i]).tolist()),
+                               bitarray(OPCODES[opcodes[i]].tolist()))
+            assert bitarray(out[i].tolist()) == expected[0]
+            assert (is_zero[i], is_neg[i], carry[i]) == expected[1:]
@@ -0,0 +1,37 @@
+import pytest
+
+from computer.chips.tests import test_logic_gates, test_logic_gates_16bit, test_logic_gates_multi_way
+from computer.chips.vectorized.logic_gates import NAND, NOT, AND, OR, XOR, MUX, DMUX
+from computer.chips.vectorized.logic_gates_16bit import NOT16, AND16, OR16, XOR16, MUX16
+from computer.chips.vectorized.logic_gates_multi_way import (OR8WAY, MUX4WAY16, MUX8WAY16,
+                                                             DMUX4WAY, DMUX8WAY)
+from computer.chips.vectorized.tests import batch_table
+
+gates = [(NAND, test_logic_gates.TestNand),
+         (NOT, test_logic_gates.TestNot),
+         (AND, test_logic_gates.TestAnd),
+         (OR, test_logic_gates.TestOr),
+         (XOR, test_logic_gates.TestXOr),
+         (MUX, test_logic_gates.TestMux),
+         (DMUX, test_logic_gates.TestDMux),
+         (NOT16, test_logic_gates_16bit.TestNot16),
+         (AND16, test_logic_gates_16bit.TestAnd16),
+         (OR16, test_logic_gates_16bit.TestOr16),
+         (XOR16, test_logic_gates_16bit.TestXOr16),
+         (MUX16, test_logic_gates_16bit.TestMux16),
+         (OR8WAY, test_logic_gates_multi_way.TestOr8Way),
+         (MUX4WAY16, test_logic_gates_multi_way.TestMux4Way16),
+         (MUX8WAY16, test_logic_gates_multi_way.TestMux8Way16),
+         (DMUX4WAY, test_logic_gates_multi_way.TestDMux4Way),
+         (DMUX8WAY, test_logic_gates_multi_way.TestDMux8Way)]
+
+
+class TestVectorizedGates:
+    @pytest.mark.parametrize('gate, test_class', gates)
+    def test_truth_table(self, gate, test_class):
+        *inputs, expected = batch_table(test_class.truth_table)
+        assert (gate(*inputs) == expected).all()
+
+    def test_single_input(self):
+        assert not NAND(1, 1)
+        assert not MUX16([1] * 16, [0] * 16, 1).any()
@@ -0,0 +1,267 @@
+"""
+Differential verification of the gate level chips against their
+optimized and int counterparts
+
+    python -m computer.chips.verification --workers 8 --samples 100000
+
+Runs both sides on the same inputs: the full input space where that is
+feasible (16 bit unary chips, the unary ALU opcodes, ADD16 on the bit
+sliced backend), seeded random samples otherwise. The work is split in
+tasks run across a process pool.
+"""
+import argparse
+import random
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bitarray import bitarray
+
+from computer.chips import logic_gates_16bit as gate_16bit
+from computer.chips.logic_gates import use_backend
+from computer.chips.bit_sliced import BitSlicedBackend, LANES, pack, batch_ALU
+from computer.chips.optimized import logic_gates_16bit as optimized_16bit
+from computer.chips.arithmetic import ADD16, INC16
+from computer.chips.arithmetic_logic_unit import ALU as GateALU
+from computer.chips.optimized.arithmetic_logic_unit import ALU, memoized_ALU, UNARY_OPCODES
+from computer.chips import memory as gate_memory
+from computer.chips.optimized import memory as optimized_memory
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+MASK = 0xFFFF
+
+# Inputs per task
+CHUNK_SIZE = 4096
+# Mismatches kept per task
+MAX_MISMATCHES = 10
+
+Task = namedtuple('Task', ('check', 'start', 'stop', 'seed'))
+Report = namedtuple('Report', ('check', 'checked', 'mismatches'))
+
+
+def bits(word):
+    return [int(bit) for bit in dec_to_bin(word)]
+
+
+def as_ints(out):
+    return [int(bit) for bit in out]
+
+
+# Each check compares one input, given as an index into its exhaustive
+# range or drawn from a seeded random generator, and returns None or a
+# description of the mismatch.
+def check_not16(a):
+    gate = as_ints(gate_16bit.NOT16(dec_to_bin(a)))
+    optimized = as_ints(optimized_16bit.NOT16(bits(a)))
+    if not gate == optimized == bits(~a & MASK):
+        return f'NOT16({a}): gate {gate}, optimized {optimized}'
+
+
+def check_inc16(a):
+    out, carry = INC16(dec_to_bin(a))
+    expected = ((a + 1) & MASK, (a + 1) >> 16)
+    if (bin_to_dec(out), carry) != expected:
+        return f'INC16({a}): gate {(bin_to_dec(out), carry)}, int {expected}'
+
+
+def check_unary_alu(index):
+    opcode = UNARY_OPCODES[index >> 16]
+    a = index & MASK
+    return compare_alu(a, 0, opcode)
+
+
+def compare_alu(a, b, opcode):
+    out, is_zero, is_neg, carry = GateALU(dec_to_bin(a), dec_to_bin(b), bitarray(f'{opcode:04b}'))
+    gate = (bin_to_dec(out), int(is_zero), int(is_neg), int(carry))
+    if not gate == ALU(a, b, opcode) == memoized_ALU(a, b, opcode):
+        return f'ALU({a}, {b}, {opcode:04b}): gate {gate}, int {ALU(a, b, opcode)}, ' \
+               f'memoized {memoized_ALU(a, b, opcode)}'
+
+
+def check_and16(rng):
+    a, b = rng.getrandbits(16), rng.getrandbits(16)
+    gate = as_ints(gate_16bit.AND16(dec_to_bin(a), dec_to_bin(b)))
+    optimized = as_ints(optimized_16bit.AND16(bits(a), bits(b)))
+    if not gate == optimized == bits(a & b):
+        return f'AND16({a}, {b}): gate {gate}, optimized {optimized}'
+
+
+def check_or16(rng):
+    a, b = rng.getrandbits(16), rng.getrandbits(16)
+    gate = as_ints(gate_16bit.OR16(dec_to_bin(a), dec_to_bin(b)))
+    optimized = as_ints(optimized_16bit.OR16(bits(a), bits(b)))
+    if not gate == optimized == bits(a | b):
+        return f'OR16({a}, {b}): gate {gate}, optimized {optimized}'
+
+
+def check_mux16(rng):
+    a, b, sel = rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(1)
+    gate = as_ints(gate_16bit.MUX16(dec_to_bin(a), dec_to_bin(b), sel))
+    optimized = as_ints(optimized_16bit.MUX16(bits(a), bits(b), sel))
+    if not gate == optimized == bits(b if sel else a):
+        return f'MUX16({a}, {b}, {sel}): gate {gate}, optimized {optimized}'
+
+
+def check_add16(rng):
+    a, b = rng.getrandbits(16), rng.getrandbits(16)
+    out, carry = ADD16(dec_to_bin(a), dec_to_bin(b))
+    expected = ((a + b) & MASK, (a + b) >> 16)
+    if (bin_to_dec(out), carry) != expected:
+        return f'ADD16({a}, {b}): gate {(bin_to_dec(out), carry)}, int {expected}'
+
+
+def check_alu(rng):
+    return compare_alu(rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(4))
+
+
+def check_alu_sliced(rng):
+    """ LANES random inputs, in one bit sliced evaluation of the gate level ALU """
+    inputs = [(rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(4)) for _ in range(LANES)]
+    for (a, b, opcode), gate in zip(inputs, batch_ALU(*zip(*inputs))):
+        if gate != ALU(a, b, opcode):
+            return f'ALU({a}, {b}, {opcode:04b}): bit sliced gate {gate}, int {ALU(a, b, opcode)}'
+
+
+# ADD16 of one b and all values of a, with a in the lanes: lane j holds j
+ALL_LANES = (1 << 2**16) - 1
+_all_values = []
+
+
+def check_add16_all(b):
+    if not _all_values:
+        _all_values.extend(pack(range(2**16), 16))
+    a = _all_values
+
+    with use_backend(BitSlicedBackend(2**16)):
+        out, carry = ADD16(a, [ALL_LANES if bit else 0 for bit in dec_to_bin(b)])
+
+    # Lane j holds j + b: the lanes of a rotated by b, with a carry from lane 2**16 - b on
+    expected = [(word >> b | word << (2**16 - b)) & ALL_LANES for word in a]
+    expected_carry = ALL_LANES ^ ((1 << (2**16 - b)) - 1)
+    for word, expected_word in zip(out + [carry], expected + [expected_carry]):
+        if word != expected_word:
+            differences = word ^ expected_word
+            a_value = (differences & -differences).bit_length() - 1
+            gate = sum((word >> a_value & 1) << (15 - i) for i, word in enumerate(out))
+            return f'ADD16({a_value}, {b}): bit sliced gate {(gate, carry >> a_value & 1)}, ' \
+                   f'int {((a_value + b) & MASK, (a_value + b) >> 16)}'
+
+
+# Words per random RAM sequence, and the addresses they use
+RAM_SEQUENCE = 64
+RAM_REGIONS = [(0, 2**15), (2**15, 2**15 + 2**13), (40960, 40961)]
+
+
+def check_combined_ram(rng):
+    """ A random sequence of reads and writes, in RAM, screen and keyboard """
+    gate = gate_memory.CombinedRAM()
+    optimized = optimized_memory.CombinedRAM()
+    for i in range(RAM_SEQUENCE):
+        start, stop = rng.choice(RAM_REGIONS)
+        address = dec_to_bin(rng.randrange(start, stop))
+        value = dec_to_bin(rng.getrandbits(16))
+        load = rng.getrandbits(1)
+
+        gate_out = gate(value, address, load)
+        optimized_out = optimized(value, address, load)
+        if gate_out != optimized_out:
+            return f'CombinedRAM step {i}, address {bin_to_dec(address)}: ' \
+                   f'gate {bin_to_dec(gate_out)}, optimized {bin_to_dec(optimized_out)}'
+        gate.tick()
+        optimized.tick()
+
+
+# name: (check, size of the exhaustive input space or None for sampling)
+CHECKS = {'NOT16': (check_not16, 2**16),
+          'INC16': (check_inc16, 2**16),
+          'ALU unary': (check_unary_alu, len(UNARY_OPCODES) * 2**16),
+          # Every input checks all 2**16 values of a for one b
+          'ADD16 all': (check_add16_all, 2**16),
+          'AND16': (check_and16, None),
+          'OR16': (check_or16, None),
+          'MUX16': (check_mux16, None),
+          'ADD16': (check_add16, None),
+          'ALU': (check_alu, None),
+          'ALU sliced': (check_alu_sliced, None),
+          'CombinedRAM': (check_combined_ram, None)}
+
+# Random CombinedRAM sequences are much more work than single inputs,
+# a bit sliced ALU sample checks LANES inputs
+SAMPLE_SCALE = {'CombinedRAM': 1 / 256, 'ALU sliced': 1 / LANES}
+
+
+def make_tasks(checks, samples, seed=0, chunk_size=CHUNK_SIZE):
+    """
+    :param samples: random inputs per sampled check
+    :return: list of Task, exhaustive checks are split in ranges of
+             indexes, sampled ones in seeded ranges of samples
+    """
+    tasks = []
+    for name in checks:
+        _, size = CHECKS[name]
+        if size is None:
+            size = max(1, int(samples * SAMPLE_SCALE.get(name, 1)))
+            task_seed = seed
+        else:
+            task_seed = None
+        for start in range(0, size, chunk_size):
+            tasks.append(Task(name, start, min(start + chunk_size, size), task_seed))
+    return tasks
+
+
+def run_task(task):
+    """ :return: Report of the task """
+    check, _ = CHECKS[task.check]
+    mismatches = []
+    for i in range(task.start, task.stop):
+        if task.seed is None:
+            mismatch = check(i)
+        else:
+            mismatch = check(random.Random(f'{task.check} {task.seed} {i}'))
+        if mismatch is not None and len(mismatches) < MAX_MISMATCHES:
+            mismatches.append(mismatch)
+    return Report(task.check, task.stop - task.start, mismatches)
+
+
+def verify(checks=tuple(CHECKS), samples=10000, seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    :param workers: number of processes, None for one per core, 0 to
+                    run the tasks in this process
+    :return: dict check -> Report, with the inputs checked and the mismatches
+    """
+    tasks = make_tasks(checks, samples, seed, chunk_size)
+    if workers == 0:
+        results = map(run_task, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_task, tasks))
+
+    reports = {name: Report(name, 0, []) for name in checks}
+    for result in results:
+        report = reports[result.check]
+        reports[result.check] = Report(result.check, report.checked + result.checked,
+                                       report.mismatches + result.mismatches)
+    return reports
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Verify the optimized chips against the gate level')
+    parser.add_argument('--checks', nargs='+', choices=list(CHECKS), default=list(CHECKS))
+    parser.add_argument('--samples', type=int, default=10000, help='random inputs per sampled check')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    args = parser.parse_args(args)
+
+    reports = verify(args.checks, args.samples, args.seed, args.workers)
+    failed = False
+    for report in reports.values():
+        status = 'ok' if not report.mismatches else 'MISMATCH'
+        print(f'{report.check:<12} {report.checked:>10} inputs  {status}')
+        for mismatch in report.mismatches:
+            print(f'    {mismatch}')
+        failed = failed or bool(report.mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
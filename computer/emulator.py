@@ -1,15 +1,27 @@
 import os
+from collections import namedtuple
 
 from computer.chips.central_processing_unit import CPU
 from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.translator import Translator, MAX_BLOCK_LENGTH
 from computer.io.harddisk import HardDisk
+from computer import snapshot
 # from computer.io.screen import Screen
 
 from computer.opcodes import *
 
 from computer.utility.numbers import bin_to_dec, dec_to_bin
+from computer.utility.profiler import Profiler
 from computer.utility.status import print_status
 
+# Reasons for Emulator.run to stop
+SHUTDOWN = 'shutdown'
+MAX_CYCLES = 'max_cycles'
+BREAKPOINT = 'breakpoint'
+UNTIL = 'until'
+
+RunResult = namedtuple('RunResult', ('cycles', 'reason'))
+
 
 def get_bootloader():
     # program_start = dec_to_bin(14)
@@ -42,10 +54,19 @@ def get_bootloader():
 
 
 class Emulator:
-    def __init__(self, cpu, verbose=False):
+    def __init__(self, cpu, verbose=False, translate=False, profile=False):
+        """
+        :param translate: run translated basic blocks instead of single
+                          instructions, needs an optimized CPU
+        :param profile: count executed instructions in self.profiler,
+                        runs single instructions
+        """
         self.cpu = cpu
         self.verbose = verbose
         self.shutdown = False
+        self.cycles = 0
+        self.translator = Translator(cpu) if translate else None
+        self.profiler = Profiler(cpu) if profile else None
 
     def load_instructions(self, instructions):
         for i, instruction in enumerate(instructions):
@@ -61,16 +82,111 @@ class Emulator:
             self.cpu.ram(instruction, address, 1)
         self.cpu.ram.tick()
 
-    def run(self):
-        while not self.shutdown:
-            self.tick()
+    def run(self, max_cycles=None, until_pc=None, until=None, check_every=1):
+        """
+        Run until shutdown or until a stop condition is met
+
+        :param max_cycles: number of cycles to run at most
+        :param until_pc: address or collection of addresses, stop before
+                         executing them (but not before the first instruction)
+        :param until: callable(emulator), stop when it returns True
+        :param check_every: number of cycles between calls of until, a
+                            translated block finishes before the call
+        :return: RunResult(cycles executed, reason)
+        """
+        if self.shutdown:
+            return RunResult(0, SHUTDOWN)
+
+        breakpoints = breakpoint_set(until_pc)
+
+        run_block = None
+        if self.translator is not None and not self.verbose and self.profiler is None:
+            self.translator.set_breakpoints(breakpoints)
+            run_block = self.translator.run_block
+        tick = self.tick
+
+        if max_cycles is None and not breakpoints and until is None:
+            return self._run_to_shutdown(run_block)
+
+        pc_register = self.cpu.pc.register
+        if hasattr(pc_register, 'word'):
+            def get_pc():
+                return pc_register.word
+        else:
+            def get_pc():
+                return bin_to_dec(pc_register.value)
+
+        budget = float('inf') if max_cycles is None else max_cycles
+        next_check = check_every
+        cycles = 0
+        while True:
+            if self.shutdown:
+                reason = SHUTDOWN
+                break
+            if cycles >= budget:
+                reason = MAX_CYCLES
+                break
+            if breakpoints and cycles and get_pc() in breakpoints:
+                reason = BREAKPOINT
+                break
+
+            # Blocks only run while they can not overshoot the budget
+            executed = 0
+            if run_block is not None and budget - cycles >= MAX_BLOCK_LENGTH:
+                executed = run_block()
+                self.cycles += executed
+            if not executed:
+                tick()
+                executed = 1
+            cycles += executed
+
+            if until is not None and cycles >= next_check:
+                next_check = cycles + check_every
+                if until(self):
+                    reason = UNTIL
+                    break
+        return RunResult(cycles, reason)
+
+    def _run_to_shutdown(self, run_block):
+        start = self.cycles
+        tick = self.tick
+        if run_block is not None:
+            while not self.shutdown:
+                executed = run_block()
+                if executed:
+                    self.cycles += executed
+                else:
+                    tick()
+        else:
+            while not self.shutdown:
+                tick()
+        return RunResult(self.cycles - start, SHUTDOWN)
 
     def tick(self):
         if not self.shutdown:
+            if self.profiler is not None:
+                self.profiler.record()
             self.shutdown = self.cpu()
             if self.verbose:
                 print_status(self.cpu)
             self.cpu.tick()
+            self.cycles += 1
+
+    def snapshot(self):
+        """ :return: bytes with the state of the machine, see computer.snapshot """
+        return snapshot.take(self)
+
+    def restore(self, data):
+        """ Continue from the state saved by snapshot """
+        snapshot.restore(self, data)
+        self.drop_cached_code()
+
+    def drop_cached_code(self):
+        """ Forget decoded and translated code, after RAM was changed without the write listeners """
+        if hasattr(self.cpu, 'decoded'):
+            self.cpu.decoded.clear()
+        if self.translator is not None:
+            self.translator.clear()
 
     def reset(self):
         self.cpu(reset=1)
@@ -78,6 +194,15 @@ class Emulator:
         self.cpu.tick()
 
 
+def breakpoint_set(until_pc):
+    """ :return: frozenset of the addresses in until_pc, see Emulator.run """
+    if until_pc is None:
+        return frozenset()
+    if isinstance(until_pc, int):
+        return frozenset([until_pc])
+    return frozenset(until_pc)
+
+
 def main():
     emulator = make_emulator('ball.bin', verbose=True)
 
@@ -85,11 +210,17 @@ def main():
     print('Emulation completed')
 
 
-def make_emulator(binary_file, verbose=False):
+def make_emulator(binary_file, verbose=False, cpu_type=CPU, translate=False):
+    """
+    :param cpu_type: CPU for the gate level model or
+                     computer.chips.optimized.central_processing_unit.CPU
+                     for the faster int based model
+    :param translate: run translated basic blocks, needs the optimized CPU
+    """
     ram = CombinedRAM()
     hdd = get_hdd_with_loaded_program(binary_file)
-    cpu = CPU(ram, hdd)
-    emulator = Emulator(cpu, verbose)
+    cpu = cpu_type(ram, hdd)
+    emulator = Emulator(cpu, verbose, translate)
     bootloader = get_bootloader()
     emulator.load_binary(bootloader)
     return emulator
@@ -1,7 +1,12 @@
-from bitarray import bitarray
+import mmap
+import sys
+from array import array
+from collections import OrderedDict
+
+from bitarray import bitarray, frozenbitarray
 
 from computer.chips.memory import Register
-from computer.utility.numbers import bin_to_dec
+from computer.utility.numbers import bin_to_dec, dec_to_bin
 
 
 class HardDisk:
@@ -9,6 +14,8 @@ class HardDisk:
         self.sector_size = 512
 
         self.data = bitarray()
+        self.originals = {}  # sector -> bits as loaded, of the written sectors
+        self.dirty_sectors = set()  # written since last cleared, e.g. by computer.checkpoints
 
         self.sector = Register()
         self.sector(bitarray('0'*16), 1)
@@ -17,6 +24,7 @@ class HardDisk:
     def load_data(self, file_path):
         with open(file_path, 'rb') as file:
             self.data.fromfile(file)
+        self.originals.clear()
 
     def write_data(self, file_path):
         with open(file_path, 'wb') as file:
@@ -30,6 +38,7 @@ class HardDisk:
         i = self.sector_size * sector + 16 * address
 
         if write:
+            self.mark_written(i // self.sector_size)
             self.data[i:i+16] = value
 
         out = self.data[i:i + 16]
@@ -37,5 +46,314 @@ class HardDisk:
             raise ValueError(f'No data in address {i}. HDD is only {len(self.data)} long')
         return out
 
+    def read_sector(self, sector):
+        """ :return: bits of sector, a copy """
+        start = self.sector_size * sector
+        return self.data[start:start + self.sector_size]
+
+    def write_sector(self, sector, bits):
+        """ Write bits from the start of sector """
+        self.mark_written(sector)
+        start = self.sector_size * sector
+        self.data[start:start + len(bits)] = bits
+
+    def mark_written(self, sector):
+        if sector not in self.originals:
+            self.originals[sector] = self.read_sector(sector)
+        self.dirty_sectors.add(sector)
+
+    @property
+    def written_sectors(self):
+        """ Sectors written since the data was loaded """
+        return self.originals.keys()
+
+    def revert_sector(self, sector):
+        """ Set sector back to its data as loaded """
+        original = self.originals.pop(sector, None)
+        if original is not None:
+            start = self.sector_size * sector
+            self.data[start:start + len(original)] = original
+            self.dirty_sectors.add(sector)
+
     def tick(self):
         self.sector.tick()
+
+    def flush(self):
+        """ Nothing to write back, the data is only in memory """
+
+
+class MappedHardDisk(HardDisk):
+    """
+    Hard disk on a memory mapped image file
+
+    data is a bitarray on the mapping, words are read from and written to
+    the mapped file directly, nothing is loaded up front.
+
+    :param mode: 'w' writes go to the file, flushed on tick or flush()
+                 'c' copy on write, writes stay private to this disk, so
+                     several disks can share one image file
+                 'r' read only, writes raise TypeError
+    :param flush_on_tick: flush writes on the tick after them, otherwise
+                          only on flush() and close()
+    """
+    ACCESS = {'w': mmap.ACCESS_WRITE, 'c': mmap.ACCESS_COPY, 'r': mmap.ACCESS_READ}
+
+    def __init__(self, file_path, mode='w', flush_on_tick=True):
+        super().__init__()
+        if mode not in self.ACCESS:
+            raise ValueError(f"Mode must be one of {', '.join(self.ACCESS)}, is {mode!r}")
+        self.mode = mode
+        self.flush_on_tick = flush_on_tick
+        self.dirty = False
+
+        with open(file_path, 'r+b' if mode == 'w' else 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=self.ACCESS[mode])
+        self.data = bitarray(buffer=self.map)
+
+    def load_data(self, file_path):
+        raise TypeError('A mapped hard disk serves the file it was made with')
+
+    def __call__(self, address, select_sector, value, write):
+        if write:
+            self.writing()
+        return super().__call__(address, select_sector, value, write)
+
+    def write_sector(self, sector, bits):
+        self.writing()
+        super().write_sector(sector, bits)
+
+    def revert_sector(self, sector):
+        self.writing()
+        super().revert_sector(sector)
+
+    def writing(self):
+        """ Called before any write, rejects it in 'r' mode before the bookkeeping """
+        if self.mode == 'r':
+            raise TypeError('A read only mapped hard disk can not be written')
+        self.dirty = True
+
+    def tick(self):
+        super().tick()
+        if self.dirty and self.flush_on_tick:
+            self.flush()
+
+    def flush(self):
+        """ Write changes back to the file, in 'w' mode """
+        if self.mode == 'w':
+            self.map.flush()
+        self.dirty = False
+
+    def close(self):
+        self.flush()
+        self.data = bitarray()  # release the buffer of the mapping
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OverlayHardDisk(HardDisk):
+    """
+    Hard disk on a shared read only base image, with the written sectors
+    kept per disk: a sector is copied out of the base on its first write
+
+        base = frozenbitarray(...)
+        hdd = OverlayHardDisk(base)
+        start = hdd.snapshot()
+        ...
+        hdd.restore(start)
+
+    snapshot, restore and fork copy the written sectors only, their cost
+    doesn't depend on the size of the image.
+
+    :param base: bitarray of the image, used as it is when frozen
+    """
+    def __init__(self, base):
+        super().__init__()
+        self.base = base if isinstance(base, frozenbitarray) else frozenbitarray(base)
+        self.sectors = {}  # sector -> bitarray written over the base
+
+    @property
+    def data(self):
+        """ The merged image, a copy, writes to it are lost """
+        data = bitarray(self.base)
+        for sector, bits in self.sectors.items():
+            start = self.sector_size * sector
+            data[start:start + len(bits)] = bits
+        return data
+
+    @data.setter
+    def data(self, value):
+        # Set by HardDisk.__init__, the image is the base
+        pass
+
+    def load_data(self, file_path):
+        raise TypeError('An overlay hard disk serves the base it was made with')
+
+    def __call__(self, address, select_sector, value, write):
+        sector = self.sector(address, select_sector)
+
+        sector = bin_to_dec(sector)
+        address = bin_to_dec(address)
+        i = self.sector_size * sector + 16 * address
+        if i + 16 > len(self.base):
+            raise ValueError(f'No data in address {i}. HDD is only {len(self.base)} long')
+
+        sector, offset = divmod(i, self.sector_size)
+        bits = self.sectors.get(sector)
+        if write:
+            if bits is None:
+                bits = self.sectors[sector] = self.base_sector(sector)
+            bits[offset:offset + 16] = value
+            self.dirty_sectors.add(sector)
+        if bits is None:
+            return self.base[i:i + 16]
+        return bits[offset:offset + 16]
+
+    def base_sector(self, sector):
+        """ :return: bits of sector in the base, a copy """
+        start = self.sector_size * sector
+        return bitarray(self.base[start:start + self.sector_size])
+
+    def read_sector(self, sector):
+        bits = self.sectors.get(sector)
+        if bits is None:
+            return self.base_sector(sector)
+        return bits.copy()
+
+    def write_sector(self, sector, bits):
+        """ Write bits from the start of sector, copying it out of the base on its first write """
+        written = self.sectors.get(sector)
+        if written is None:
+            written = self.sectors[sector] = self.base_sector(sector)
+        written[:len(bits)] = bits
+        self.dirty_sectors.add(sector)
+
+    @property
+    def written_sectors(self):
+        return self.sectors.keys()
+
+    def revert_sector(self, sector):
+        if self.sectors.pop(sector, None) is not None:
+            self.dirty_sectors.add(sector)
+
+    def snapshot(self):
+        """ :return: state to restore, the sector register and the written sectors """
+        return bitarray(self.sector.value), {sector: bits.copy() for sector, bits in self.sectors.items()}
+
+    def restore(self, snapshot):
+        sector, sectors = snapshot
+        self.sector.value = sector
+        self.dirty_sectors.update(self.sectors, sectors)
+        self.sectors = {sector: bits.copy() for sector, bits in sectors.items()}
+
+    def fork(self):
+        """ :return: new OverlayHardDisk on the same base, in the same state """
+        hdd = OverlayHardDisk(self.base)
+        hdd.restore(self.snapshot())
+        return hdd
+
+
+class SectorCache:
+    """
+    LRU cache of decoded sectors in front of a HardDisk, MappedHardDisk or
+    OverlayHardDisk, with the same interface
+
+    Words are read and written as ints in array('H') sectors, dirty sectors
+    are written back with hdd.write_sector when evicted, on tick and on
+    flush(), so an OverlayHardDisk keeps them in its written sectors.
+    The sector register of the cache is used, not the one of hdd.
+
+    :param capacity: number of sectors kept
+    :param flush_on_tick: write back dirty sectors on every tick, otherwise
+                          only on eviction and flush()
+    """
+    WORDS = 32  # per sector
+
+    def __init__(self, hdd, capacity=8, flush_on_tick=True):
+        if capacity < 1:
+            raise ValueError(f'Capacity must be at least 1, is {capacity}')
+        self.hdd = hdd
+        self.sector_size = hdd.sector_size
+        self.capacity = capacity
+        self.flush_on_tick = flush_on_tick
+
+        self.sector = 0
+        self.next_sector = 0
+
+        self.sectors = OrderedDict()  # sector -> array('H')
+        self.dirty = set()
+        self.hits = self.misses = self.evictions = self.write_backs = 0
+
+    def __call__(self, address, select_sector, value, write):
+        address = bin_to_dec(address)
+        if select_sector:
+            self.next_sector = address
+
+        word = self.WORDS * self.sector + address
+        sector, offset = divmod(word, self.WORDS)
+        words = self._load(sector)
+        if offset >= len(words):
+            raise ValueError(f'No data in address {16 * word}. HDD is only {len(self.hdd.data)} long')
+
+        if write:
+            words[offset] = bin_to_dec(value)
+            self.dirty.add(sector)
+        return dec_to_bin(words[offset])
+
+    def _load(self, sector):
+        words = self.sectors.get(sector)
+        if words is not None:
+            self.hits += 1
+            self.sectors.move_to_end(sector)
+            return words
+
+        self.misses += 1
+        bits = self.hdd.read_sector(sector)
+        words = array('H', bits[:len(bits) - len(bits) % 16].tobytes())
+        if not words:
+            return words  # past the end of hdd, not cached
+
+        if len(self.sectors) >= self.capacity:
+            evicted, evicted_words = self.sectors.popitem(last=False)
+            self.evictions += 1
+            if evicted in self.dirty:
+                self._write_back(evicted, evicted_words)
+
+        if sys.byteorder == 'little':
+            words.byteswap()
+        self.sectors[sector] = words
+        return words
+
+    def _write_back(self, sector, words):
+        if sys.byteorder == 'little':
+            words = array('H', words)
+            words.byteswap()
+        bits = bitarray()
+        bits.frombytes(words.tobytes())
+        self.hdd.write_sector(sector, bits)
+        self.dirty.discard(sector)
+        self.write_backs += 1
+
+    def clear(self):
+        """ Drop the cached sectors, dirty ones aren't written back """
+        self.sectors.clear()
+        self.dirty.clear()
+
+    def write_back(self):
+        """ Write the dirty sectors to hdd, they stay cached """
+        for sector in sorted(self.dirty):
+            self._write_back(sector, self.sectors[sector])
+
+    def tick(self):
+        self.sector = self.next_sector
+        if self.dirty and self.flush_on_tick:
+            self.flush()
+
+    def flush(self):
+        """ Write back the dirty sectors and flush hdd """
+        self.write_back()
+        self.hdd.flush()
@@ -1,4 +1,5 @@
 import sys
+import time
 
 from bitarray import bitarray
 
@@ -7,8 +8,25 @@ from PyQt5.QtGui import QPainter, QPixmap, QPolygon
 from PyQt5.QtCore import Qt, QTimer, QPoint, QObject, pyqtSignal
 
 from computer.utility.status_gui import StatusWindow
-from computer.emulator import make_emulator
-from computer.utility.numbers import bin_to_dec, dec_to_bin
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.emulator import make_emulator, BREAKPOINT
+from computer.journal import Journal
+from computer.utility.numbers import dec_to_bin
+
+# Milliseconds between screen refreshes, 60 Hz
+FRAME_INTERVAL = 1000 // 60
+WORDS_PER_ROW = 32
+
+
+def span_of(address):
+    """ :return: x, y of the first of the 16 pixels of the screen word at address """
+    return 16 * (address % WORDS_PER_ROW), address // WORDS_PER_ROW
+
+
+def word_points(address, word):
+    """ :return: x, y of the lit pixels of the screen word, the most significant bit leftmost """
+    x, y = span_of(address)
+    return [(x + i, y) for i in range(16) if word >> (15 - i) & 1]
 
 
 class Window(QMainWindow):
@@ -43,7 +61,8 @@ class Window(QMainWindow):
 
 
 class Screen(QLabel):
-    request_screen_memory = pyqtSignal()
+    """ Repaints the 16 pixel spans of the screen words written since the last frame """
+    request_screen_changes = pyqtSignal()
     key_press = pyqtSignal(int)
 
     def __init__(self, parent, width, height, worker):
@@ -51,74 +70,64 @@ class Screen(QLabel):
         self.screen_width = width
         self.screen_height = height
         canvas = QPixmap(width, height)
+        canvas.fill(Qt.black)
         self.setPixmap(canvas)
 
-        self.request_screen_memory.connect(worker.send_screen_memory)
-        worker.send_screen_memory_signal.connect(self.set_screen_memory)
+        self.request_screen_changes.connect(worker.send_screen_changes)
+        worker.send_screen_changes_signal.connect(self.paint_changes)
         self.key_press.connect(worker.key_press)
 
-        self.bits = bitarray()
-
         self.start_automatic_refresh()
 
     def start_automatic_refresh(self):
         timer = QTimer(self)
         timer.timeout.connect(self.update_screen)
-        timer.start(1000)
+        timer.start(FRAME_INTERVAL)
 
     def key_pressed(self, key):
         self.key_press.emit(key)
 
     def update_screen(self):
-        self.set_pixels()
-
-    def set_screen_memory(self, bits):
-        self.bits = bits
+        self.request_screen_changes.emit()
 
-    def set_pixels(self):
+    def paint_changes(self, changes):
+        """ :param changes: list of (address, word) of the written screen words """
+        if not changes:
+            return
         painter = QPainter(self.pixmap())
-        self.clear_background(painter)
+        points = []
+        for address, word in changes:
+            x, y = span_of(address)
+            painter.fillRect(x, y, 16, 1, Qt.black)
+            points += [QPoint(*point) for point in word_points(address, word)]
 
         painter.setPen(Qt.white)
-
-        size_screen_ram = 8192  # self.screen_width * self.screen_height / 16
-
-        x = y = 0
-        points = []
-        self.request_screen_memory.emit()
-        for i in range(size_screen_ram):
-            word = self.bits[i * 16:(i + 1) * 16]
-            for bit in word:
-                x += 1
-                if x == self.screen_width:
-                    x = 0
-                    y += 1
-                if bit:
-                    points.append(QPoint(x, y))
-                    # painter.drawPoint(x, y)
         painter.drawPoints(QPolygon(points))
         painter.end()
         self.update()
 
-    def clear_background(self, painter):
-        painter.setPen(Qt.black)
-        for x in range(self.screen_width):
-            for y in range(self.screen_height):
-                painter.drawPoint(x, y)
+
+# Seconds run between checks for requests from the GUI, the clock is
+# read every CHECK_EVERY cycles
+RUN_TIME = 0.02
+CHECK_EVERY = 256
 
 
 class Worker(QObject):
     finished = pyqtSignal()
     send_update = pyqtSignal()
-    send_screen_memory_signal = pyqtSignal(bitarray)
+    send_screen_changes_signal = pyqtSignal(list)
     send_memory_signal = pyqtSignal(bitarray)
     send_registers_signal = pyqtSignal(dict)
 
     def __init__(self, file_name):
         super().__init__()
-        self.emulator = make_emulator(file_name)
+        # The int based CPU, ticks go through the journal so they can be stepped back
+        self.emulator = make_emulator(file_name, cpu_type=CPU)
+        self.journal = Journal(self.emulator)
         self.running = False
         self.do_tick = False
+        self.do_step_back = False
         self.do_update = False
         self.stop_at = 0
 
@@ -127,16 +136,24 @@ class Worker(QObject):
 
     def _run(self):
         while True:
+            if self.do_step_back:
+                self.do_step_back = False
+                if self.journal.length:
+                    self.journal.step_back()
+                    self.do_update = True
             while (self.running or self.do_tick) and not self.emulator.shutdown:
                 self.do_update = True
-                self._tick(1)
-                if self.stop_at:
-                    current_instruction = bin_to_dec(self.emulator.cpu.pc.register.value)
-                    if current_instruction == self.stop_at:
-                        self.running = False
-                        self.stop_at = 0
                 if self.do_tick:
                     self.do_tick = False
+                    self._tick(1)
+                else:
+                    deadline = time.perf_counter() + RUN_TIME
+                    result = self.journal.run(until_pc=self.stop_at or None,
+                                              until=lambda emulator: time.perf_counter() >= deadline,
+                                              check_every=CHECK_EVERY)
+                    if result.reason == BREAKPOINT:
+                        self.running = False
+                        self.stop_at = 0
             if self.emulator.shutdown:
                 self.running = False
             if self.do_update:
@@ -155,8 +172,10 @@ class Worker(QObject):
         self.do_tick = True
 
     def _tick(self, number):
-        for i in range(number):
-            self.emulator.tick()
+        self.journal.run(number)
+
+    def step_back(self):
+        self.do_step_back = True
 
     def run_until(self, instruction):
         self.stop_at = instruction
@@ -164,10 +183,11 @@ class Worker(QObject):
 
     def reset(self):
         self.emulator.reset()
+        self.journal.clear()
         self.update()
 
-    def send_screen_memory(self):
-        self.send_screen_memory_signal.emit(self.emulator.cpu.ram.screen.bits) #.copy())
+    def send_screen_changes(self):
+        self.send_screen_changes_signal.emit(self.emulator.cpu.ram.screen.take_changed())
 
     def send_memory(self):
         self.send_memory_signal.emit(self.emulator.cpu.ram.ram.bits.copy())
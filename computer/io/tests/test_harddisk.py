@@ -1,9 +1,11 @@
 import os
+import shutil
 import pytest
 import filecmp
 
 from bitarray import bitarray
-from computer.io.harddisk import HardDisk
+from computer.io.harddisk import HardDisk, MappedHardDisk, OverlayHardDisk, SectorCache
+from computer.utility.numbers import dec_to_bin
 
 from computer.chips.tests import ZEROS, INT_ONE, INT_TWO
 
@@ -99,3 +101,270 @@ class TestHardDisk:
         assert os.path.exists(out_file_path)
         assert filecmp.cmp(file_path, out_file_path)
         os.remove(out_file_path)
+
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def select_sector(hdd, sector):
+    hdd(sector, 1, UNUSED, 0)
+    hdd.tick()
+
+
+class TestMappedHardDisk:
+    @pytest.fixture
+    def image(self, tmp_path):
+        file_path = tmp_path / 'test_2sectors.bin'
+        shutil.copy(os.path.join(DATA_FOLDER, 'test_2sectors.bin'), file_path)
+        return file_path
+
+    @pytest.mark.parametrize('mode', ['w', 'c', 'r'])
+    @pytest.mark.parametrize('sector_address, data_address, expected', TestHardDisk.read)
+    def test_read_sector(self, image, mode, sector_address, data_address, expected):
+        with MappedHardDisk(image, mode) as hdd:
+            select_sector(hdd, sector_address)
+
+            assert hdd(data_address, 0, UNUSED, 0) == expected
+
+    def test_same_as_loaded(self, image):
+        hdd = HardDisk()
+        hdd.load_data(image)
+
+        with MappedHardDisk(image, 'r') as mapped:
+            assert mapped.data == hdd.data
+
+    def test_write_to_file(self, image):
+        with MappedHardDisk(image) as hdd:
+            select_sector(hdd, INT_ONE)
+            hdd(INT_ONE, 0, INT_TWO, 1)
+            assert hdd.dirty
+            hdd.tick()
+            assert not hdd.dirty
+
+        hdd = HardDisk()
+        hdd.load_data(image)
+        assert hdd.data[512 + 16:512 + 32] == INT_TWO
+
+    def test_flush(self, image):
+        with MappedHardDisk(image, flush_on_tick=False) as hdd:
+            hdd(ZEROS, 0, INT_TWO, 1)
+            hdd.tick()
+            assert hdd.dirty
+
+            hdd.flush()
+            assert not hdd.dirty
+            with open(image, 'rb') as file:
+                assert file.read(2) == b'\x00\x02'
+
+    def test_copy_on_write(self, image):
+        with open(image, 'rb') as file:
+            original = file.read()
+
+        with MappedHardDisk(image, 'c') as hdd, MappedHardDisk(image, 'c') as other:
+            hdd(ZEROS, 0, INT_TWO, 1)
+            hdd.tick()
+
+            assert hdd(ZEROS, 0, UNUSED, 0) == INT_TWO
+            assert other(ZEROS, 0, UNUSED, 0) == bitarray('1011000011010100')
+
+        with open(image, 'rb') as file:
+            assert file.read() == original
+
+    def test_revert_sector(self, image):
+        with MappedHardDisk(image, flush_on_tick=False) as hdd:
+            select_sector(hdd, INT_ONE)
+            hdd(INT_ONE, 0, INT_TWO, 1)
+            assert list(hdd.written_sectors) == [1]
+            hdd.flush()
+
+            hdd.revert_sector(1)
+            assert hdd.dirty
+            assert not hdd.written_sectors
+
+        with open(image, 'rb') as file:
+            assert file.read()[64 + 2:64 + 4] == b'\x00\x00'
+
+    def test_read_only(self, image):
+        with MappedHardDisk(image, 'r') as hdd:
+            with pytest.raises(TypeError):
+                hdd(ZEROS, 0, INT_TWO, 1)
+            with pytest.raises(TypeError):
+                hdd.write_sector(1, INT_TWO)
+
+            assert not hdd.dirty
+            assert not hdd.written_sectors
+            assert not hdd.dirty_sectors
+
+    def test_out_of_range(self, image):
+        with MappedHardDisk(image, 'r') as hdd:
+            with pytest.raises(ValueError):
+                hdd(dec_to_bin(64), 0, UNUSED, 0)
+
+    def test_invalid_mode(self, image):
+        with pytest.raises(ValueError):
+            MappedHardDisk(image, 'x')
+
+
+class TestOverlayHardDisk:
+    @pytest.fixture
+    def base(self):
+        hdd = HardDisk()
+        hdd.load_data(os.path.join(DATA_FOLDER, 'test_2sectors.bin'))
+        return hdd.data
+
+    @pytest.mark.parametrize('sector_address, data_address, expected', TestHardDisk.read)
+    def test_read_sector(self, base, sector_address, data_address, expected):
+        hdd = OverlayHardDisk(base)
+        select_sector(hdd, sector_address)
+
+        assert hdd(data_address, 0, UNUSED, 0) == expected
+
+    def test_write_copies_sector(self, base):
+        original = base.copy()
+        hdd = OverlayHardDisk(base)
+        select_sector(hdd, INT_ONE)
+        hdd(INT_ONE, 0, INT_TWO, 1)
+
+        assert hdd(INT_ONE, 0, UNUSED, 0) == INT_TWO
+        assert list(hdd.sectors) == [1]
+        assert hdd.data[512 + 16:512 + 32] == INT_TWO
+        assert hdd.data[:512] == original[:512]
+        assert base == original
+
+    def test_snapshot_restore(self, base):
+        hdd = OverlayHardDisk(base)
+        snapshot = hdd.snapshot()
+        select_sector(hdd, INT_ONE)
+        hdd(ZEROS, 0, INT_TWO, 1)
+
+        hdd.restore(snapshot)
+        assert hdd.sectors == {}
+        assert hdd(ZEROS, 0, UNUSED, 0) == bitarray('1011000011010100')
+
+        hdd(ZEROS, 0, INT_TWO, 1)
+        written = hdd.snapshot()
+        hdd(ZEROS, 0, INT_ONE, 1)
+        hdd.restore(written)
+        hdd.restore(written)  # the snapshot isn't changed by later writes
+        assert hdd(ZEROS, 0, UNUSED, 0) == INT_TWO
+
+    def test_revert_sector(self, base):
+        hdd = OverlayHardDisk(base)
+        hdd.write_sector(1, INT_TWO)
+        assert list(hdd.written_sectors) == [1]
+
+        hdd.revert_sector(1)
+        assert hdd.sectors == {}
+        assert hdd.read_sector(1) == base[512:]
+
+    def test_fork(self, base):
+        hdd = OverlayHardDisk(base)
+        hdd(ZEROS, 0, INT_TWO, 1)
+        fork = hdd.fork()
+        fork(ZEROS, 0, INT_ONE, 1)
+
+        assert fork.base is hdd.base
+        assert hdd(ZEROS, 0, UNUSED, 0) == INT_TWO
+        assert fork(ZEROS, 0, UNUSED, 0) == INT_ONE
+
+    def test_out_of_range(self, base):
+        hdd = OverlayHardDisk(base)
+        with pytest.raises(ValueError):
+            hdd(dec_to_bin(64), 0, INT_ONE, 1)
+        assert hdd.sectors == {}
+
+
+class TestSectorCache:
+    @pytest.fixture
+    def hdd(self):
+        hdd = HardDisk()
+        hdd.load_data(os.path.join(DATA_FOLDER, 'test_2sectors.bin'))
+        return hdd
+
+    @pytest.mark.parametrize('sector_address, data_address, expected', TestHardDisk.read)
+    def test_read_sector(self, hdd, sector_address, data_address, expected):
+        cache = SectorCache(hdd)
+        select_sector(cache, sector_address)
+
+        assert cache(data_address, 0, UNUSED, 0) == expected
+
+    def test_same_as_hdd(self, hdd):
+        cache = SectorCache(hdd)
+        for address in range(64):
+            assert cache(dec_to_bin(address), 0, UNUSED, 0) == hdd.data[16 * address:16 * address + 16]
+
+    def test_hits_and_misses(self, hdd):
+        cache = SectorCache(hdd)
+        cache(ZEROS, 0, UNUSED, 0)
+        cache(INT_ONE, 0, UNUSED, 0)
+        select_sector(cache, INT_ONE)
+        cache(ZEROS, 0, UNUSED, 0)
+
+        assert (cache.hits, cache.misses) == (2, 2)
+
+    def test_write_back_on_tick(self, hdd):
+        cache = SectorCache(hdd)
+        select_sector(cache, INT_ONE)
+        cache(INT_ONE, 0, INT_TWO, 1)
+
+        assert hdd.data[512 + 16:512 + 32] == bitarray('0' * 16)
+        assert cache(INT_ONE, 0, UNUSED, 0) == INT_TWO
+        cache.tick()
+        assert hdd.data[512 + 16:512 + 32] == INT_TWO
+        assert cache.write_backs == 1
+
+    def test_write_back_on_eviction(self, hdd):
+        cache = SectorCache(hdd, capacity=1, flush_on_tick=False)
+        cache(ZEROS, 0, INT_TWO, 1)
+        cache.tick()
+        assert hdd.data[:16] == bitarray('1011000011010100')
+
+        select_sector(cache, INT_ONE)
+        cache(ZEROS, 0, UNUSED, 0)
+        assert hdd.data[:16] == INT_TWO
+        assert (cache.evictions, cache.write_backs) == (1, 1)
+
+    def test_flush(self, hdd):
+        cache = SectorCache(hdd, flush_on_tick=False)
+        cache(ZEROS, 0, INT_TWO, 1)
+        cache.tick()
+        assert not cache.write_backs
+
+        cache.flush()
+        assert hdd.data[:16] == INT_TWO
+        assert not cache.dirty
+
+    def test_mapped(self, tmp_path):
+        image = tmp_path / 'test_2sectors.bin'
+        shutil.copy(os.path.join(DATA_FOLDER, 'test_2sectors.bin'), image)
+
+        with MappedHardDisk(image) as hdd:
+            cache = SectorCache(hdd)
+            select_sector(cache, INT_ONE)
+            cache(INT_ONE, 0, INT_TWO, 1)
+            cache.tick()
+
+        with open(image, 'rb') as file:
+            assert file.read()[64 + 2:64 + 4] == b'\x00\x02'
+
+    def test_overlay(self, hdd):
+        overlay = OverlayHardDisk(hdd.data)
+        cache = SectorCache(overlay)
+        select_sector(cache, INT_ONE)
+        cache(INT_ONE, 0, INT_TWO, 1)
+        cache.tick()
+
+        assert list(overlay.sectors) == [1]
+        select_sector(overlay, INT_ONE)
+        assert overlay(INT_ONE, 0, UNUSED, 0) == INT_TWO
+        assert overlay.data[512:] == overlay.sectors[1]
+        assert overlay.base == hdd.data
+
+    def test_out_of_range(self, hdd):
+        cache = SectorCache(hdd, capacity=1)
+        cache(ZEROS, 0, INT_TWO, 1)
+        with pytest.raises(ValueError):
+            cache(dec_to_bin(64), 0, UNUSED, 0)
+
+        assert list(cache.sectors) == [0]
+        assert cache.dirty == {0}
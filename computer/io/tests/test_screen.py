@@ -0,0 +1,26 @@
+import pytest
+
+from computer.io.screen import span_of, word_points
+
+
+@pytest.mark.parametrize('address, expected', [
+    (0, (0, 0)),
+    (1, (16, 0)),
+    (31, (496, 0)),
+    (32, (0, 1)),
+    (33, (16, 1)),
+    (8191, (496, 255)),
+])
+def test_span_of(address, expected):
+    assert span_of(address) == expected
+
+
+@pytest.mark.parametrize('address, word, expected', [
+    (0, 0, []),
+    (0, 0x8000, [(0, 0)]),
+    (0, 1, [(15, 0)]),
+    (33, 0b1000000000000011, [(16, 1), (30, 1), (31, 1)]),
+    (31, 0xFFFF, [(x, 0) for x in range(496, 512)]),
+])
+def test_word_points(address, word, expected):
+    assert word_points(address, word) == expected
@@ -0,0 +1,231 @@
+"""
+Time travel for the int based CPU: a journal of the last ticks, which can
+be stepped back through
+
+    journal = Journal(emulator, capacity=100000)
+    journal.run(max_cycles=5000)
+    journal.step_back(10)
+    journal.run_back_until(pc=42)
+
+Every tick run through the journal records the registers before it, the
+RAM word it writes with its old value and for an HDD op the sector
+register and the HDD word it writes with its old value, in fixed size
+ring buffers: memory is bounded by capacity, about 40 bytes per tick. A
+tick writes at most one RAM word and one HDD word, an HDD op with a
+pointer target does both.
+
+With checkpoint_every, a computer.checkpoints.Checkpoints chain is kept
+as well, so step_back can go further back than the ring: it restores the
+last checkpoint before the target and runs forward to it. Keyboard input
+given while running forward the first time is not replayed.
+
+Ticks run outside the journal, e.g. by Emulator.run, aren't recorded,
+the journal has to be cleared after them.
+"""
+from array import array
+
+from computer.checkpoints import Checkpoints
+from computer.emulator import breakpoint_set, RunResult, SHUTDOWN, MAX_CYCLES, BREAKPOINT, UNTIL
+from computer import snapshot
+from computer.utility.numbers import dec_to_bin
+
+# a, b, c, d, sp, pc, status and keyboard, per tick
+REGISTER_COUNT = 8
+PC = 5
+
+# Written RAM or HDD address of a tick, or none. HDD_OP is an HDD op
+# without a write, its sector register is restored all the same
+NO_WRITE = -1
+HDD_OP = -2
+
+
+class Journal:
+    """
+    :param capacity: number of ticks kept in the ring
+    :param checkpoint_every: ticks between checkpoints, None for none
+    :param checkpoints: number of checkpoints kept at most
+    """
+    def __init__(self, emulator, capacity=65536, checkpoint_every=None, checkpoints=16):
+        cpu = emulator.cpu
+        if not hasattr(cpu.a, 'word') or not hasattr(cpu.ram, 'write_listeners'):
+            raise TypeError('The journal needs the int based CPU and RAM')
+        if capacity < 1:
+            raise ValueError(f'Capacity must be at least 1, is {capacity}')
+        self.emulator = emulator
+        self.cpu = cpu
+        self.capacity = capacity
+
+        self.registers = array('H', bytes(2 * REGISTER_COUNT * capacity))
+        self.writes = array('l', [NO_WRITE]) * capacity
+        self.old_words = array('H', bytes(2 * capacity))
+        self.hdd_writes = array('l', [NO_WRITE]) * capacity
+        self.old_hdd_words = array('H', bytes(2 * capacity))
+        self.hdd_sectors = array('H', bytes(2 * capacity))  # before HDD ops
+        self.position = 0  # slot of the next tick
+        self.length = 0  # ticks in the ring
+
+        self.recording = False
+        self.written = self.hdd_written = NO_WRITE
+        self.old_word = self.old_hdd_word = 0
+        cpu.ram.write_listeners.append(self.record_write)
+        self.original_hdd_bus = cpu.hdd_bus
+        cpu.hdd_bus = self.hdd_bus
+
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = None
+        if checkpoint_every is not None:
+            self.checkpoints = Checkpoints(emulator, limit=checkpoints)
+            self.checkpoints.take()
+
+    def clear(self):
+        """ Forget the journal, after ticks it didn't see """
+        self.position = self.length = 0
+        if self.checkpoints is not None:
+            self.checkpoints.clear()
+            self.checkpoints.take()
+
+    def record_write(self, address):
+        if self.recording:
+            self.written = address
+            self.old_word = self.cpu.ram.read(address)
+
+    def hdd_bus(self, address, select_sector, value, write):
+        if self.recording:
+            self.hdd_sectors[self.position] = snapshot.hdd_sector_words(self.cpu.hdd)[0]
+            if write:
+                self.hdd_written = address
+                self.old_hdd_word = self.original_hdd_bus(address, 0, 0, 0)
+            else:
+                self.hdd_written = HDD_OP
+        return self.original_hdd_bus(address, select_sector, value, write)
+
+    def tick(self):
+        emulator = self.emulator
+        if emulator.shutdown:
+            return
+        cpu = self.cpu
+        registers = self.registers
+        start = self.position * REGISTER_COUNT
+        registers[start] = cpu.a.word
+        registers[start + 1] = cpu.b.word
+        registers[start + 2] = cpu.c.word
+        registers[start + 3] = cpu.d.word
+        registers[start + 4] = cpu.sp.word
+        registers[start + 5] = cpu.pc.register.word
+        registers[start + 6] = cpu.status.word
+        registers[start + 7] = cpu.ram.keyboard.word
+
+        self.written = self.hdd_written = NO_WRITE
+        self.recording = True
+        try:
+            emulator.tick()
+        finally:
+            self.recording = False
+        self.writes[self.position] = self.written
+        self.old_words[self.position] = self.old_word
+        self.hdd_writes[self.position] = self.hdd_written
+        self.old_hdd_words[self.position] = self.old_hdd_word
+
+        self.position = (self.position + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+        if self.checkpoint_every is not None and emulator.cycles % self.checkpoint_every == 0:
+            self.checkpoints.take()
+
+    def run(self, max_cycles=None, until_pc=None, until=None, check_every=1):
+        """
+        Run single ticks until shutdown, max_cycles, before the instructions
+        at until_pc (an address or collection of addresses) or until
+        until(emulator) returns True, checked every check_every ticks, like
+        Emulator.run
+
+        :return: computer.emulator.RunResult
+        """
+        emulator = self.emulator
+        pc_register = self.cpu.pc.register
+        breakpoints = breakpoint_set(until_pc)
+        next_check = check_every
+        cycles = 0
+        while True:
+            if emulator.shutdown:
+                return RunResult(cycles, SHUTDOWN)
+            if max_cycles is not None and cycles >= max_cycles:
+                return RunResult(cycles, MAX_CYCLES)
+            if breakpoints and cycles and pc_register.word in breakpoints:
+                return RunResult(cycles, BREAKPOINT)
+            self.tick()
+            cycles += 1
+
+            if until is not None and cycles >= next_check:
+                next_check = cycles + check_every
+                if until(emulator):
+                    return RunResult(cycles, UNTIL)
+
+    def undo(self):
+        """ Step back over the last tick in the ring """
+        self.position = slot = (self.position - 1) % self.capacity
+        self.length -= 1
+        cpu = self.cpu
+        words = self.registers[slot * REGISTER_COUNT:(slot + 1) * REGISTER_COUNT]
+
+        written = self.writes[slot]
+        if written != NO_WRITE:
+            cpu.ram.write(written, self.old_words[slot])
+            cpu.ram.tick()
+        hdd_written = self.hdd_writes[slot]
+        if hdd_written != NO_WRITE:
+            sector = self.hdd_sectors[slot]
+            snapshot.set_hdd_sector_words(cpu.hdd, sector, sector)
+            if hdd_written != HDD_OP:
+                cpu.hdd(dec_to_bin(hdd_written), 0, dec_to_bin(self.old_hdd_words[slot]), 1)
+
+        for register, word in zip((cpu.a, cpu.b, cpu.c, cpu.d, cpu.sp, cpu.pc.register,
+                                   cpu.status, cpu.ram.keyboard), words):
+            register.word = register.next_word = word
+
+        self.emulator.shutdown = False
+        self.emulator.cycles -= 1
+
+    def drop_checkpoints_after(self, cycles):
+        earlier = [i for i, checkpoint in enumerate(self.checkpoints) if checkpoint.cycles <= cycles]
+        if earlier:
+            self.checkpoints.truncate(earlier[-1])
+        else:
+            # Stepped back past the oldest checkpoint, start again from here
+            self.checkpoints.clear()
+            self.checkpoints.take()
+
+    def step_back(self, n=1):
+        """
+        Go back n ticks, through the ring or from a checkpoint
+
+        :return: number of ticks stepped back
+        """
+        n = min(n, self.emulator.cycles)
+        if n <= self.length:
+            for _ in range(n):
+                self.undo()
+            if self.checkpoints is not None:
+                self.drop_checkpoints_after(self.emulator.cycles)
+            return n
+
+        target = self.emulator.cycles - n
+        if self.checkpoints is None or not self.checkpoints or self.checkpoints[0].cycles > target:
+            raise ValueError(f'Can only step back {self.length} ticks')
+        index = max(i for i, checkpoint in enumerate(self.checkpoints) if checkpoint.cycles <= target)
+        self.checkpoints.restore(index)
+        self.position = self.length = 0
+        self.run(target - self.emulator.cycles)
+        return n
+
+    def run_back_until(self, pc):
+        """
+        Step back to the last time the instruction at pc was about to run,
+        looking through the ring only
+
+        :return: number of ticks stepped back, 0 when it isn't in the ring
+        """
+        for steps in range(1, self.length + 1):
+            slot = (self.position - steps) % self.capacity
+            if self.registers[slot * REGISTER_COUNT + PC] == pc:
+                return self.step_back(steps)
+        return 0
@@ -0,0 +1,240 @@
+import numpy as np
+
+A, B, C, D, SP, PC = range(6)
+
+RAM_SIZE = 2**15
+SCREEN_SIZE = 2**13
+SCREEN_START = RAM_SIZE
+KEYBOARD = RAM_SIZE + SCREEN_SIZE
+MEMORY_SIZE = KEYBOARD + 1
+
+SECTOR_WORDS = 32  # 512 bits
+
+# Status bit checked by the conditional jumps: jump if neg, zero, overflow
+JUMP_STATUS_BIT = np.array([0, 14, 15, 13])
+
+
+def memory_index(address):
+    """ Map 16 bit addresses to the (RAM, screen, keyboard) memory of an instance """
+    return np.where(address & 0x8000,
+                    np.where(address & 0x2000, KEYBOARD, SCREEN_START + (address & 0x1FFF)),
+                    address)
+
+
+def alu(a, b, opcode):
+    """
+    computer.chips.optimized.arithmetic_logic_unit.ALU on int arrays
+
+    :return: out, is_zero, is_neg, carry as int arrays
+    """
+    op0 = (opcode & 0b1000) != 0
+    op1 = (opcode & 0b0100) != 0
+    op2 = (opcode & 0b0010) != 0
+    op3 = (opcode & 0b0001) != 0
+
+    # Arithmetic
+    a1 = np.where(op3, -a & 0xFFFF, a)
+    add = a1 + b
+    inc = (a1 + 1) & 0xFFFF
+    add_or_sub = np.where(op3, -add & 0xFFFF, add & 0xFFFF)
+    inc_or_dec = np.where(op3, -inc & 0xFFFF, inc)
+    arithmetic = np.where(op1, add_or_sub, np.where(op2, inc_or_dec, a1))
+    carry = np.where(op2,
+                     np.where(op3, a == 0, a == 0xFFFF),
+                     op1 & (add >> 16 != 0))
+
+    # Logical
+    a_log = np.where(op3, a ^ 0xFFFF, a)
+    logical = np.choose((opcode >> 1) & 0b11, [a_log, a_log & b, a_log | b, a_log ^ b])
+
+    out = np.where(op0, logical, arithmetic)
+    carry = np.where(op0, 0, carry).astype(np.int64)
+    return out, (out == 0).astype(np.int64), out >> 15, carry
+
+
+class LockstepEmulator:
+    """
+    Runs N machines in lockstep, one instruction for every running
+    machine per step, with the semantics of the CPU in
+    computer.chips.central_processing_unit.
+
+    State, one row per machine:
+        registers: (N, 6) uint16, columns a, b, c, d, sp, pc
+        status: (N,) uint16
+        memory: (N, 40961) uint16, RAM, screen and keyboard
+            ram: (N, 32768) view
+            screen: (N, 8192) view
+            keyboard: (N,) view
+        hdd: (N, words) uint16, images padded to the longest one
+        hdd_words: (N,) size of each image in words
+        sector: (N,) uint16 HDD sector register
+        shutdown: (N,) bool, machines which have shut down are retired
+        cycles: (N,) number of instructions executed
+    """
+    def __init__(self, number_of_machines):
+        n = number_of_machines
+        self.registers = np.zeros((n, 6), dtype=np.uint16)
+        self.status = np.zeros(n, dtype=np.uint16)
+
+        self.memory = np.zeros((n, MEMORY_SIZE), dtype=np.uint16)
+        self.ram = self.memory[:, :RAM_SIZE]
+        self.screen = self.memory[:, SCREEN_START:KEYBOARD]
+        self.keyboard = self.memory[:, KEYBOARD]
+
+        self.hdd = np.zeros((n, 0), dtype=np.uint16)
+        self.hdd_words = np.zeros(n, dtype=np.int64)
+        self.sector = np.zeros(n, dtype=np.uint16)
+
+        self.shutdown = np.zeros(n, dtype=bool)
+        self.cycles = np.zeros(n, dtype=np.int64)
+
+    @property
+    def number_of_machines(self):
+        return len(self.registers)
+
+    def load_binary(self, binary, machines=None):
+        """ :param binary: bitarray, loaded at address 0 of the machines (default all) """
+        words = self.to_words(binary)
+        machines = slice(None) if machines is None else machines
+        self.ram[machines, :len(words)] = words
+
+    def load_hdd_images(self, images):
+        """ :param images: one bitarray per machine """
+        images = [self.to_words(image) for image in images]
+        size = max(len(image) for image in images)
+        self.hdd = np.zeros((self.number_of_machines, size), dtype=np.uint16)
+        for i, image in enumerate(images):
+            self.hdd[i, :len(image)] = image
+            self.hdd_words[i] = len(image)
+
+    @staticmethod
+    def to_words(bits):
+        if len(bits) % 16:
+            raise ValueError(f'bitarray must be a multiple of 16 long, is {len(bits)}')
+        return np.frombuffer(bits.tobytes(), dtype='>u2').astype(np.uint16)
+
+    def run(self, max_cycles=None):
+        """ Step until all machines have shut down, or for max_cycles steps """
+        steps = 0
+        while not self.shutdown.all() and (max_cycles is None or steps < max_cycles):
+            self.step()
+            steps += 1
+
+    def reset(self):
+        self.registers[:, PC] = 0
+        self.shutdown[:] = False
+
+    def step(self):
+        """ :return: number of machines which executed an instruction """
+        rows = np.flatnonzero(~self.shutdown)
+        if not len(rows):
+            return 0
+
+        registers = self.registers[rows].astype(np.int64)
+        memory = self.memory
+        pc = registers[:, PC]
+        sp = registers[:, SP]
+        status = self.status[rows].astype(np.int64)
+
+        constant_address = (pc + 1) & 0xFFFF
+        inc_constant_address = (pc + 2) & 0xFFFF
+        instruction = memory[rows, memory_index(pc)].astype(np.int64)
+        constant = memory[rows, memory_index(constant_address)].astype(np.int64)
+
+        opcode = instruction >> 12
+        secondary_opcode = instruction >> 8 & 0xF
+        target_address = instruction >> 4 & 0xF
+        source_address = instruction & 0xF
+
+        is_jump = opcode & 0b0111 == 0b0100
+        is_call = is_jump & (secondary_opcode & 0b0100 != 0)
+        is_return = is_jump & (secondary_opcode & 0b0010 != 0)
+        is_pop = (opcode & 0b0001 != 0) & (secondary_opcode & 0b1000 != 0) | is_return
+        sp_pop = (sp + 1) & 0xFFFF
+
+        zeros = np.zeros_like(pc)
+        selectable = [registers[:, A], registers[:, B], registers[:, C], registers[:, D],
+                      sp, constant, zeros, zeros]
+
+        # source value
+        source_register_value = np.choose(source_address & 0b0111,
+                                          selectable[:4] + [np.where(is_pop, sp_pop, sp)] + selectable[5:])
+        source_value = np.where(source_address & 0b1000,
+                                memory[rows, memory_index(source_register_value)],
+                                source_register_value)
+
+        # target
+        target_register_value = np.choose(target_address & 0b0111, selectable)
+        target_is_pointer = target_address & 0b1000 != 0
+        target_value = np.where(target_is_pointer,
+                                memory[rows, memory_index(target_register_value)],
+                                target_register_value)
+
+        # ALU op
+        is_alu = opcode & 0b1000 != 0
+        alu_out, is_zero, is_neg, overflow = alu(target_value, source_value, secondary_opcode)
+        result = np.where(is_alu, alu_out, source_value)
+
+        # HDD op
+        is_hdd = (opcode & 0b1001 == 0) & (opcode & 0b0010 != 0) & (secondary_opcode & 0b1000 != 0)
+        if is_hdd.any():
+            result[is_hdd] = self.hdd_op(rows[is_hdd], target_value[is_hdd], source_value[is_hdd],
+                                         secondary_opcode[is_hdd])
+
+        # Load moved value
+        source_is_constant = source_address & 0b0101 == 0b0101
+        move_value = np.where(is_call,
+                              np.where(source_is_constant, inc_constant_address, constant_address),
+                              result)
+        load = is_call | (opcode & 0b0110 == 0b0010)
+        load_ram = target_is_pointer | is_call
+
+        store = load & load_ram
+        if store.any():
+            memory[rows[store], memory_index(target_register_value[store])] = move_value[store]
+
+        selected_register = target_address & 0b0111
+        load_register = load & ~load_ram
+        new_registers = registers.copy()
+        for register in (A, B, C, D):
+            selected = load_register & (selected_register == register)
+            new_registers[selected, register] = move_value[selected]
+
+        # Update stack pointer
+        is_stack_op = (opcode & 0b0001 != 0) | is_call | is_return
+        new_registers[:, SP] = np.where(is_stack_op,
+                                        np.where(is_pop, sp_pop, (sp - 1) & 0xFFFF),
+                                        np.where(~load_ram & (selected_register == 4), result, sp))
+
+        # Set PC
+        is_conditional = (opcode & 0b0100 != 0) & ~is_jump
+        status_bit = (status >> JUMP_STATUS_BIT[opcode & 0b0011]) & 1
+        do_jump = is_jump | is_conditional & (status_bit != 0)
+        skip_constant = source_is_constant | (target_address & 0b0101 == 0b0101)
+        new_registers[:, PC] = np.where(opcode == 0, 0,
+                                        np.where(do_jump, result,
+                                                 np.where(skip_constant, inc_constant_address,
+                                                          constant_address)))
+
+        self.status[rows] = np.where(is_alu, is_zero << 15 | is_neg << 14 | overflow << 13, status)
+        self.registers[rows] = new_registers
+        self.cycles[rows] += 1
+        self.shutdown[rows] = opcode == 0b0001
+        return len(rows)
+
+    def hdd_op(self, rows, target_value, source_value, secondary_opcode):
+        write = secondary_opcode & 0b0010 != 0
+        set_sector = secondary_opcode & 0b0100 != 0
+        address = np.where(write, target_value, source_value)
+
+        i = SECTOR_WORDS * self.sector[rows].astype(np.int64) + address
+        outside = i >= self.hdd_words[rows]
+        if outside.any():
+            machine = rows[outside][0]
+            raise ValueError(f'No data in address {16 * i[outside][0]} on machine {machine}. '
+                             f'HDD is only {16 * self.hdd_words[machine]} long')
+
+        self.hdd[rows[write], i[write]] = source_value[write]
+        out = self.hdd[rows, i].astype(np.int64)
+        self.sector[rows[set_sector]] = address[set_sector]
+        return out
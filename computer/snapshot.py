@@ -0,0 +1,252 @@
+"""
+Saves and restores the state of a running Emulator
+
+    data = emulator.snapshot()  # bytes, e.g. written to a file
+    ...
+    emulator.restore(data)
+
+The state is taken between ticks: the registers of the CPU with their
+pending next values, RAM, screen, keyboard, the sector register of the
+HDD and the sectors written since its image was loaded, see
+HardDisk.written_sectors: the cost doesn't depend on the size of the
+image, a big memory mapped one isn't read. So a snapshot only restores
+onto a hard disk with the same image, its other written sectors are set
+back to the image. HDDs without written sectors, like test fakes, are
+left out. RAM has to hold int words, like
+computer.chips.optimized.memory.CombinedRAM.
+
+Format, little endian:
+    header     magic b'CSNP', version u16, cycles u64, shutdown u8
+    registers  a, b, c, d, sp, pc, status, keyboard, hdd sector:
+               word and next word, u16 each
+    RAM        pages
+    screen     pages
+    HDD        kind u8, then for SECTORS: count u32, per sector: number
+               u32, length in bits u16, followed by the length u32 of
+               the zlib compressed sector bytes and those
+
+Pages is a byte string cut into pages of PAGE_SIZE bytes: its length
+u32, the compressed length u32, a bitmap of the pages which aren't all
+zeros and those pages, zlib compressed.
+"""
+import struct
+import sys
+import zlib
+from array import array
+
+from bitarray import bitarray
+
+from computer.chips.optimized.memory import PAGE_WORDS
+from computer.io.harddisk import SectorCache
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+MAGIC = b'CSNP'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHQB')
+REGISTERS = struct.Struct('<18H')
+LENGTHS = struct.Struct('<II')
+SECTOR = struct.Struct('<IH')
+COUNT = struct.Struct('<I')
+
+PAGE_SIZE = 512
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+# HDD sections
+HDD_NONE = 0
+HDD_SECTORS = 1
+
+
+def pack_pages(data):
+    """ :return: data with the all zero pages left out, see the module docstring """
+    pages = bitarray(endian='little')
+    stored = []
+    for start in range(0, len(data), PAGE_SIZE):
+        page = data[start:start + PAGE_SIZE]
+        nonzero = page != ZERO_PAGE[:len(page)]
+        pages.append(nonzero)
+        if nonzero:
+            stored.append(page)
+    compressed = zlib.compress(b''.join(stored), 1)
+    return LENGTHS.pack(len(data), len(compressed)) + pages.tobytes() + compressed
+
+
+def unpack_pages(snapshot, offset):
+    """ :return: (data, offset after the pages) """
+    length, compressed_length = LENGTHS.unpack_from(snapshot, offset)
+    offset += LENGTHS.size
+
+    page_count = -(-length // PAGE_SIZE)
+    pages = bitarray(endian='little')
+    pages.frombytes(snapshot[offset:offset + (page_count + 7) // 8])
+    offset += (page_count + 7) // 8
+
+    stored = zlib.decompress(snapshot[offset:offset + compressed_length])
+    offset += compressed_length
+
+    data = bytearray(length)
+    position = 0
+    for i in pages.search(1):
+        start = i * PAGE_SIZE
+        page_length = min(PAGE_SIZE, length - start)
+        data[start:start + page_length] = stored[position:position + page_length]
+        position += page_length
+    return data, offset
+
+
+def words_to_bytes(words):
+    if sys.byteorder == 'big':
+        words = array('H', words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def bytes_to_words(data, words):
+    """ Copy little endian data into the array('H') words in place """
+    new = array('H', bytes(data))
+    if sys.byteorder == 'big':
+        new.byteswap()
+    words[:] = new
+
+
+def register_words(register):
+    if hasattr(register, 'word'):
+        return register.word, register.next_word
+    return bin_to_dec(register.value), bin_to_dec(register.next_value)
+
+
+def set_register_words(register, word, next_word):
+    if hasattr(register, 'word'):
+        register.word, register.next_word = word, next_word
+    else:
+        register.value = dec_to_bin(word)
+        if next_word != word:
+            register.next_value = dec_to_bin(next_word)
+
+
+def cpu_registers(cpu):
+    return [cpu.a, cpu.b, cpu.c, cpu.d, cpu.sp, cpu.pc.register, cpu.status]
+
+
+def hdd_sector_words(hdd):
+    if isinstance(hdd, SectorCache):
+        return hdd.sector, hdd.next_sector
+    if hasattr(hdd, 'sector'):
+        return register_words(hdd.sector)
+    return 0, 0
+
+
+def set_hdd_sector_words(hdd, word, next_word):
+    if isinstance(hdd, SectorCache):
+        hdd.sector, hdd.next_sector = word, next_word
+    elif hasattr(hdd, 'sector'):
+        set_register_words(hdd.sector, word, next_word)
+
+
+def register_file_words(cpu):
+    """ :return: word and next word of every register, in the order of the format """
+    words = []
+    for register in cpu_registers(cpu):
+        words += register_words(register)
+    words += register_words(cpu.ram.keyboard)
+    words += hdd_sector_words(cpu.hdd)
+    return words
+
+
+def set_register_file_words(cpu, words):
+    for register, i in zip(cpu_registers(cpu) + [cpu.ram.keyboard], range(0, 16, 2)):
+        set_register_words(register, words[i], words[i + 1])
+
+    set_hdd_sector_words(cpu.hdd, words[16], words[17])
+
+
+def pack_hdd(hdd):
+    if isinstance(hdd, SectorCache):
+        hdd.write_back()
+        hdd = hdd.hdd
+
+    if not hasattr(hdd, 'written_sectors'):
+        return bytes([HDD_NONE])
+
+    sectors = [(sector, hdd.read_sector(sector)) for sector in sorted(hdd.written_sectors)]
+    header = b''.join(SECTOR.pack(sector, len(bits)) for sector, bits in sectors)
+    data = zlib.compress(b''.join(bits.tobytes() for _, bits in sectors), 1)
+    return bytes([HDD_SECTORS]) + COUNT.pack(len(sectors)) + header + COUNT.pack(len(data)) + data
+
+
+def set_written_sectors(hdd, sectors):
+    """ Write the dict sector -> bits to hdd, its other written sectors are set back """
+    for sector in set(hdd.written_sectors).difference(sectors):
+        hdd.revert_sector(sector)
+    for sector, bits in sectors.items():
+        hdd.write_sector(sector, bits)
+
+
+def unpack_hdd(hdd, snapshot, offset):
+    """ Restore hdd from the HDD section at offset """
+    kind = snapshot[offset]
+    offset += 1
+    if isinstance(hdd, SectorCache):
+        hdd.clear()
+        hdd = hdd.hdd
+
+    if kind == HDD_SECTORS:
+        count, = COUNT.unpack_from(snapshot, offset)
+        offset += COUNT.size
+        headers = [SECTOR.unpack_from(snapshot, offset + i * SECTOR.size) for i in range(count)]
+        offset += count * SECTOR.size
+        length, = COUNT.unpack_from(snapshot, offset)
+        offset += COUNT.size
+        data = zlib.decompress(snapshot[offset:offset + length])
+
+        sectors = {}
+        position = 0
+        for sector, bit_length in headers:
+            bits = bitarray()
+            bits.frombytes(data[position:position + (bit_length + 7) // 8])
+            del bits[bit_length:]
+            sectors[sector] = bits
+            position += (bit_length + 7) // 8
+        set_written_sectors(hdd, sectors)
+    elif kind != HDD_NONE:
+        raise ValueError(f'Unknown HDD section {kind}')
+
+
+def take(emulator):
+    """ :return: the state of emulator as bytes """
+    cpu = emulator.cpu
+    ram = cpu.ram
+    if not hasattr(ram, 'screen') or not hasattr(ram.ram, 'words'):
+        raise TypeError('Snapshots need a RAM with int words, like the optimized CombinedRAM')
+
+    return b''.join([HEADER.pack(MAGIC, VERSION, emulator.cycles, emulator.shutdown),
+                     REGISTERS.pack(*register_file_words(cpu)),
+                     pack_pages(words_to_bytes(ram.ram.words)),
+                     pack_pages(words_to_bytes(ram.screen.words)),
+                     pack_hdd(cpu.hdd)])
+
+
+def restore(emulator, snapshot):
+    """ Set the state of emulator to the one taken by take """
+    magic, version, cycles, shutdown = HEADER.unpack_from(snapshot)
+    if magic != MAGIC:
+        raise ValueError('Not an emulator snapshot')
+    if version != VERSION:
+        raise ValueError(f'Snapshot version {version} is not supported, only {VERSION}')
+
+    cpu = emulator.cpu
+    ram = cpu.ram
+    words = REGISTERS.unpack_from(snapshot, HEADER.size)
+    offset = HEADER.size + REGISTERS.size
+
+    set_register_file_words(cpu, words)
+
+    for memory in (ram.ram, ram.screen):
+        data, offset = unpack_pages(snapshot, offset)
+        bytes_to_words(data, memory.words)
+        memory.next = []
+        memory.replaced(range(len(memory.words) // PAGE_WORDS))
+    unpack_hdd(cpu.hdd, snapshot, offset)
+
+    emulator.cycles = cycles
+    emulator.shutdown = bool(shutdown)
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+from bitarray import bitarray
+
+from computer.batch import Job, run_job, run_batch, main, make_job_emulator, TIMEOUT, ERROR
+from computer.emulator import SHUTDOWN, MAX_CYCLES
+from computer.io.harddisk import MappedHardDisk, OverlayHardDisk
+from computer.chips.optimized.tests.test_translator import assemble, sum_program
+
+keyboard_program = """
+:wait
+move a [KEYBOARD]
+compare a 0
+jump_zero wait
+move [1000] a
+shutdown
+"""
+
+loop_program = """
+:loop
+jump loop
+"""
+
+
+def to_binary(source):
+    binary = bitarray()
+    for instruction in assemble(source):
+        binary += instruction
+    return binary
+
+
+class TestRunJob:
+    def test_hdd_image_file_is_mapped(self, tmp_path):
+        image = tmp_path / 'disk.bin'
+        image.write_bytes(bytes(range(64)))
+
+        emulator = make_job_emulator(Job('disk', to_binary(sum_program), hdd_image=str(image)))
+
+        assert isinstance(emulator.cpu.hdd, MappedHardDisk)
+        assert emulator.cpu.hdd.mode == 'c'
+        assert emulator.cpu.hdd.data.tobytes() == bytes(range(64))
+
+    def test_mapped_hdd_is_closed(self, tmp_path, monkeypatch):
+        image = tmp_path / 'disk.bin'
+        image.write_bytes(bytes(64))
+        maps = []
+        close = MappedHardDisk.close
+
+        def spy(hdd):
+            maps.append(hdd.map)
+            close(hdd)
+        monkeypatch.setattr(MappedHardDisk, 'close', spy)
+
+        assert run_job(Job('disk', to_binary(sum_program), hdd_image=str(image))).reason == SHUTDOWN
+        assert len(maps) == 1 and maps[0].closed
+
+    def test_hdd_image_bits_are_shared(self):
+        image = bitarray(1024)
+        job = Job('disk', to_binary('move a 1\nhddsector a\nhddwrite a a\nshutdown'), hdd_image=image)
+        emulator = make_job_emulator(job)
+
+        assert isinstance(emulator.cpu.hdd, OverlayHardDisk)
+        assert emulator.cpu.hdd.base is not image
+        assert run_job(job).reason == SHUTDOWN
+        assert not image.any()
+
+    def test_shutdown(self):
+        result = run_job(Job('sum', to_binary(sum_program)))
+
+        assert result.reason == SHUTDOWN
+        assert result.registers['a'] == 55
+        assert result.error is None
+
+    def test_same_digests_as_single_steps(self):
+        # Budget below a block length runs single steps only
+        binary = to_binary(sum_program)
+        translated = run_job(Job('sum', binary))
+        stepped = [run_job(Job('sum', binary, max_cycles=cycles)) for cycles in range(1, 60)]
+
+        assert stepped[-1].reason == SHUTDOWN
+        assert stepped[-1].cycles == translated.cycles
+        assert stepped[-1].register_digest == translated.register_digest
+        assert stepped[-1].ram_digest == translated.ram_digest
+
+    def test_max_cycles(self):
+        result = run_job(Job('loop', to_binary(loop_program), max_cycles=1000))
+
+        assert result.reason == MAX_CYCLES
+        assert result.cycles == 1000
+
+    def test_timeout(self):
+        result = run_job(Job('loop', to_binary(loop_program), timeout=0))
+
+        assert result.reason == TIMEOUT
+
+    def test_keyboard_script(self):
+        result = run_job(Job('keyboard', to_binary(keyboard_program), keyboard_script=[(100, 65)]))
+
+        assert result.reason == SHUTDOWN
+        assert result.registers['a'] == 65
+        assert 100 < result.cycles < 110
+
+    def test_error(self):
+        result = run_job(Job('hdd', to_binary('hddread a 5\nshutdown')))
+
+        assert result.reason == ERROR
+        assert 'ValueError' in result.error
+
+
+class TestRunBatch:
+    def test_matches_serial_runs(self):
+        jobs = [Job('sum', to_binary(sum_program)),
+                Job('loop', to_binary(loop_program), max_cycles=500),
+                Job('keyboard', to_binary(keyboard_program), keyboard_script=[(20, 7)])]
+
+        assert run_batch(jobs, workers=2) == [run_job(job) for job in jobs]
+
+    def test_cli(self, tmp_path, capsys):
+        binary_path = tmp_path / 'sum.bin'
+        with open(binary_path, 'wb') as file:
+            to_binary(sum_program).tofile(file)
+        jobs_path = tmp_path / 'jobs.json'
+        jobs_path.write_text(json.dumps([{'name': 'sum', 'binary': str(binary_path)},
+                                         {'name': 'budget', 'binary': str(binary_path), 'max_cycles': 10}]))
+
+        main([str(jobs_path), '--workers', '1'])
+
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [(r['name'], r['reason']) for r in results] == [('sum', SHUTDOWN), ('budget', MAX_CYCLES)]
+        assert results[0]['registers']['a'] == 55
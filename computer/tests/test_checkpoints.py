@@ -0,0 +1,160 @@
+import pytest
+from bitarray import bitarray
+
+from computer.checkpoints import Checkpoints, SCREEN_PAGE
+from computer.chips.memory import RAM8
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM, RAM32K
+from computer.emulator import Emulator
+from computer.io.harddisk import HardDisk, OverlayHardDisk, SectorCache
+from computer.tests.test_emulator import make_emulator, SUM_CYCLES
+from computer.tests.test_snapshot import state, write_hdd
+from computer.utility.numbers import dec_to_bin
+
+
+def test_dirty_pages():
+    ram = RAM32K()
+    ram.write(0, 1)
+    ram.write(300, 1)
+    ram(dec_to_bin(5), dec_to_bin(0x7FFF), 1)
+    assert ram.dirty_pages == set()
+
+    ram.tick()
+    assert ram.dirty_pages == {0, 1, 0x7F}
+
+
+class TestCheckpoints:
+    def test_deltas(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+        first = checkpoints.take()
+        emulator.run()
+        last = checkpoints.take()
+
+        assert list(first.pages) == [0]  # the program
+        assert list(last.pages) == [1000 >> 8]  # the sum
+        assert last.cycles == SUM_CYCLES
+
+    def test_screen_pages(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+        checkpoints.take()
+        emulator.cpu.ram.write(0x8000 + 0x1FFF, 1)
+        emulator.cpu.ram.tick()
+
+        assert list(checkpoints.take().pages) == [SCREEN_PAGE + 0x1F]
+
+    @pytest.mark.parametrize('translate', [False, True])
+    def test_restore_any(self, translate):
+        emulator = make_emulator(translate=translate)
+        checkpoints = Checkpoints(emulator)
+        states = []
+        for _ in range(5):
+            checkpoints.take()
+            states.append(state(emulator))
+            emulator.run(max_cycles=10)
+
+        for index in (4, 2, 0):
+            checkpoints.restore(index)
+            assert state(emulator) == states[index]
+            assert len(checkpoints) == index + 1
+
+        assert emulator.run().cycles == SUM_CYCLES
+        assert emulator.cpu.ram.read(1000) == 55
+
+    def test_restore_only_changed_pages(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+        checkpoints.take()
+        emulator.cpu.ram.ram.words[5000] = 7  # not tracked, so not restored
+        emulator.run()
+
+        checkpoints.restore(0)
+        assert emulator.cpu.ram.read(1000) == 0
+        assert emulator.cpu.ram.read(5000) == 7
+
+    def test_run(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+
+        assert checkpoints.run(every=10).cycles == SUM_CYCLES
+        assert [checkpoint.cycles for checkpoint in checkpoints] == [10, 20, 30, 40, 50]
+
+    def test_collapse(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+        checkpoints.take()
+        for value in range(3):
+            emulator.cpu.ram.write(1000, value)
+            emulator.cpu.ram.write(2000 + 256 * value, value)
+            emulator.cpu.ram.tick()
+            checkpoints.take()
+        expected = state(emulator)
+        assert checkpoints.page_count == 7
+
+        merged = checkpoints.collapse(1)
+        assert len(checkpoints) == 2
+        assert checkpoints.page_count == 5
+        assert merged.pages[1000 >> 8][1000 % 256] == 2
+
+        emulator.run()
+        checkpoints.restore()
+        assert state(emulator) == expected
+
+    def test_limit(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator, limit=3)
+        checkpoints.run(every=10)
+
+        assert len(checkpoints) == 3
+        assert checkpoints[0].cycles == 30
+        checkpoints.restore(0)
+        assert emulator.run().cycles == SUM_CYCLES - 30
+
+    def test_hdd(self):
+        emulator = Emulator(CPU(CombinedRAM(), OverlayHardDisk(bitarray(1024))))
+        checkpoints = Checkpoints(emulator)
+        checkpoints.take()
+        write_hdd(emulator, 1, 0, 5)
+
+        checkpoints.restore(0)
+        assert emulator.cpu.hdd.sectors == {}
+
+    @pytest.mark.parametrize('cache', [False, True])
+    def test_hdd_deltas(self, cache):
+        hdd = HardDisk()
+        hdd.data = bitarray(2**16 * 16)
+        emulator = Emulator(CPU(CombinedRAM(), SectorCache(hdd, flush_on_tick=False) if cache else hdd))
+        write_hdd(emulator, 1, 0, 5)
+        checkpoints = Checkpoints(emulator)
+        assert list(checkpoints.take().hdd) == [1]
+        write_hdd(emulator, 2, 0, 6)
+        assert list(checkpoints.take().hdd) == [2]
+        assert list(checkpoints.take().hdd) == []
+        expected = hdd.data.copy()
+        write_hdd(emulator, 1, 0, 7)
+        write_hdd(emulator, 3, 0, 8)
+
+        checkpoints.restore()
+        assert hdd.data == expected
+        assert sorted(hdd.written_sectors) == [1, 2]
+        checkpoints.restore(0)
+        assert sorted(hdd.written_sectors) == [1]
+        assert hdd.read_sector(1)[:16] == dec_to_bin(5)
+        assert checkpoints.sector_count == 1
+
+    def test_full_restore_marks_pages(self):
+        emulator = make_emulator()
+        checkpoints = Checkpoints(emulator)
+        data = emulator.snapshot()
+        emulator.run()
+        checkpoints.take()
+
+        emulator.restore(data)
+        emulator.run(max_cycles=5)
+        checkpoints.restore(0)
+        assert emulator.cpu.ram.read(1000) == 55
+
+    def test_gate_level_ram(self):
+        with pytest.raises(TypeError):
+            Checkpoints(Emulator(CPU(RAM8(), None)))
@@ -0,0 +1,70 @@
+import pytest
+
+from computer.chips.central_processing_unit import CPU as GateCPU
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.tests.test_central_processing_unit import FakeHardDisk
+from computer.chips.optimized.tests.test_translator import assemble, sum_program
+from computer.emulator import Emulator, RunResult, SHUTDOWN, MAX_CYCLES, BREAKPOINT, UNTIL
+from computer.utility.numbers import dec_to_bin
+
+# sum_program runs this many cycles, the add of the loop is at address 4
+SUM_CYCLES = 53
+LOOP = 4
+
+
+def make_emulator(cpu_type=CPU, translate=False):
+    emulator = Emulator(cpu_type(CombinedRAM(), FakeHardDisk()), translate=translate)
+    for i, instruction in enumerate(assemble(sum_program)):
+        emulator.cpu.ram(instruction, dec_to_bin(i), 1)
+    emulator.cpu.ram.tick()
+    return emulator
+
+
+emulator_types = [(CPU, False), (CPU, True), (GateCPU, False)]
+
+
+@pytest.mark.parametrize('cpu_type, translate', emulator_types)
+class TestRun:
+    def test_run_to_shutdown(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+
+        assert emulator.run() == RunResult(SUM_CYCLES, SHUTDOWN)
+        assert emulator.cycles == SUM_CYCLES
+        assert emulator.cpu.ram.read(1000) == 55
+        assert emulator.run() == RunResult(0, SHUTDOWN)
+
+    def test_max_cycles(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+
+        assert emulator.run(max_cycles=10) == RunResult(10, MAX_CYCLES)
+        assert emulator.cycles == 10
+        assert emulator.run(max_cycles=100) == RunResult(SUM_CYCLES - 10, SHUTDOWN)
+
+    def test_until_pc(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+
+        assert emulator.run(until_pc=LOOP) == RunResult(LOOP // 2, BREAKPOINT)
+        assert emulator.run(until_pc=[LOOP]) == RunResult(5, BREAKPOINT)
+        assert emulator.run(until_pc={LOOP, 1}).reason == BREAKPOINT
+        assert emulator.cycles == LOOP // 2 + 10
+
+    def test_until(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+
+        result = emulator.run(until=lambda e: e.cpu.ram.read(1000) == 0 and e.cycles > 20, check_every=8)
+
+        # Checked on the first block boundary after every 8 cycles
+        assert result.reason == UNTIL
+        assert 20 < result.cycles <= 24
+
+
+def test_breakpoint_inside_block():
+    emulator = make_emulator(translate=True)
+    emulator.run()
+    emulator.shutdown = False
+    emulator.cpu.pc.register.word = 0
+
+    # The loop block was translated, breakpoints split it
+    assert emulator.run(until_pc=LOOP + 1) == RunResult(LOOP // 2 + 1, BREAKPOINT)
+    assert emulator.cpu.pc.register.word == LOOP + 1
@@ -0,0 +1,183 @@
+import pytest
+from bitarray import bitarray
+
+from computer.chips.central_processing_unit import CPU as GateCPU
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.tests.test_translator import assemble
+from computer.emulator import Emulator, SHUTDOWN, MAX_CYCLES, BREAKPOINT, UNTIL
+from computer.io.harddisk import HardDisk
+from computer.journal import Journal
+from computer.tests.test_emulator import make_emulator, SUM_CYCLES, LOOP
+from computer.tests.test_snapshot import state
+from computer.utility.numbers import dec_to_bin
+
+hdd_program = """
+move b 1
+hddsector b
+move c 2
+hddwrite c b
+move d 3
+hddwrite d c
+shutdown
+"""
+
+pointer_program = """
+move b 1
+hddsector b
+move c 100
+move [c] 2
+hddwrite [c] b
+move d 0
+hddsector d
+hddread [c] b
+shutdown
+"""
+
+
+def hdd_emulator(source):
+    hdd = HardDisk()
+    hdd.data = bitarray(2 * 512)
+    emulator = Emulator(CPU(CombinedRAM(), hdd))
+    for i, instruction in enumerate(assemble(source)):
+        emulator.cpu.ram(instruction, dec_to_bin(i), 1)
+    emulator.cpu.ram.tick()
+    return emulator
+
+
+def record_states(emulator, journal):
+    states = [state(emulator)]
+    while not emulator.shutdown:
+        journal.tick()
+        states.append(state(emulator))
+    return states
+
+
+class TestJournal:
+    def test_step_back_every_tick(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+        states = record_states(emulator, journal)
+
+        assert len(states) == SUM_CYCLES + 1
+        for expected in reversed(states[:-1]):
+            assert journal.step_back() == 1
+            assert state(emulator) == expected
+
+    def test_step_back_many(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+        states = record_states(emulator, journal)
+
+        assert journal.step_back(SUM_CYCLES - 7) == SUM_CYCLES - 7
+        assert state(emulator) == states[7]
+        assert journal.run() == (SUM_CYCLES - 7, SHUTDOWN)
+        assert state(emulator) == states[-1]
+
+    def test_run_back_until(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+        journal.run()
+
+        steps = journal.run_back_until(LOOP)
+        assert steps > 0
+        assert emulator.cpu.pc.register.word == LOOP
+        # The last time, the run to shutdown follows
+        assert journal.run(until_pc=LOOP) == (steps, SHUTDOWN)
+        assert journal.run_back_until(100) == 0
+
+    def test_run_until_any_pc(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+
+        assert journal.run(until_pc=[100, LOOP]).reason == BREAKPOINT
+        assert emulator.cpu.pc.register.word == LOOP
+        assert journal.run(until_pc=set()).reason == SHUTDOWN
+
+    def test_run(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+
+        assert journal.run(max_cycles=10) == (10, MAX_CYCLES)
+        assert journal.run() == (SUM_CYCLES - 10, SHUTDOWN)
+        assert emulator.cpu.ram.read(1000) == 55
+
+    def test_run_until(self):
+        emulator = make_emulator()
+        journal = Journal(emulator)
+
+        result = journal.run(until=lambda emulator: emulator.cycles >= 20, check_every=8)
+        assert result == (24, UNTIL)
+        assert journal.length == 24
+
+    def test_bounded(self):
+        emulator = make_emulator()
+        journal = Journal(emulator, capacity=10)
+        journal.run()
+
+        assert journal.length == 10
+        assert len(journal.writes) == 10
+        assert journal.step_back(10) == 10
+        with pytest.raises(ValueError):
+            journal.step_back()
+
+    def test_checkpoints(self):
+        emulator = make_emulator()
+        journal = Journal(emulator, capacity=5, checkpoint_every=8)
+        states = record_states(emulator, journal)
+
+        assert journal.step_back(SUM_CYCLES - 3) == SUM_CYCLES - 3
+        assert state(emulator) == states[3]
+        assert journal.length == 3
+
+        journal.run()
+        assert journal.step_back(2) == 2
+        assert [checkpoint.cycles for checkpoint in journal.checkpoints][-1] <= SUM_CYCLES - 2
+        assert state(emulator) == states[-3]
+
+    def test_continue_translated(self):
+        emulator = make_emulator(translate=True)
+        journal = Journal(emulator)
+        journal.run(max_cycles=30)
+        journal.step_back(10)
+
+        assert emulator.run() == (SUM_CYCLES - 20, SHUTDOWN)
+        assert emulator.cpu.ram.read(1000) == 55
+
+    def test_hdd_writes(self):
+        emulator = hdd_emulator(hdd_program)
+        hdd = emulator.cpu.hdd
+        journal = Journal(emulator)
+
+        journal.run()
+        assert hdd.data.count() == 2
+        journal.step_back(2)
+        assert hdd.data[512 + 32:512 + 48] == dec_to_bin(1)
+        assert hdd.data.count() == 1
+        journal.step_back(journal.length)
+        assert not hdd.data.any()
+        assert hdd.sector.value == dec_to_bin(0)
+
+    def test_hdd_op_with_pointer_target(self):
+        emulator = hdd_emulator(pointer_program)
+        hdd = emulator.cpu.hdd
+        journal = Journal(emulator)
+        states = record_states(emulator, journal)
+        written = hdd.data.copy()
+        assert written[512 + 32:512 + 48] == dec_to_bin(1)
+        assert hdd.sector.value == dec_to_bin(0)
+
+        journal.step_back(3)  # shutdown, hddread [c] b and hddsector d
+        assert state(emulator) == states[-4]
+        assert hdd.sector.value == dec_to_bin(1)
+        journal.step_back(2)  # move d 0 and hddwrite [c] b
+        assert emulator.cpu.ram.read(100) == 2
+        assert not hdd.data.any()
+
+        journal.run()
+        assert state(emulator) == states[-1]
+        assert hdd.data == written
+
+    def test_gate_level_cpu(self):
+        with pytest.raises(TypeError):
+            Journal(make_emulator(GateCPU))
@@ -0,0 +1,178 @@
+import random
+
+import numpy as np
+import pytest
+from bitarray import bitarray
+
+from computer.chips.optimized.central_processing_unit import CPU, decode, HDD_OP
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.tests.test_translator import (assemble, sum_program, call_program,
+                                                            self_modifying_program, state, run_cpu)
+from computer.io.harddisk import HardDisk
+from computer.lockstep_emulator import LockstepEmulator, A, B, C, D, SP, PC
+from computer.utility.numbers import dec_to_bin
+
+scenario_program = """
+move b 1
+hddsector b
+move c 2
+hddread a c
+move d [40960]
+add a d
+move [1000] a
+move c 3
+hddwrite c a
+shutdown
+"""
+
+
+def to_bits(words):
+    bits = bitarray()
+    for word in words:
+        bits.extend(dec_to_bin(word))
+    return bits
+
+
+def make_cpu(instructions, hdd_image, keyboard=0):
+    hdd = HardDisk()
+    hdd.data = bitarray(hdd_image)
+    cpu = CPU(CombinedRAM(), hdd)
+    for i, instruction in enumerate(instructions):
+        cpu.ram(instruction, i, 1)
+    cpu.ram.keyboard.next_word = keyboard
+    cpu.ram.tick()
+    return cpu
+
+
+def lockstep_state(emulator, i):
+    a, b, c, d, sp, pc = emulator.registers[i].tolist()
+    return a, b, c, d, sp, int(emulator.status[i]), pc
+
+
+class TestLockstepEmulator:
+    @pytest.mark.parametrize('source, address, expected', [(sum_program, 1000, 55),
+                                                           (call_program, 1001, 6),
+                                                           (self_modifying_program, 1002, 7)])
+    def test_program(self, source, address, expected):
+        instructions = assemble(source)
+        reference = make_cpu(instructions, bitarray())
+        run_cpu(reference)
+
+        emulator = LockstepEmulator(3)
+        emulator.load_binary(to_bits(bin_to_int(instructions)))
+        emulator.run()
+
+        assert emulator.shutdown.all()
+        assert (emulator.ram[:, address] == expected).all()
+        for i in range(3):
+            assert lockstep_state(emulator, i) == state(reference)
+
+    def test_scenarios(self):
+        instructions = assemble(scenario_program)
+        hdd_images = [to_bits(range(i, i + 64)) for i in range(4)]
+        keyboards = [0, 10, 20, 30]
+
+        emulator = LockstepEmulator(4)
+        emulator.load_binary(to_bits(bin_to_int(instructions)))
+        emulator.load_hdd_images(hdd_images)
+        emulator.keyboard[:] = keyboards
+        emulator.run()
+
+        for i, (hdd_image, keyboard) in enumerate(zip(hdd_images, keyboards)):
+            reference = make_cpu(instructions, hdd_image, keyboard)
+            run_cpu(reference)
+
+            assert emulator.ram[i, 1000] == 32 + 2 + i + keyboard
+            assert lockstep_state(emulator, i) == state(reference)
+            assert emulator.hdd[i].tolist() == bin_to_int(reference.hdd.data)
+            assert emulator.sector[i] == 1
+
+    def test_shutdown_retires_machines(self):
+        emulator = LockstepEmulator(2)
+        emulator.load_binary(to_bits(bin_to_int(assemble(sum_program))))
+        emulator.ram[1, 0] = bin_to_int(assemble('shutdown'))[0]
+
+        assert emulator.step() == 2
+        assert emulator.shutdown.tolist() == [False, True]
+        emulator.run()
+
+        assert emulator.cycles[1] == 1
+        assert emulator.cycles[0] > 1
+        assert emulator.step() == 0
+
+    def test_hdd_out_of_range(self):
+        emulator = LockstepEmulator(2)
+        emulator.load_binary(to_bits(bin_to_int(assemble('move a 40\nhddread b a\nshutdown'))))
+        emulator.load_hdd_images([to_bits(range(64)), to_bits(range(32))])
+
+        emulator.step()
+        with pytest.raises(ValueError, match='machine 1'):
+            emulator.step()
+
+    def test_screen_and_keyboard(self):
+        emulator = LockstepEmulator(2)
+        emulator.load_binary(to_bits(bin_to_int(assemble('move a [40960]\nmove [32770] a\nshutdown'))))
+        emulator.keyboard[:] = [5, 6]
+        emulator.run()
+
+        assert emulator.screen[:, 2].tolist() == [5, 6]
+        assert emulator.registers[:, A].tolist() == [5, 6]
+
+
+def bin_to_int(bits):
+    if isinstance(bits, bitarray):
+        bits = [bits[i:i + 16] for i in range(0, len(bits), 16)]
+    return [int(word.to01(), 2) for word in bits]
+
+
+class TestLockstepDifferential:
+    """ Random programs on N lockstep machines and N int CPUs side by side """
+    machines = 16
+    hdd_words = 4 * 32
+
+    @staticmethod
+    def random_instruction(rng):
+        # Random HDD addresses are mostly out of range, leave HDD ops out
+        instruction = rng.getrandbits(16)
+        if decode(instruction).operation == HDD_OP:
+            instruction &= ~0x0800
+        return instruction
+
+    @pytest.mark.parametrize('seed', range(10))
+    def test_random_programs(self, seed):
+        rng = random.Random(seed)
+        emulator = LockstepEmulator(self.machines)
+        references = []
+        images = []
+        for i in range(self.machines):
+            instructions = [dec_to_bin(self.random_instruction(rng)) for _ in range(256)]
+            image = to_bits(rng.getrandbits(16) for _ in range(self.hdd_words))
+            cpu = make_cpu(instructions, image, rng.getrandbits(16))
+            registers = [cpu.a, cpu.b, cpu.c, cpu.d, cpu.sp, cpu.status]
+            for register in registers:
+                register.word = register.next_word = rng.getrandbits(16)
+
+            emulator.ram[i, :256] = bin_to_int(instructions)
+            emulator.keyboard[i] = cpu.ram.keyboard.word
+            emulator.registers[i, [A, B, C, D, SP]] = [r.word for r in registers[:5]]
+            emulator.status[i] = cpu.status.word
+            references.append(cpu)
+            images.append(image)
+        emulator.load_hdd_images(images)
+
+        for _ in range(200):
+            # Stop at HDD ops written by the programs
+            if any(decode(cpu.read(cpu.pc.register.word)).operation == HDD_OP
+                   for cpu, shutdown in zip(references, emulator.shutdown) if not shutdown):
+                break
+            for cpu, shutdown in zip(references, emulator.shutdown):
+                if not shutdown:
+                    cpu()
+                    cpu.tick()
+            emulator.step()
+
+            for i, cpu in enumerate(references):
+                assert lockstep_state(emulator, i) == state(cpu)
+            assert all(np.array_equal(emulator.ram[i], cpu.ram.ram.words)
+                       and np.array_equal(emulator.screen[i], cpu.ram.screen.words)
+                       for i, cpu in enumerate(references))
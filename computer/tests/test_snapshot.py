@@ -0,0 +1,210 @@
+import random
+from array import array
+
+import pytest
+from bitarray import bitarray
+
+from computer import snapshot
+from computer.chips.memory import RAM8
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.emulator import Emulator
+from computer.io.harddisk import HardDisk, MappedHardDisk, OverlayHardDisk, SectorCache
+from computer.tests.test_emulator import make_emulator, emulator_types, SUM_CYCLES
+from computer.utility.numbers import dec_to_bin
+
+
+def state(emulator):
+    cpu = emulator.cpu
+    registers = [cpu.a, cpu.b, cpu.c, cpu.d, cpu.sp, cpu.pc.register, cpu.status]
+    return ([snapshot.register_words(register) for register in registers],
+            cpu.ram.ram.words.tobytes(), cpu.ram.screen.words.tobytes(),
+            snapshot.register_words(cpu.ram.keyboard), emulator.cycles, emulator.shutdown)
+
+
+@pytest.mark.parametrize('cpu_type, translate', emulator_types)
+class TestRoundTrip:
+    def test_continue_from_snapshot(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+        emulator.run(max_cycles=20)
+        data = emulator.snapshot()
+        emulator.run()
+        finished = state(emulator)
+
+        other = make_emulator(cpu_type, translate)
+        other.restore(data)
+        assert other.cycles == 20
+        other.run()
+        assert state(other) == finished
+
+    def test_restore_twice(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+        emulator.run(max_cycles=10)
+        data = emulator.snapshot()
+
+        for _ in range(2):
+            emulator.restore(data)
+            assert emulator.run().cycles == SUM_CYCLES - 10
+            assert emulator.cpu.ram.read(1000) == 55
+
+    def test_pending_values(self, cpu_type, translate):
+        emulator = make_emulator(cpu_type, translate)
+        emulator.cpu.a(dec_to_bin(7), 1)
+        emulator.cpu.ram.keyboard(dec_to_bin(32), 1)
+        data = emulator.snapshot()
+
+        other = make_emulator(cpu_type, translate)
+        other.restore(data)
+        assert snapshot.register_words(other.cpu.a) == (0, 7)
+        assert snapshot.register_words(other.cpu.ram.keyboard) == (0, 32)
+
+
+def test_restore_drops_translated_code():
+    emulator = make_emulator(translate=True)
+    data = emulator.snapshot()
+    emulator.run()
+    emulator.cpu.ram.ram.words[:SUM_CYCLES] = array('H', bytes(2 * SUM_CYCLES))  # no write listeners
+
+    emulator.restore(data)
+    assert not emulator.translator.blocks
+    assert emulator.run().cycles == SUM_CYCLES
+    assert emulator.cpu.ram.read(1000) == 55
+
+
+def test_compact():
+    emulator = make_emulator()
+    rng = random.Random(0)
+    for address in rng.sample(range(2**15), 100):
+        emulator.cpu.ram.ram.words[address] = rng.getrandbits(16)
+
+    data = emulator.snapshot()
+    # At most 100 pages of 256 words aren't zero, about 2 bytes per word compressed
+    assert len(data) < 100 * 2 * 256 * 2 // 10
+    assert len(Emulator(CPU(CombinedRAM(), HardDisk())).snapshot()) < 200
+
+
+def hdd_emulator(hdd):
+    return Emulator(CPU(CombinedRAM(), hdd))
+
+
+def write_hdd(emulator, sector, address, value):
+    hdd = emulator.cpu.hdd
+    hdd(dec_to_bin(sector), 1, dec_to_bin(0), 0)
+    hdd.tick()
+    hdd(dec_to_bin(address), 0, dec_to_bin(value), 1)
+    hdd.tick()
+
+
+def hard_disk(size):
+    hdd = HardDisk()
+    hdd.data = bitarray(size)
+    return hdd
+
+
+class TestHardDisks:
+    def test_written_sectors(self):
+        hdd = hard_disk(4 * 512 + 16)
+        emulator = hdd_emulator(hdd)
+        write_hdd(emulator, 3, 32, 0xBEEF)
+        data = emulator.snapshot()
+        assert sorted(hdd.written_sectors) == [4]
+
+        restored = hard_disk(4 * 512 + 16)
+        hdd_emulator(restored).restore(data)
+        assert restored.data == hdd.data
+        assert restored.sector.value == dec_to_bin(3)
+
+    def test_later_writes_set_back(self):
+        hdd = hard_disk(4 * 512)
+        emulator = hdd_emulator(hdd)
+        write_hdd(emulator, 1, 0, 5)
+        data = emulator.snapshot()
+        expected = hdd.data.copy()
+        write_hdd(emulator, 1, 0, 6)
+        write_hdd(emulator, 2, 0, 7)
+
+        emulator.restore(data)
+        assert hdd.data == expected
+        assert sorted(hdd.written_sectors) == [1]
+
+    def test_large_mapped_image(self, tmp_path):
+        image = tmp_path / 'large.bin'
+        with open(image, 'wb') as file:
+            file.truncate(8 * 2**20)
+
+        with MappedHardDisk(image) as hdd:
+            emulator = hdd_emulator(hdd)
+            write_hdd(emulator, 1000, 1, 1234)
+            data = emulator.snapshot()
+            assert len(data) < 200
+
+            write_hdd(emulator, 2000, 1, 4321)
+            emulator.restore(data)
+            assert hdd.dirty
+            assert sorted(hdd.written_sectors) == [1000]
+            assert not hdd.read_sector(2000).any()
+
+        with open(image, 'rb') as file:
+            file.seek(1000 * 64 + 2)
+            assert file.read(2) == (1234).to_bytes(2, 'big')
+
+    def test_overlay_sectors(self):
+        base = bitarray(2**16)
+        emulator = hdd_emulator(OverlayHardDisk(base))
+        write_hdd(emulator, 5, 1, 1234)
+        data = emulator.snapshot()
+        assert len(data) < 200
+
+        restored = OverlayHardDisk(base)
+        hdd_emulator(restored).restore(data)
+        assert list(restored.sectors) == [5]
+        assert restored.data == emulator.cpu.hdd.data
+
+    def test_sector_cache(self):
+        hdd = HardDisk()
+        hdd.data = bitarray(4 * 512)
+        emulator = hdd_emulator(SectorCache(hdd, flush_on_tick=False))
+        write_hdd(emulator, 2, 3, 99)
+        data = emulator.snapshot()
+        assert not emulator.cpu.hdd.dirty
+
+        cache = SectorCache(hard_disk(4 * 512))
+        hdd_emulator(cache).restore(data)
+        assert cache(dec_to_bin(3), 0, dec_to_bin(0), 0) == dec_to_bin(99)
+
+    def test_sector_cache_on_overlay(self):
+        base = bitarray(4 * 512)
+        emulator = hdd_emulator(SectorCache(OverlayHardDisk(base), flush_on_tick=False))
+        write_hdd(emulator, 2, 3, 99)
+        data = emulator.snapshot()
+        assert list(emulator.cpu.hdd.hdd.sectors) == [2]
+
+        cache = SectorCache(OverlayHardDisk(base))
+        hdd_emulator(cache).restore(data)
+        assert list(cache.hdd.sectors) == [2]
+        assert cache(dec_to_bin(3), 0, dec_to_bin(0), 0) == dec_to_bin(99)
+        assert not base.any()
+
+
+class TestFormat:
+    def test_pages(self):
+        data = bytes(1000) + b'\x01' + bytes(100)
+        restored, offset = snapshot.unpack_pages(b'xx' + snapshot.pack_pages(data), 2)
+
+        assert restored == data
+        assert offset == len(snapshot.pack_pages(data)) + 2
+
+    def test_not_a_snapshot(self):
+        with pytest.raises(ValueError):
+            make_emulator().restore(b'\x00' * 64)
+
+    def test_version(self):
+        data = bytearray(make_emulator().snapshot())
+        data[4] = snapshot.VERSION + 1
+
+        with pytest.raises(ValueError, match='version'):
+            make_emulator().restore(bytes(data))
+
+    def test_gate_level_ram(self):
+        with pytest.raises(TypeError):
+            Emulator(CPU(RAM8(), HardDisk())).snapshot()
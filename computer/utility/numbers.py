@@ -6,6 +6,9 @@ def bin_to_dec(bits):
         msg = f'bitarray must be 16 long, is {len(bits)}'
         print(msg)
         raise Exception(msg)
+    if not isinstance(bits, bitarray):
+        # e.g. lists of signals of a gate backend
+        bits = bitarray([int(bit) for bit in bits])
     return int.from_bytes(bits.tobytes(), 'big')
 
 
@@ -0,0 +1,166 @@
+from array import array
+from bisect import bisect_right
+
+from bitarray import bitarray
+
+from computer.utility.numbers import bin_to_dec, dec_to_bin
+
+NULL = bitarray(16)
+
+CLASSES = ('move', 'alu', 'jump', 'call', 'stack', 'hdd', 'system')
+MOVE, ALU, JUMP, CALL, STACK, HDD, SYSTEM = range(len(CLASSES))
+
+
+def classify(command):
+    """
+    :param command: int, opcode and secondary opcode (instruction >> 8)
+    :return: index in CLASSES
+    """
+    opcode = command >> 4
+    secondary_opcode = command & 0xF
+    if opcode in (0b0000, 0b0001):
+        return SYSTEM
+    if opcode & 0b1000:
+        return ALU
+    if opcode & 0b0100:
+        if opcode == 0b0100 and secondary_opcode & 0b0110:
+            return CALL  # call and return
+        return JUMP
+    if opcode & 0b0001:
+        return STACK
+    if opcode & 0b0010 and secondary_opcode & 0b1000:
+        return HDD
+    return MOVE
+
+
+CLASS_OF = bytes(classify(command) for command in range(256))
+
+
+class Profiler:
+    """
+    Counts executed instructions per pc, per opcode class and per call target
+
+    record() is called by Emulator.tick before every instruction. The
+    counts live in preallocated array('Q'), indexed by address.
+    """
+    def __init__(self, cpu):
+        pc_register = cpu.pc.register
+        if hasattr(pc_register, 'word'):
+            self.get_pc = lambda: pc_register.word
+            self.read = cpu.read
+        else:
+            self.get_pc = lambda: bin_to_dec(pc_register.value)
+            self.read = lambda address: bin_to_dec(cpu.ram_bus(NULL, dec_to_bin(address), 0))
+        self.reset()
+
+    def record(self):
+        pc = self.get_pc()
+        self.pc_counts[pc] += 1
+        if self.in_call:
+            self.call_counts[pc] += 1
+
+        instruction = self.read(pc)
+        instruction_class = CLASS_OF[instruction >> 8]
+        self.class_counts[instruction_class] += 1
+        # Returns are counted as calls, but they don't jump to a call target
+        self.in_call = instruction_class == CALL and bool(instruction & 0x0400)
+
+    def reset(self):
+        self.pc_counts = array('Q', bytes(8 * 2**16))
+        self.class_counts = array('Q', bytes(8 * len(CLASSES)))
+        self.call_counts = array('Q', bytes(8 * 2**16))
+        self.in_call = False
+
+    @property
+    def cycles(self):
+        return sum(self.class_counts)
+
+    def hot_addresses(self, top=20):
+        """ :return: list of (address, count), most executed first """
+        return self.most_common(self.pc_counts, top)
+
+    def hot_call_targets(self, top=20):
+        return self.most_common(self.call_counts, top)
+
+    @staticmethod
+    def most_common(counts, top):
+        used = [(count, address) for address, count in enumerate(counts) if count]
+        used.sort(key=lambda item: (-item[0], item[1]))
+        return [(address, count) for count, address in used[:top]]
+
+    def label_counts(self, labels, offset=0):
+        """
+        Counts summed over the code following each label, up to the next one
+
+        :return: list of (label, count), most executed first
+        """
+        counts = {}
+        names = Labels(labels, offset)
+        for address, count in enumerate(self.pc_counts):
+            if count:
+                label, _ = names.find(address)
+                label = '(no label)' if label is None else label
+                counts[label] = counts.get(label, 0) + count
+        return sorted(counts.items(), key=lambda item: -item[1])
+
+    def report(self, parser=None, source=None, offset=0, top=20):
+        """
+        :param parser: computer.assembler.parser.Parser which parsed the
+                       program, for labels and source lines
+        :param source: program text, to show the source lines
+        :param offset: address the first parsed instruction is loaded to,
+                       e.g. the header and loader size of loadable programs
+        :return: report as a string
+        """
+        labels = Labels(parser.labels if parser is not None else {}, offset)
+        lines = parser.lines if parser is not None else []
+        source_lines = source.splitlines() if source is not None else []
+        cycles = self.cycles or 1
+
+        def describe(address):
+            label, label_offset = labels.find(address)
+            location = '' if label is None else f'{label}+{label_offset}' if label_offset else label
+            i = address - offset
+            line = lines[i] if 0 <= i < len(lines) else None
+            text = ''
+            if line is not None:
+                text = f'line {line}'
+                if 0 < line <= len(source_lines):
+                    text += f': {source_lines[line - 1].strip()}'
+            return f'{address:>6} {location:<20} {text}'
+
+        report = [f'Cycles: {self.cycles}', '', 'Opcode classes:']
+        for name, count in zip(CLASSES, self.class_counts):
+            report.append(f'{name:>8} {count:>12} {100 * count / cycles:6.2f}%')
+
+        report += ['', 'Hot instructions:']
+        for address, count in self.hot_addresses(top):
+            report.append(f'{count:>12} {100 * count / cycles:6.2f}% {describe(address)}')
+
+        if labels:
+            report += ['', 'Hot labels:']
+            for label, count in self.label_counts(parser.labels, offset)[:top]:
+                report.append(f'{count:>12} {100 * count / cycles:6.2f}% {label}')
+
+        report += ['', 'Call targets:']
+        for address, count in self.hot_call_targets(top):
+            report.append(f'{count:>12} {describe(address)}')
+        return '\n'.join(report)
+
+
+class Labels:
+    """ Finds the label an address belongs to """
+    def __init__(self, labels, offset=0):
+        items = sorted((address + offset, label) for label, address in labels.items())
+        self.addresses = [address for address, _ in items]
+        self.names = [label for _, label in items]
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def find(self, address):
+        """ :return: (label, offset from the label), (None, 0) before the first label """
+        i = bisect_right(self.addresses, address) - 1
+        if i < 0:
+            return None, 0
+        return self.names[i], address - self.addresses[i]
@@ -21,6 +21,7 @@ class StatusWindow(QMainWindow):
     run = pyqtSignal()
     run_until = pyqtSignal(int)
     tick = pyqtSignal()
+    step_back = pyqtSignal()
     reset = pyqtSignal()
     request_memory = pyqtSignal()
     request_registers = pyqtSignal()
@@ -54,6 +55,7 @@ class StatusWindow(QMainWindow):
         self.run_until_button = QPushButton(self)
         self.until_input = QLineEdit(self)
         self.next_button = QPushButton(self)
+        self.back_button = QPushButton(self)
         self.reset_button = QPushButton(self)
 
         self.setup_registers_label()
@@ -71,6 +73,7 @@ class StatusWindow(QMainWindow):
         self.run_until.connect(worker.run_until)
         worker.send_update.connect(self.update)
         self.tick.connect(worker.tick)
+        self.step_back.connect(worker.step_back)
         self.reset.connect(worker.reset)
 
         self.request_memory.connect(worker.send_memory)
@@ -101,6 +104,10 @@ class StatusWindow(QMainWindow):
         self.until_input.setText('0')
         self.until_input.move(500, 0)
 
+        self.back_button.setText('Back')
+        self.back_button.move(600, 0)
+        self.back_button.clicked.connect(self.on_back)
+
     def setup_instructions_list(self):
         instructions_x = 400
         instructions_y = 40
@@ -234,6 +241,10 @@ class StatusWindow(QMainWindow):
     def on_next(self):
         self.tick.emit()
 
+    @pyqtSlot()
+    def on_back(self):
+        self.step_back.emit()
+
     @pyqtSlot()
     def on_run(self):
         self.run.emit()
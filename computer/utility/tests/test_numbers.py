@@ -23,3 +23,7 @@ class TestNumbers:
     @pytest.mark.parametrize('dec, binary', dec_bin)
     def test_bin_to_dec(self, dec, binary):
         assert bin_to_dec(binary) == dec
+
+    @pytest.mark.parametrize('dec, binary', dec_bin)
+    def test_bin_to_dec_list(self, dec, binary):
+        assert bin_to_dec(binary.tolist()) == dec
@@ -0,0 +1,103 @@
+import pytest
+
+from computer.assembler.lexer import Lexer
+from computer.assembler.parser import Parser
+from computer.assembler.linker import link
+from computer.chips.central_processing_unit import CPU as GateCPU
+from computer.chips.optimized.central_processing_unit import CPU
+from computer.chips.optimized.memory import CombinedRAM
+from computer.chips.optimized.tests.test_central_processing_unit import FakeHardDisk
+from computer.emulator import Emulator
+from computer.utility.numbers import dec_to_bin
+from computer.utility.profiler import classify, CLASSES, MOVE, ALU, JUMP, CALL, STACK, HDD, SYSTEM
+
+program = """move sp 2000
+move b 3
+:loop
+call double
+dec b
+compare b 0
+jump_zero end
+jump loop
+:end
+shutdown
+:double
+add a a
+inc a
+return
+"""
+
+
+def make_emulator(cpu_type=CPU, translate=False):
+    parser = Parser()
+    instructions = parser.parse(Lexer().scan(program))
+    instructions = link(instructions, parser.labels, parser.variables, mode='boot')
+
+    emulator = Emulator(cpu_type(CombinedRAM(), FakeHardDisk()), translate=translate, profile=True)
+    for i, instruction in enumerate(instructions):
+        emulator.cpu.ram(instruction, dec_to_bin(i), 1)
+    emulator.cpu.ram.tick()
+    return emulator, parser
+
+
+class TestClassify:
+    commands = [(0b0000_0000, SYSTEM),
+                (0b0001_0000, SYSTEM),
+                (0b0010_0000, MOVE),
+                (0b0011_0000, STACK),
+                (0b0011_1000, STACK),
+                (0b0010_1000, HDD),
+                (0b0010_1010, HDD),
+                (0b0010_1100, HDD),
+                (0b1010_0100, ALU),
+                (0b1000_0101, ALU),
+                (0b0100_0000, JUMP),
+                (0b0110_0000, JUMP),
+                (0b0100_0100, CALL),
+                (0b0100_0010, CALL)]
+
+    @pytest.mark.parametrize('command, expected', commands)
+    def test_classify(self, command, expected):
+        assert classify(command) == expected
+
+
+@pytest.mark.parametrize('cpu_type', [CPU, GateCPU])
+class TestProfiler:
+    def test_counts(self, cpu_type):
+        emulator, parser = make_emulator(cpu_type)
+        emulator.run()
+        profiler = emulator.profiler
+
+        loop = parser.labels['loop']
+        double = parser.labels['double']
+        assert profiler.cycles == emulator.cycles == 2 + 3 * 8 - 1 + 1
+        assert profiler.pc_counts[0] == 1
+        assert profiler.pc_counts[loop] == 3
+        assert profiler.pc_counts[double] == 3
+        assert profiler.call_counts[double] == 3
+        assert sum(profiler.call_counts) == 3
+
+        counts = dict(zip(CLASSES, profiler.class_counts))
+        assert counts == {'move': 2, 'alu': 3 * 4, 'jump': 3 + 2, 'call': 3 * 2,
+                          'stack': 0, 'hdd': 0, 'system': 1}
+
+    def test_report(self, cpu_type):
+        emulator, parser = make_emulator(cpu_type)
+        emulator.run()
+
+        report = emulator.profiler.report(parser, program)
+
+        assert 'Cycles: 26' in report
+        assert 'loop ' in report
+        assert 'double+1' in report
+        assert 'line 12: add a a' in report
+        hot_labels = report.split('Hot labels:')[1].split('Call targets:')[0].split()
+        assert hot_labels[2] == 'loop'
+
+
+def test_translation_off_while_profiling():
+    emulator, _ = make_emulator(translate=True)
+    emulator.run()
+
+    assert emulator.profiler.cycles == emulator.cycles
+    assert not emulator.translator.blocks